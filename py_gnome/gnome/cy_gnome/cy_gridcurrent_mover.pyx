@@ -238,13 +238,21 @@ cdef class CyGridCurrentMover(CyCurrentMoverBase):
         :returns: none
         """
         cdef OSErr err
-        N = len(ref_points)
-
-        err = self.grid_current.get_move(N, model_time, step_len,
-                                         &ref_points[0],
-                                         &delta[0],
-                                         &LE_status[0],
-                                         spill_type, 0)
+        cdef int N = len(ref_points)
+        cdef unsigned long c_model_time = model_time
+        cdef unsigned long c_step_len = step_len
+        cdef WorldPoint3D* ref_ptr = &ref_points[0]
+        cdef WorldPoint3D* delta_ptr = &delta[0]
+        cdef short* status_ptr = &LE_status[0]
+
+        # the time grid data is loaded in prepare_for_model_step so
+        # get_move only works on the arrays passed in - release the GIL
+        with nogil:
+            err = self.grid_current.get_move(N, c_model_time, c_step_len,
+                                             ref_ptr,
+                                             delta_ptr,
+                                             status_ptr,
+                                             spill_type, 0)
 
         if err == 1:
             raise ValueError('Make sure numpy arrays for ref_points '
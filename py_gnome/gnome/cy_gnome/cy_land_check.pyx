@@ -41,7 +41,7 @@ cdef int32_t c_overlap_grid(int32_t m,
                             int32_t y1,
                             int32_t x2,
                             int32_t y2,
-                            ):
+                            ) nogil:
     """
     check if the line segment from pt1 to pt could overlap the grid of
     size (m,n).
@@ -73,7 +73,7 @@ cdef bool c_find_first_pixel(uint8_t* grid,
                              int32_t *prev_y,
                              int32_t *hit_x,
                              int32_t *hit_y,
-                             ):
+                             ) nogil:
     """
     Marches along the grid to see if the LE movement crosses land
 
@@ -308,6 +308,10 @@ def check_land_layers(grid_layers,
         cdef uint32_t i, num_le
         cdef int32_t m, n
         cdef bool did_hit
+
+        if positions.shape[0] == 0:
+            return
+
         cdef int32_t* coarse_pos = <int32_t*> PyMem_Malloc (2*sizeof(int32_t))
         cdef int32_t* coarse_end = <int32_t*> PyMem_Malloc (2*sizeof(int32_t))
 
@@ -325,53 +329,62 @@ def check_land_layers(grid_layers,
 
         num_le = positions.shape[0]
 
-        for i in range(num_le):
-            #if the LE is on land, or if it starts and ends in the same water-only square on the coarsest grid, skip this LE
-            if status_codes[i] == type_defs.OILSTAT_ONLAND:
-                continue
-
-            layer = 0
-            #begin the walk. If a hit is registered on the current grid, drop down one level and continue the walk.
-            #If a hit is registered on the lowest level, then LE has landed.
-            while True:
-                coarse_pos[0] = div(positions[i,0], grid_ratios[layer]).quot
-                coarse_pos[1] = div(positions[i,1], grid_ratios[layer]).quot
-                coarse_end[0] = div(end_positions[i,0], grid_ratios[layer]).quot
-                coarse_end[1] = div(end_positions[i,1], grid_ratios[layer]).quot
-                cur_ratio = grid_ratios[layer]
-                did_hit = c_find_first_pixel(dataptrs[layer],
-                                         widths[layer],
-                                         heights[layer],
-                                         coarse_pos[0],
-                                         coarse_pos[1],
-                                         coarse_end[0],
-                                         coarse_end[1],
-                                         &prev_x,
-                                         &prev_y,
-                                         &hit_x,
-                                         &hit_y,
-                                         )
-                if did_hit:
-                    if layer == num_ratios - 1:
-                        # hit on the lowest layer (confirmed land hit)
-                        last_water_positions[i, 0] = prev_x
-                        last_water_positions[i, 1] = prev_y
-                        end_positions[i,0] = hit_x
-                        end_positions[i,1] = hit_y
-                        status_codes[i] = type_defs.OILSTAT_ONLAND
-                        break
+        # raw pointers to the (C contiguous) arrays so the loop can run
+        # without the GIL
+        cdef int32_t* ratios = &grid_ratios[0]
+        cdef int32_t* pos = &positions[0, 0]
+        cdef int32_t* end = &end_positions[0, 0]
+        cdef int16_t* status = &status_codes[0]
+        cdef int32_t* last_water = &last_water_positions[0, 0]
+
+        with nogil:
+            for i in range(num_le):
+                #if the LE is on land, or if it starts and ends in the same water-only square on the coarsest grid, skip this LE
+                if status[i] == type_defs.OILSTAT_ONLAND:
+                    continue
+
+                layer = 0
+                #begin the walk. If a hit is registered on the current grid, drop down one level and continue the walk.
+                #If a hit is registered on the lowest level, then LE has landed.
+                while True:
+                    coarse_pos[0] = div(pos[2 * i], ratios[layer]).quot
+                    coarse_pos[1] = div(pos[2 * i + 1], ratios[layer]).quot
+                    coarse_end[0] = div(end[2 * i], ratios[layer]).quot
+                    coarse_end[1] = div(end[2 * i + 1], ratios[layer]).quot
+                    cur_ratio = ratios[layer]
+                    did_hit = c_find_first_pixel(dataptrs[layer],
+                                             widths[layer],
+                                             heights[layer],
+                                             coarse_pos[0],
+                                             coarse_pos[1],
+                                             coarse_end[0],
+                                             coarse_end[1],
+                                             &prev_x,
+                                             &prev_y,
+                                             &hit_x,
+                                             &hit_y,
+                                             )
+                    if did_hit:
+                        if layer == num_ratios - 1:
+                            # hit on the lowest layer (confirmed land hit)
+                            last_water[2 * i] = prev_x
+                            last_water[2 * i + 1] = prev_y
+                            end[2 * i] = hit_x
+                            end[2 * i + 1] = hit_y
+                            status[i] = type_defs.OILSTAT_ONLAND
+                            break
+                        else:
+                            # possible hit, go down a layer and try again
+                            layer += 1
+                            coarse_pos[0] = div(pos[2 * i], ratios[layer]).quot
+                            coarse_pos[1] = div(pos[2 * i + 1], ratios[layer]).quot
+                            coarse_end[0] = div(end[2 * i], ratios[layer]).quot
+                            coarse_end[1] = div(end[2 * i + 1], ratios[layer]).quot
                     else:
-                        # possible hit, go down a layer and try again
-                        layer += 1
-                        coarse_pos[0] = div(positions[i,0], grid_ratios[layer]).quot
-                        coarse_pos[1] = div(positions[i,1], grid_ratios[layer]).quot
-                        coarse_end[0] = div(end_positions[i,0], grid_ratios[layer]).quot
-                        coarse_end[1] = div(end_positions[i,1], grid_ratios[layer]).quot
-                else:
-                    # didn't hit land -- can move the LE
-                    positions[i, 0] = end_positions[i, 0]
-                    positions[i, 1] = end_positions[i, 1]
-                    break
+                        # didn't hit land -- can move the LE
+                        pos[2 * i] = end[2 * i]
+                        pos[2 * i + 1] = end[2 * i + 1]
+                        break
 
         PyMem_Free(coarse_pos)
         PyMem_Free(coarse_end)
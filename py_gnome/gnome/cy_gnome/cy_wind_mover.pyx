@@ -154,16 +154,23 @@ cdef class CyWindMover(CyWindMoverBase):
         :returns: none
         """
         cdef OSErr err
-        N = len(ref_points)  # set a data type?
-
-        # modifies delta in place
-        err = self.wind.get_move(N, model_time, step_len,
-                                 &ref_points[0],
-                                 &delta[0],
-                                 &windages[0],
-                                 &LE_status[0],
-                                 spill_type,
-                                 0)
+        cdef int N = len(ref_points)
+        cdef unsigned long c_model_time = model_time
+        cdef unsigned long c_step_len = step_len
+        cdef WorldPoint3D* ref_ptr = &ref_points[0]
+        cdef WorldPoint3D* delta_ptr = &delta[0]
+        cdef double* windages_ptr = &windages[0]
+        cdef short* status_ptr = &LE_status[0]
+
+        # modifies delta in place - without the GIL so other threads can run
+        with nogil:
+            err = self.wind.get_move(N, c_model_time, c_step_len,
+                                     ref_ptr,
+                                     delta_ptr,
+                                     windages_ptr,
+                                     status_ptr,
+                                     spill_type,
+                                     0)
         if err == 1:
             raise ValueError('Make sure numpy arrays for ref_points, delta '
                              'and windages are defined')
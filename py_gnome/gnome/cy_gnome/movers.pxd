@@ -31,9 +31,10 @@ cdef extern from "Random_c.h":
         Random_c() except +
         double fDiffusionCoefficient
         double fUncertaintyFactor
+        # does not use the python API so can be called without the GIL
         OSErr get_move(int n, unsigned long model_time, unsigned long step_len,
                        WorldPoint3D* ref, WorldPoint3D* delta,
-                       short* LE_status, LEType spillType, long spillID)        
+                       short* LE_status, LEType spillType, long spillID) nogil
 
 cdef extern from "RandomVertical_c.h":
     cdef cppclass RandomVertical_c(Mover_c):
@@ -77,7 +78,7 @@ cdef extern from "WindMover_c.h":
         OSErr get_move(int n, unsigned long model_time, unsigned long step_len,
                        WorldPoint3D* ref, WorldPoint3D* delta,
                        double* windages,
-                       short* LE_status, LEType spillType, long spill_ID)
+                       short* LE_status, LEType spillType, long spill_ID) nogil
 
         void SetTimeDep(OSSMTimeValue_c *ossm)
         OSErr GetTimeValue(Seconds &time, VelocityRec *vel)
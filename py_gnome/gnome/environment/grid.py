@@ -120,7 +120,7 @@ class Grid(Environment):
     def serialize(self, json_='webapi'):
 
         toserial = self.to_serialize(json_)
-        schema = self.__class__._schema()
+        schema = self.__class__._schema.instance()
 
         serial = schema.serialize(toserial)
 
@@ -129,7 +129,7 @@ class Grid(Environment):
     @classmethod
     def deserialize(cls, json_):
 
-        schema = cls._schema()
+        schema = cls._schema.instance()
 
         _to_dict = schema.deserialize(json_)
 
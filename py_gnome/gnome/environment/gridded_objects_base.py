@@ -8,6 +8,7 @@ from colander import (SchemaNode, SequenceSchema,
                       Sequence, String, Boolean, DateTime,
                       drop)
 
+import netCDF4 as nc4
 import gridded
 
 from gnome.persist import base_schema
@@ -17,6 +18,8 @@ from gnome.persist.base_schema import GeneralGnomeObjectSchema
 from gnome.persist.validators import convertible_to_seconds
 from gnome.persist.extend_colander import LocalDateTime
 from gnome.utilities.inf_datetime import InfDateTime
+from gnome.environment.slice_cache import CachedTimeData
+from gnome.environment.location_index import location_index
 
 
 class TimeSchema(base_schema.ObjTypeSchema):
@@ -130,6 +133,17 @@ class Grid_U(gridded.grids.Grid_U, GnomeId):
 
         return rv
 
+    def locate_faces(self, points, *args, **kwargs):
+        # shared with the other objects on the same grid
+        return location_index.lookup(self, 'faces', points,
+                                     super(Grid_U, self).locate_faces,
+                                     *args, **kwargs)
+
+    def interpolation_alphas(self, points, *args, **kwargs):
+        return location_index.lookup(self, 'alphas', points,
+                                     super(Grid_U, self).interpolation_alphas,
+                                     *args, **kwargs)
+
     def get_cells(self):
         return self.nodes[self.faces]
 
@@ -207,6 +221,17 @@ class Grid_S(GnomeId, gridded.grids.Grid_S):
         rv = cls.from_netCDF(**dict_)
         return rv
 
+    def locate_faces(self, points, *args, **kwargs):
+        # shared with the other objects on the same grid
+        return location_index.lookup(self, 'faces', points,
+                                     super(Grid_S, self).locate_faces,
+                                     *args, **kwargs)
+
+    def interpolation_alphas(self, points, *args, **kwargs):
+        return location_index.lookup(self, 'alphas', points,
+                                     super(Grid_S, self).interpolation_alphas,
+                                     *args, **kwargs)
+
     def get_cells(self):
         if not hasattr(self, '_cell_trees'):
             self.build_celltree()
@@ -379,6 +404,21 @@ class Variable(gridded.Variable, GnomeId):
         super(Variable, self).__init__(*args, **kwargs)
         self.extrapolation_is_allowed = extrapolation_is_allowed
 
+        self._cache_time_slices()
+
+    def _cache_time_slices(self):
+        '''
+        read the time slices of data from the file through the
+        TimeSliceCache - see gnome.environment.slice_cache
+        '''
+        data = getattr(self, 'data', None)
+        times = getattr(self.time, 'data', None)
+
+        if (isinstance(data, nc4.Variable) and
+                times is not None and len(times) > 1 and
+                data.shape[0] == len(times)):
+            self.data = CachedTimeData(data)
+
     def at(self, *args, **kwargs):
         if ('extrapolate' not in kwargs):
             kwargs['extrapolate'] = False
@@ -0,0 +1,208 @@
+'''
+Index of the grid cells the elements are in, shared by all the environment
+objects on the same grid
+
+Locating the cell that contains each element is the dominant cost of
+interpolating a gridded Variable on a curvilinear or unstructured grid. The
+gridded grids memoize the cells and interpolation weights per grid object,
+but every environment object loaded from a file builds its own grid, so
+the current, the ice and the temperature from one file each locate the
+elements again - as do the u, v and angle Variables if they do not share
+the grid object.
+
+LocationIndex stores the cell indices and interpolation weights keyed by
+the geometry of the grid rather than by the grid object, and by the
+horizontal positions of the points, so they are computed once per model
+stage for all the objects on that grid.
+
+For triangular grids, the search is also started from the cells found by
+the last search of the same number of points: the elements are checked
+against their previous cell first and only the ones that left it go to
+the cell tree. Elements are matched by position in the array, which is
+how the movers and weatherers pass them between stages. A wrong match only
+costs a full search for that element.
+'''
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class LocationIndex(object):
+    '''
+    LRU store of cell indices and interpolation weights for grids
+    '''
+    def __init__(self, max_entries=32, incremental=True):
+        '''
+        :param max_entries=32: number of results stored. A model stage
+            needs one or two per grid, so this covers the stages of an RK4
+            step for several grids.
+        :param incremental=True: start the search for triangular grids from
+            the previous cells of the elements
+        '''
+        self.max_entries = max_entries
+        self.incremental = incremental
+
+        # the movers of a threaded Model search grids from several threads
+        self._lock = threading.RLock()
+        self.clear()
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        with self._lock:
+            self._results = OrderedDict()
+            self._previous = {}
+            self.hits = 0
+            self.misses = 0
+
+    def grid_key(self, grid):
+        '''
+        key for the geometry of grid. Grids with the same node coordinates
+        and connectivity get the same key, whichever object they are.
+        It is computed once and stored on the grid.
+        '''
+        key = grid.__dict__.get('_location_key')
+
+        if key is None:
+            key = hashlib.sha1(type(grid).__name__)
+
+            for name in ('nodes', 'faces', 'node_lon', 'node_lat',
+                         'center_lon', 'center_lat'):
+                arr = getattr(grid, name, None)
+                if arr is None:
+                    continue
+
+                arr = np.ascontiguousarray(np.asarray(arr[:]))
+                key.update(name + str(arr.shape) + str(arr.dtype))
+                key.update(arr.view(np.uint8))
+
+            key = key.hexdigest()
+            grid.__dict__['_location_key'] = key
+
+        return key
+
+    @staticmethod
+    def _points_2d(points):
+        pts = np.asarray(points, dtype=np.float64)
+
+        return np.ascontiguousarray(pts.reshape(-1, pts.shape[-1])[:, :2])
+
+    @staticmethod
+    def _copy(value):
+        if isinstance(value, tuple):
+            return tuple([LocationIndex._copy(v) for v in value])
+
+        return value.copy() if hasattr(value, 'copy') else value
+
+    def lookup(self, grid, quantity, points, compute, *args, **kwargs):
+        '''
+        return the result of compute(points, *args, **kwargs) for grid,
+        computing it only if it is not stored for an equal grid and the
+        same horizontal positions.
+
+        :param grid: the grid that is searched
+        :param quantity: 'faces' or 'alphas'
+        :param compute: the method of grid that does the work
+        :param args, kwargs: passed to compute; they are part of the key,
+            except for the underscore arguments gridded uses for its own
+            memoization and arrays, such as the cell indices passed to
+            interpolation_alphas, which are given by the points anyway
+        '''
+        pts = self._points_2d(points)
+        params = [(k, v) for k, v in sorted(kwargs.items())
+                  if not k.startswith('_') and not isinstance(v, np.ndarray)]
+        args_key = [a for a in args if not isinstance(a, np.ndarray)]
+
+        key = (self.grid_key(grid), quantity, pts.shape,
+               hashlib.sha1(pts.view(np.uint8)).hexdigest(),
+               repr(args_key), repr(params))
+
+        with self._lock:
+            if key in self._results:
+                # move to most recently used
+                value = self._results.pop(key)
+                self._results[key] = value
+                self.hits += 1
+
+                return self._copy(value)
+
+            self.misses += 1
+
+        if quantity == 'faces' and self.incremental:
+            value = self._locate_from_previous(grid, key[0], pts, points,
+                                               compute, *args, **kwargs)
+        else:
+            value = compute(points, *args, **kwargs)
+
+        with self._lock:
+            self._results[key] = self._copy(value)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+        return value
+
+    def _locate_from_previous(self, grid, grid_key, pts, points, compute,
+                              *args, **kwargs):
+        faces = getattr(grid, 'faces', None)
+        previous = self._previous.get(grid_key)
+
+        if (faces is None or faces.shape[-1] != 3 or
+                previous is None or len(previous) != len(pts)):
+            result = compute(points, *args, **kwargs)
+        else:
+            result = previous.copy()
+
+            ok = np.flatnonzero(previous >= 0)
+            tris = np.asarray(grid.nodes)[np.asarray(faces)[previous[ok]]]
+            ok = ok[in_triangles(pts[ok], tris)]
+
+            moved = np.ones((len(pts),), dtype=bool)
+            moved[ok] = False
+
+            if moved.any():
+                # gridded memoizes on _hash, which is for all the points
+                sub_kwargs = dict([(k, v) for k, v in kwargs.items()
+                                   if k != '_hash'])
+                found = compute(pts[moved], *args, **sub_kwargs)
+                result[moved] = np.ma.filled(found, -1).reshape(-1)
+
+        # only a flat array of cell numbers can seed the next search
+        if (isinstance(result, np.ndarray) and
+                not isinstance(result, np.ma.MaskedArray) and
+                result.shape == (len(pts),) and
+                np.issubdtype(result.dtype, np.integer)):
+            with self._lock:
+                self._previous[grid_key] = result.copy()
+
+        return result
+
+
+def in_triangles(points, triangles):
+    '''
+    True for the points that are in (or on an edge of) the matching
+    triangle
+
+    :param points: Nx2 array of points
+    :param triangles: Nx3x2 array of triangle vertices, either orientation
+    '''
+    def cross(a, b, p):
+        return ((b[:, 0] - a[:, 0]) * (p[:, 1] - a[:, 1]) -
+                (b[:, 1] - a[:, 1]) * (p[:, 0] - a[:, 0]))
+
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    d1 = cross(a, b, points)
+    d2 = cross(b, c, points)
+    d3 = cross(c, a, points)
+
+    has_neg = (d1 < 0) | (d2 < 0) | (d3 < 0)
+    has_pos = (d1 > 0) | (d2 > 0) | (d3 > 0)
+
+    return ~(has_neg & has_pos)
+
+
+# default index shared by all the grids
+location_index = LocationIndex()
@@ -0,0 +1,83 @@
+'''
+Step scoped store of values sampled from environment objects
+
+The weatherers each sample the same wind, waves and water objects at the
+element positions - several times per step if the Model splits the step
+into weathering substeps. The Model owns one EnvironmentSamples object and
+hands it to each weatherer so a given (environment object, quantity, time)
+is only evaluated once for a given set of positions. The Model clears it
+whenever the positions change.
+'''
+
+import numpy as np
+
+
+class EnvironmentSamples(object):
+    '''
+    Memoize values computed from environment objects
+
+    The values are keyed by the environment object, the quantity, the time
+    and any extra arguments. Since the weatherers operate on different views
+    of the data arrays, the positions the value was computed for are stored
+    with it; a value is reused if the positions are the same array or an
+    equal copy of it.
+
+    Returned numpy arrays are shared by all the callers so they must not be
+    changed in place. They are not made read-only since they are passed to
+    Cython functions that ask for writable buffers.
+    '''
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        '''
+        drop all stored values - call this whenever the element positions
+        change
+        '''
+        self._samples = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return sum([len(v) for v in self._samples.itervalues()])
+
+    def get(self, obj, quantity, points, time, compute, *args):
+        '''
+        return the value of quantity for obj at the given points and time.
+        If it is not stored, call compute(points, time, *args) to get it.
+
+        :param obj: environment object the value is computed from
+        :param quantity: string naming the value, eg 'wind_speed'
+        :param points: element positions or None if the value does not
+            depend on location
+        :param time: model time or None if value does not depend on time
+        :param compute: callable used to compute the value if it is not in
+            the store
+        :param args: extra arguments to compute; these are part of the key
+            so they must be hashable
+        '''
+        key = (id(obj), quantity, time, args)
+        entries = self._samples.setdefault(key, [])
+
+        for (s_obj, s_points, value) in entries:
+            if s_obj is obj and self._same_points(s_points, points):
+                self.hits += 1
+                return value
+
+        self.misses += 1
+        value = compute(points, time, *args)
+
+        # store obj so its id() cannot be reused while the value is stored
+        entries.append((obj, points, value))
+
+        return value
+
+    def _same_points(self, stored, points):
+        if stored is points:
+            return True
+
+        if stored is None or points is None:
+            return False
+
+        return (stored.shape == points.shape and
+                np.array_equal(stored, points))
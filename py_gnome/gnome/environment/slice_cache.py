@@ -0,0 +1,248 @@
+'''
+Cache of time slices read from the netCDF variables of gridded environment
+objects
+
+Interpolating a gridded Variable in time reads the two time slices that
+bracket the requested time from the file - every step, and for every stage
+of the RK movers. For large (compressed) ROMS/HYCOM files these reads are
+most of the run time, even though it is almost always the same two slices.
+
+TimeSliceCache keeps the decompressed slices in memory with LRU eviction
+under a byte budget. The cached slices are shared by all the readers, so
+they are read-only: copy a slice before changing it.
+
+With prefetch on, when a slice is read the next one is read by a
+background thread so it is ready by the time the model steps into it. The
+netCDF4/HDF5 libraries are not thread safe: the reads done by the cache
+hold a module level lock, but reads and writes of netCDF files done
+elsewhere (the NetCDFOutput files, the grids and times of the gridded
+objects...) do not. So prefetch is off by default, and should only be
+turned on with an HDF5 library built thread safe.
+'''
+
+import threading
+import Queue
+from collections import OrderedDict
+
+import numpy as np
+
+
+# serializes reads from netCDF files done by the cache
+_nc_lock = threading.RLock()
+
+
+class TimeSliceCache(object):
+    '''
+    LRU cache of time slices shared by all the CachedTimeData objects
+    '''
+    def __init__(self, max_bytes=512 * 2 ** 20, prefetch=False):
+        '''
+        :param max_bytes=512MB: memory budget for the cached slices. Slices
+            larger than this are never cached; set to 0 to turn off caching.
+        :param prefetch=False: read the slice after the one that was asked
+            for in a background thread. Only safe if the HDF5 library is
+            thread safe - see the module docstring.
+        '''
+        self.max_bytes = max_bytes
+        self.prefetch = prefetch
+
+        self._lock = threading.Lock()
+        self._slices = OrderedDict()
+        self._loading = {}
+        self.nbytes = 0
+
+        self._queue = None
+        self._thread = None
+
+    def __len__(self):
+        return len(self._slices)
+
+    def __contains__(self, key):
+        return key in self._slices
+
+    def clear(self):
+        with self._lock:
+            self._slices.clear()
+            self.nbytes = 0
+
+    def get(self, data, t_idx):
+        '''
+        return time slice t_idx of data - a CachedTimeData object. Reads it
+        if it is not cached; if it is being read in the background, wait
+        for it.
+        '''
+        key = (id(data), t_idx)
+
+        with self._lock:
+            if key in self._slices:
+                # move to most recently used
+                entry = self._slices.pop(key)
+                self._slices[key] = entry
+                return entry[0]
+
+            loading = self._loading.get(key)
+
+        if loading is not None:
+            loading.wait()
+            with self._lock:
+                if key in self._slices:
+                    return self._slices[key][0]
+
+        return self._load(data, t_idx)
+
+    def request(self, data, t_idx):
+        '''
+        read time slice t_idx of data in the background if it is not cached
+        '''
+        if not self.prefetch or self.max_bytes <= 0:
+            return
+
+        key = (id(data), t_idx)
+        with self._lock:
+            if key in self._slices or key in self._loading:
+                return
+
+            self._loading[key] = threading.Event()
+
+        self._start_thread()
+        self._queue.put((data, t_idx))
+
+    def _start_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._queue = Queue.Queue()
+            self._thread = threading.Thread(target=self._prefetch_loop,
+                                            name='TimeSlicePrefetch')
+            # don't keep python from exiting if a read is in progress
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _prefetch_loop(self):
+        while True:
+            data, t_idx = self._queue.get()
+            try:
+                self._load(data, t_idx)
+            except Exception:
+                # the read will be tried again, and the error raised, in the
+                # main thread when the slice is needed
+                pass
+            finally:
+                with self._lock:
+                    done = self._loading.pop((id(data), t_idx), None)
+
+                if done is not None:
+                    done.set()
+
+    def _load(self, data, t_idx):
+        with _nc_lock:
+            value = data._read_slice(t_idx)
+
+        # read-only whether it is cached or not, so changing a slice in
+        # place fails the same way for any cache budget
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+            if np.ma.getmask(value) is not np.ma.nomask:
+                value.mask.flags.writeable = False
+
+        self._store((id(data), t_idx), value)
+
+        return value
+
+    def _store(self, key, value):
+        nbytes = value.nbytes
+        if isinstance(value, np.ma.MaskedArray):
+            nbytes += np.ma.getmask(value).nbytes
+
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._slices:
+                return
+
+            self._slices[key] = (value, nbytes)
+            self.nbytes += nbytes
+
+            # evict least recently used
+            while self.nbytes > self.max_bytes:
+                _k, (_v, n) = self._slices.popitem(last=False)
+                self.nbytes -= n
+
+    def discard(self, data):
+        '''
+        remove the slices of data from the cache
+        '''
+        with self._lock:
+            for key in [k for k in self._slices if k[0] == id(data)]:
+                _v, n = self._slices.pop(key)
+                self.nbytes -= n
+
+
+# default cache shared by all gridded Variables
+time_slice_cache = TimeSliceCache()
+
+
+class CachedTimeData(object):
+    '''
+    Wraps a netCDF4 Variable whose first dimension is time. Indexing it
+    with an integer time index first, as the interpolation code does, is
+    served from the TimeSliceCache; everything else is passed to the
+    netCDF4 Variable.
+    '''
+    def __init__(self, data, cache=None):
+        self._data = data
+        self._cache = time_slice_cache if cache is None else cache
+
+    def __getattr__(self, name):
+        # only called for attributes not found on the wrapper
+        if name in ('_data', '_cache'):
+            raise AttributeError(name)
+
+        return getattr(self._data, name)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __array__(self, *args):
+        with _nc_lock:
+            return np.asarray(self._data[:], *args)
+
+    @property
+    def shape(self):
+        return self._data.shape
+
+    @property
+    def ndim(self):
+        return len(self._data.shape)
+
+    def _read_slice(self, t_idx):
+        return self._data[t_idx]
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple) and len(key) > 0:
+            t_idx, rest = key[0], key[1:]
+        else:
+            t_idx, rest = key, ()
+
+        if not isinstance(t_idx, (int, long, np.integer)):
+            with _nc_lock:
+                return self._data[key]
+
+        num_times = self._data.shape[0]
+        if not -num_times <= t_idx < num_times:
+            raise IndexError('time index {0} out of range for {1} times'
+                             .format(t_idx, num_times))
+
+        t_idx %= num_times
+
+        value = self._cache.get(self, t_idx)
+
+        # model time moves forward - read the next slice while the current
+        # step is computed
+        if t_idx + 1 < num_times:
+            self._cache.request(self, t_idx + 1)
+
+        return value[rest] if len(rest) > 0 else value
+
+    def __del__(self):
+        if '_cache' in self.__dict__:
+            self._cache.discard(self)
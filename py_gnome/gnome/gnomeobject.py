@@ -131,6 +131,14 @@ class GnomeId(AddLogger):
     _id = None
     make_default_refs = True
 
+    # state saved in a checkpoint of a running model - see
+    # gnome.persist.checkpoint. _checkpoint_attrs names the attributes that
+    # change as the model runs - the configuration is never saved -
+    # _checkpoint_children the attributes holding sub-objects that have
+    # state of their own
+    _checkpoint_attrs = ()
+    _checkpoint_children = ()
+
     def __init__(self, name=None, *args, **kwargs):
         super(GnomeId, self).__init__(*args, **kwargs)
         self.__class__._instance_count += 1
@@ -308,7 +316,8 @@ class GnomeId(AddLogger):
         This is base implementation and can be over-ridden by classes using
         this mixin
         """
-        read_only_attrs = cls._schema().get_nodes_by_attr('read_only')
+        schema = cls._schema.instance()
+        read_only_attrs = schema.get_nodes_by_attr('read_only')
 
         [dict_.pop(n, None) for n in read_only_attrs]
 
@@ -338,21 +347,16 @@ class GnomeId(AddLogger):
         in when the schema is saving the object. This allows an override of
         this function to do any custom stuff necessary to prepare for saving.
         """
-        data = {}
-
-        list_ = self._schema().get_nodes_by_attr('all')
-
-        for key in list_:
-            data[key] = getattr(self, key)
-
-        return data
+        return self._schema.instance().get_attrs(self, 'all')
 
     def update_from_dict(self, dict_, refs=None):
+        schema = self._schema.instance()
+
         if refs is None:
             refs = Refs()
-            self._schema.register_refs(self._schema(), self, refs)
+            self._schema.register_refs(schema, self, refs)
 
-        updatable = self._schema().get_nodes_by_attr('update')
+        updatable = schema.get_nodes_by_attr('update')
         attrs = copy.copy(dict_)
         updated = False
 
@@ -361,7 +365,7 @@ class GnomeId(AddLogger):
                 attrs.pop(k)
 
         for name in updatable:
-            node = self._schema().get(name)
+            node = schema.get(name)
 
             if name in attrs:
                 attrs[name] = self._schema.process_subnode(node,
@@ -462,7 +466,7 @@ class GnomeId(AddLogger):
         if not self._check_type(other):
             return False
 
-        schema = self._schema()
+        schema = self._schema.instance()
 
         for name in schema.get_nodes_by_attr('all'):
             subnode = schema.get(name)
@@ -505,7 +509,7 @@ class GnomeId(AddLogger):
             diffs.append('Different type: self={}, other={}'
                          .format(self.__class__, other.__class__))
 
-        schema = self._schema()
+        schema = self._schema.instance()
 
         for name in schema.get_nodes_by_attr('all'):
             subnode = schema.get(name)
@@ -553,7 +557,7 @@ class GnomeId(AddLogger):
         if 'raw_paths' not in options:
             options['raw_paths'] = True
 
-        schema = self.__class__._schema()
+        schema = self.__class__._schema.instance()
         serial = schema.serialize(self, options=options)
 
         return serial
@@ -571,9 +575,9 @@ class GnomeId(AddLogger):
         if refs is None:
             refs = Refs()
 
-        return cls._schema().deserialize(json_, refs=refs)
+        return cls._schema.instance().deserialize(json_, refs=refs)
 
-    def save(self, saveloc='.', refs=None, overwrite=True):
+    def save(self, saveloc='.', refs=None, overwrite=True, store_data=False):
         """
         Save object state as json to user specified saveloc
 
@@ -597,6 +601,12 @@ class GnomeId(AddLogger):
 
         :param refs: dictionary of references to objects
         :param overwrite: If True, overwrites the file at the saveloc
+        :param store_data: If True, large supporting data files are written
+                           to the archive without compression, and each
+                           file only once, whichever objects refer to it.
+                           This makes saving large netCDF files much
+                           faster, and they can be read in place when
+                           loading.
 
         :returns (obj_json, saveloc, refs): ``obj_json`` is the json that is
                                             written to this object's file
@@ -620,6 +630,7 @@ class GnomeId(AddLogger):
                                             called ``.save`` itself.
         """
         zipfile_ = None
+        zip64 = allowzip64 or store_data
 
         if saveloc is None:
             # Only provide an open zipfile object.  When this is closed or
@@ -629,7 +640,7 @@ class GnomeId(AddLogger):
             zipfile_ = zipfile.ZipFile(tempfile.SpooledTemporaryFile('w+b'),
                                        'a',
                                        compression=zipfile.ZIP_DEFLATED,
-                                       allowZip64=allowzip64)
+                                       allowZip64=zip64)
         elif os.path.isdir(saveloc):
             saveloc = os.path.join(saveloc, self.name + '.zip')
 
@@ -640,24 +651,30 @@ class GnomeId(AddLogger):
 
             zipfile_ = zipfile.ZipFile(saveloc, 'w',
                                        compression=zipfile.ZIP_DEFLATED,
-                                       allowZip64=allowzip64)
+                                       allowZip64=zip64)
         else:
             # saveloc is file path
             if not overwrite:
                 if zipfile.is_zipfile(saveloc):
                     zipfile_ = zipfile.ZipFile(saveloc, 'a',
                                                compression=zipfile.ZIP_DEFLATED,
-                                               allowZip64=allowzip64)
+                                               allowZip64=zip64)
                 else:
                     raise ValueError('{} already exists and overwrite is False'
                                      .format(saveloc))
             else:
                 zipfile_ = zipfile.ZipFile(saveloc, 'w',
                                            compression=zipfile.ZIP_DEFLATED,
-                                           allowZip64=allowzip64)
+                                           allowZip64=zip64)
         if refs is None:
             refs = Refs()
 
+        if store_data:
+            # gnome.persist imports this module
+            from gnome.persist.zip_members import DataMembers
+
+            DataMembers(zipfile_).register()
+
         obj_json = self._schema()._save(self, zipfile_=zipfile_, refs=refs)
 
         if saveloc is None:
@@ -40,6 +40,8 @@ from gnome.utilities.projections import (FlatEarthProjection,
                                          RectangularGridProjection,
                                          RegularGridProjection)
 from gnome.utilities.map_canvas import MapCanvas
+from gnome.utilities.raster_cache import raster_cache
+from gnome.utilities.rand import element_uniform
 from gnome.utilities.file_tools import haz_files
 # from gnome.utilities.file_tools.osgeo_helpers import (ogr_layers)
 # from gnome.utilities.file_tools.osgeo_helpers import (ogr_features)
@@ -571,7 +573,9 @@ class ParamMap(GnomeMap):
             # refloat particles based on probability
             refloat_probability = 1.0 - 0.5 ** (float(time_step) /
                                                 self._refloat_halflife)
-            rnd = np.random.uniform(0, 1, len(r_idx))
+            rnd = element_uniform(spill_container, 'refloat', r_idx)
+            if rnd is None:
+                rnd = np.random.uniform(0, 1, len(r_idx))
 
             # subset of indices that will refloat
             # maybe we should rename refloat_probability since
@@ -640,7 +644,7 @@ class RasterMap(GnomeMap):
 
     land_flag = 1
 
-    def __init__(self, bitmap_array, projection, **kwargs):
+    def __init__(self, bitmap_array, projection, layers=None, **kwargs):
         """
         create a new RasterMap
 
@@ -655,6 +659,12 @@ class RasterMap(GnomeMap):
                            lat-long to pixels in the array
         :type projection: :class:`gnome.map_canvas.Projection`
 
+        :param layers=None: the coarser bitmaps followed by bitmap_array, as
+                            built by build_coarser_bitmaps(). If None, they
+                            are built from bitmap_array. Used to restore a
+                            map from the raster cache.
+        :type layers: list of (W,H) numpy arrays of type uint8
+
         Optional arguments (kwargs)
 
         :param refloat_halflife: The halflife for refloating off land
@@ -687,7 +697,11 @@ class RasterMap(GnomeMap):
         else:
             self.ratios = np.array((16, 1,), dtype=np.int32)
 
-        self.build_coarser_bitmaps()
+        if layers is None:
+            self.build_coarser_bitmaps()
+        else:
+            self.layers = np.array(layers)
+
         self.projection = projection
 
         GnomeMap.__init__(self, **kwargs)
@@ -720,21 +734,85 @@ class RasterMap(GnomeMap):
         base_h = self.basebitmap.shape[1]
 
         for ratio in self.ratios[:-1]:
-            genned_layer = np.zeros((int(math.ceil(float(base_w) / ratio)),
-                                     int(math.ceil(float(base_h) / ratio))),
-                                    dtype=np.uint8, order='C')
+            layer_w = int(math.ceil(float(base_w) / ratio))
+            layer_h = int(math.ceil(float(base_h) / ratio))
+
+            # pad the base bitmap with water to a whole number of cells, then
+            # a cell is land if any of the ratio x ratio base cells is land
+            padded = np.zeros((layer_w * ratio, layer_h * ratio),
+                              dtype=np.uint8)
+            padded[:base_w, :base_h] = self.basebitmap
 
-            for j in range(0, genned_layer.shape[1]):
-                for i in range(0, genned_layer.shape[0]):
-                    genned_layer[i, j] = np.any(self.basebitmap[i * ratio:
-                                                                (i + 1) * ratio, j * ratio:
-                                                                (j + 1) * ratio])
+            genned_layer = (padded.reshape(layer_w, ratio, layer_h, ratio)
+                            .any(axis=3).any(axis=1))
 
-            self.layers.append(genned_layer)
+            self.layers.append(np.ascontiguousarray(genned_layer,
+                                                    dtype=np.uint8))
 
         self.layers.append(self.basebitmap)
         self.layers = np.array(self.layers)
 
+    @staticmethod
+    def _cached_land_raster(filename, raster_size, bounding_box, image_size):
+        """
+        Look up the layers for a land raster drawn from filename in the
+        raster cache.
+
+        Drawing the polygons and building the coarser layers is slow for a
+        detailed coastline, so the layers are cached on disk keyed by the
+        content of filename, raster_size and the projection.
+
+        :returns: (layers, projection, key) -- layers is None if they are not
+                  in the cache; draw them and store self.layers under key.
+        """
+        # same projection MapCanvas sets up for the viewport
+        projection = FlatEarthProjection()
+        projection.set_scale(tuple(map(tuple, bounding_box)), image_size)
+
+        key = raster_cache.key(filename, raster_size, projection,
+                               image_size)
+
+        return raster_cache.load(key), projection, key
+
+    @staticmethod
+    def _draw_land(land_polys, bounding_box, image_size):
+        """
+        Draw the land polygons and return the bitmap as a numpy array
+        """
+        canvas = MapCanvas(image_size=image_size,
+                           preset_colors=None,
+                           background_color='water',
+                           viewport=bounding_box)
+        # color doesn't matter here, only index
+        canvas.add_colors((('water', (0, 255, 255)),  # aqua
+                           ('land', (255, 204, 153)),  # brown
+                           ))
+        canvas.clear_background()
+
+        # draw the land to the background
+        for poly in land_polys:
+            # fixme -- this should be something like "land"
+            if poly.metadata[2] == '1':
+                canvas.draw_polygon(poly,
+                                    line_color='land',
+                                    fill_color='land',
+                                    line_width=1,
+                                    background=True)
+            # fixme -- this should be something like "lake"
+            elif poly.metadata[2] == '2':
+                # this is a lake, draw as water
+                canvas.draw_polygon(poly,
+                                    line_color='water',
+                                    fill_color='water',
+                                    line_width=1,
+                                    background=True)
+
+        # just for testing
+        # canvas.save_background("raster_map_test.png")
+
+        # get the basebitmap as a numpy array:
+        return canvas.back_asarray()
+
     @property
     def refloat_halflife(self):
         return self._refloat_halflife / self.seconds_in_hour
@@ -925,7 +1003,9 @@ class RasterMap(GnomeMap):
 
             refloat_probability = 1.0 - 0.5 ** (float(time_step) /
                                                 self._refloat_halflife)
-            rnd = np.random.uniform(0, 1, len(r_idx))
+            rnd = element_uniform(spill_container, 'refloat', r_idx)
+            if rnd is None:
+                rnd = np.random.uniform(0, 1, len(r_idx))
 
             # subset of indices that will refloat
             # maybe we should rename refloat_probability since
@@ -1089,47 +1169,28 @@ class MapFromBNA(RasterMap):
         w = int(np.sqrt(raster_size * aspect_ratio))
         h = int(raster_size / w)
 
-        canvas = MapCanvas(image_size=(w, h),
-                           preset_colors=None,
-                           background_color='water',
-                           viewport=BB)
-        # color doesn't matter here, only index
-        canvas.add_colors((('water', (0, 255, 255)),  # aqua
-                           ('land', (255, 204, 153)),  # brown
-                           ))
-        canvas.clear_background()
+        image_size = (w, h)
+        (layers,
+         projection,
+         key) = self._cached_land_raster(filename, raster_size, BB, image_size)
 
-        # draw the land to the background
-        for poly in land_polys:
-            # fixme -- this should be something like "land"
-            if poly.metadata[2] == '1':
-                canvas.draw_polygon(poly,
-                                    line_color='land',
-                                    fill_color='land',
-                                    line_width=1,
-                                    background=True)
-            # fixme -- this should be something like "lake"
-            elif poly.metadata[2] == '2':
-                # this is a lake, draw as water
-                canvas.draw_polygon(poly,
-                                    line_color='water',
-                                    fill_color='water',
-                                    line_width=1,
-                                    background=True)
-
-        # just for testing
-        # canvas.save_background("raster_map_test.png")
-
-        # get the basebitmap as a numpy array:
-        bitmap_array = canvas.back_asarray()
+        if layers is None:
+            bitmap_array = self._draw_land(land_polys, BB, image_size)
+        else:
+            bitmap_array = layers[-1]
 
         RasterMap.__init__(self,
                            bitmap_array,
-                           canvas.projection,
+                           projection,
+                           layers=layers,
                            map_bounds=map_bounds,
                            spillable_area=spillable_area,
                            land_polys=land_polys,
                            **kwargs)
+
+        if layers is None:
+            raster_cache.save(key, self.layers)
+
         return None
 
     # # keeping this around just in case, but this method is deprecated
@@ -1334,47 +1395,26 @@ class MapFromUGrid(RasterMap):
         w = int(np.sqrt(raster_size * aspect_ratio))
         h = int(raster_size / w)
 
-        canvas = MapCanvas(image_size=(w, h),
-                           preset_colors=None,
-                           background_color='water',
-                           viewport=BB,
-                           )
-        # color doesn't matter here, only index
-        canvas.add_colors((('water', (0, 255, 255)),  # aqua
-                           ('land', (255, 204, 153)),  # brown
-                           ))
-        canvas.clear_background()
-
-        # draw the land to the background
-        for poly in land_polys:
-            # fixme -- this should be something like "land"
-            if poly.metadata[2] == '1':
-                canvas.draw_polygon(poly,
-                                    line_color='land',
-                                    fill_color='land',
-                                    line_width=1,
-                                    background=True)
-            # fixme -- this should be something like "lake"
-            elif poly.metadata[2] == '2':
-                # this is a lake, draw as water
-                canvas.draw_polygon(poly,
-                                    line_color='water',
-                                    fill_color='water',
-                                    line_width=1,
-                                    background=True)
+        image_size = (w, h)
+        (layers,
+         projection,
+         key) = self._cached_land_raster(filename, raster_size, BB, image_size)
 
-        # just for testing
-        # canvas.save_background("raster_map_test.png")
-
-        # get the basebitmap as a numpy array:
-        bitmap_array = canvas.back_asarray()
+        if layers is None:
+            bitmap_array = self._draw_land(land_polys, BB, image_size)
+        else:
+            bitmap_array = layers[-1]
 
-        RasterMap.__init__(self, bitmap_array, canvas.projection,
+        RasterMap.__init__(self, bitmap_array, projection,
+                           layers=layers,
                            map_bounds=map_bounds,
                            spillable_area=spillable_area,
                            land_polys=land_polys,
                            ** kwargs)
 
+        if layers is None:
+            raster_cache.save(key, self.layers)
+
         return None
 
 
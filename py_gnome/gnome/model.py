@@ -5,6 +5,9 @@ import os
 from datetime import datetime, timedelta
 import copy
 import zipfile
+import threading
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 
 from pprint import pformat
 
@@ -21,6 +24,7 @@ from colander import (SchemaNode,
 import gnome.utilities.cache
 from gnome.utilities.time_utils import round_time, asdatetime
 from gnome.utilities.orderedcollection import OrderedCollection
+from gnome.utilities.rand import RandomStreams
 
 from gnome.basic_types import oil_status, fate
 
@@ -30,6 +34,7 @@ from gnome.map import (GnomeMapSchema,
                        MapFromUGridSchema)
 
 from gnome.environment import Environment, Wind
+from gnome.environment.samples import EnvironmentSamples
 
 from gnome.spill_container import SpillContainerPair
 
@@ -45,6 +50,7 @@ from gnome.outputters import Outputter, NetCDFOutput, WeatheringOutput
 from gnome.persist import (extend_colander,
                            validators,
                            save_load)
+from gnome.persist.checkpoint import write_checkpoint, read_checkpoint
 from gnome.persist.base_schema import (ObjTypeSchema,
                                        GeneralGnomeObjectSchema)
 from gnome.exceptions import ReferencedObjectNotSet, GnomeRuntimeError
@@ -67,6 +73,10 @@ class ModelSchema(ObjTypeSchema):
     )
     uncertain = SchemaNode(Bool())
     cache_enabled = SchemaNode(Bool())
+    cache_async = SchemaNode(Bool(), missing=drop)
+    cache_mmap = SchemaNode(Bool(), missing=drop)
+    threaded = SchemaNode(Bool(), missing=drop)
+    random_seed = SchemaNode(Int(), missing=drop)
     num_time_steps = SchemaNode(Int(), read_only=True)
     make_default_refs = SchemaNode(Bool())
     mode = SchemaNode(
@@ -109,6 +119,24 @@ class ModelSchema(ObjTypeSchema):
     )
 
 
+# thread pool used by models running with threaded=True - it is shared by all
+# the models in the process and created on first use
+_thread_pool = None
+_thread_pool_pid = None
+
+
+def _get_thread_pool():
+    global _thread_pool, _thread_pool_pid
+
+    # the threads of a pool do not survive a fork, so a forked process
+    # (ModelEnsemble) needs its own
+    if _thread_pool is None or _thread_pool_pid != os.getpid():
+        _thread_pool = ThreadPool(max(2, cpu_count()))
+        _thread_pool_pid = os.getpid()
+
+    return _thread_pool
+
+
 class Model(GnomeId):
     '''
     PyGnome Model Class
@@ -155,6 +183,10 @@ class Model(GnomeId):
                  map=None,
                  uncertain=False,
                  cache_enabled=False,
+                 cache_async=False,
+                 cache_mmap=False,
+                 threaded=False,
+                 random_seed=None,
                  mode=None,
                  location=[],
                  environment=[],
@@ -189,6 +221,30 @@ class Model(GnomeId):
         :param cache_enabled=False: Flag for setting whether the model should
                                     cache results to disk.
 
+        :param cache_async=False: Flag for setting whether the cache is
+                                  written to disk in a background thread.
+
+        :param cache_mmap=False: Flag for using the memory-mapped cache
+                                 format. Loading a step from this cache
+                                 returns read-only views of the data instead
+                                 of copies.
+
+        :param threaded=False: Flag for moving the elements of the forecast
+                               and uncertainty spill containers on a thread
+                               pool. The C++ movers and the land check
+                               release the GIL so they run concurrently.
+                               Without a random_seed, movers use shared
+                               random number generators, so a threaded run
+                               is not reproducible.
+
+        :param random_seed=None: Seed of per element random streams. If set,
+                                 the random numbers used by the movers and
+                                 the map depend only on the seed, the
+                                 element id, the time step and what they are
+                                 used for, not on the order in which
+                                 elements are processed. If None, the global
+                                 random number generators are used.
+
         :param mode='Gnome': The runtime 'mode' that the model should use.
                              This is a value that the Web Client uses to
                              decide which UI views it should present.
@@ -212,8 +268,19 @@ class Model(GnomeId):
             _spills = spills
         self.spills.add(_spills)
 
-        self._cache = gnome.utilities.cache.ElementCache()
+        if cache_mmap:
+            self._cache = gnome.utilities.cache.MemmapElementCache()
+        else:
+            self._cache = gnome.utilities.cache.ElementCache()
         self._cache.enabled = cache_enabled
+        self._cache.async_write = cache_async
+
+        self.threaded = threaded
+        self.random_seed = random_seed
+        self._random_streams = None
+
+        # wind, waves, water values sampled by the weatherers in a step
+        self._env_samples = EnvironmentSamples()
 
         # default to now, rounded to the nearest hour
         self.start_time = start_time
@@ -296,6 +363,7 @@ class Model(GnomeId):
 
         # clear the cache:
         self._cache.rewind()
+        self._env_samples.clear()
 
         for outputter in self.outputters:
             outputter.rewind()
@@ -311,10 +379,11 @@ class Model(GnomeId):
         """
         functions in common_object.
         """
+        schema = self._schema.instance()
         if refs is None:
             refs = Refs()
-            self._schema.register_refs(self._schema(), self, refs)
-        updatable = self._schema().get_nodes_by_attr('update')
+            self._schema.register_refs(schema, self, refs)
+        updatable = schema.get_nodes_by_attr('update')
         attrs = copy.copy(dict_)
         updated = False
         for k in attrs.keys():
@@ -322,7 +391,7 @@ class Model(GnomeId):
                 attrs.pop(k)
 
         for name in updatable:
-            node = self._schema().get(name)
+            node = schema.get(name)
             if name in attrs:
                 if name != 'spills':
                     attrs[name] = self._schema.process_subnode(node,
@@ -393,6 +462,48 @@ class Model(GnomeId):
     def cache_enabled(self, enabled):
         self._cache.enabled = enabled
 
+    @property
+    def cache_async(self):
+        '''
+        If True, the cache is written to disk by a background thread so the
+        model does not wait on disk writes
+        '''
+        return self._cache.async_write
+
+    @cache_async.setter
+    def cache_async(self, value):
+        self._cache.flush()
+        self._cache.async_write = value
+
+    @property
+    def cache_mmap(self):
+        '''
+        If True, the memory-mapped cache is used. Changing it rewinds the
+        model
+        '''
+        return isinstance(self._cache,
+                          gnome.utilities.cache.MemmapElementCache)
+
+    @cache_mmap.setter
+    def cache_mmap(self, value):
+        if value == self.cache_mmap:
+            return
+
+        old_cache = self._cache
+        old_cache.flush()
+
+        if value:
+            self._cache = gnome.utilities.cache.MemmapElementCache()
+        else:
+            self._cache = gnome.utilities.cache.ElementCache()
+        self._cache.enabled = old_cache.enabled
+        self._cache.async_write = old_cache.async_write
+
+        for outputter in self.outputters:
+            outputter.cache = self._cache
+
+        self.rewind()
+
     @property
     def has_weathering_uncertainty(self):
         return (any([w.on for w in self.weatherers]) and
@@ -724,7 +835,11 @@ class Model(GnomeId):
                 array_types.update(mover.array_types)
 
         weathering = False
+        self._env_samples.clear()
         for w in self.weatherers:
+            # weatherers share the values sampled from the environment
+            w.env_samples = self._env_samples
+
             for sc in self.spills.items():
                 # weatherers will initialize 'mass_balance' key/values
                 # to 0.0
@@ -750,8 +865,14 @@ class Model(GnomeId):
                 self._time_step = 900
             self._reset_num_time_steps()
 
+        if self.random_seed is None:
+            self._random_streams = None
+        else:
+            self._random_streams = RandomStreams(self.random_seed)
+
         for sc in self.spills.items():
             sc.prepare_for_model_run(array_types)
+            sc.random_streams = self._random_streams
 
         # outputters need array_types, so this needs to come after those
         # have been updated.
@@ -768,7 +889,12 @@ class Model(GnomeId):
         '''
         A place where the model goes through all collections and calls
         post_model_run if the object has it.
+
+        Any element data still being written to the cache is flushed first
+        so outputters can read every step from the cache.
         '''
+        self._cache.flush()
+
         for env in self.environment:
             env.post_model_run()
         for mov in self.movers:
@@ -785,6 +911,9 @@ class Model(GnomeId):
         '''
         sets up everything for the current time_step:
         '''
+        if self._random_streams is not None:
+            self._random_streams.step = self.current_time_step
+
         # initialize movers differently if model uncertainty is on
         for m in self.movers:
             for sc in self.spills.items():
@@ -809,31 +938,82 @@ class Model(GnomeId):
          - calls the beaching code to beach the elements that need beaching.
          - sets the new position
         '''
-        for sc in self.spills.items():
-            if sc.num_released > 0:  # can this check be removed?
-                # possibly refloat elements
-                self.map.refloat_elements(sc, self.time_step, self.model_time)
+        # can this check be removed?
+        containers = [sc for sc in self.spills.items()
+                      if sc.num_released > 0]
 
-                # reset next_positions
-                (sc['next_positions'])[:] = sc['positions']
+        if self.threaded and len(containers) > 1:
+            self._move_elements_threaded(containers)
+        else:
+            for sc in containers:
+                self._prepare_move(sc)
 
                 # loop through the movers
                 for m in self.movers:
                     delta = m.get_move(sc, self.time_step, self.model_time)
                     sc['next_positions'] += delta
 
-                self.map.beach_elements(sc, self.model_time)
+                self._finish_move(sc)
+
+        # positions changed so values sampled at the old positions are stale
+        self._env_samples.clear()
+
+    def _move_elements_threaded(self, containers):
+        '''
+        move_elements() for threaded mode: the move of each mover for each
+        spill container is a task for the thread pool, then the beaching is
+        done for the containers in parallel.
+
+        A mover keeps the arrays of the container it is working on as
+        attributes, so each mover is locked while it computes a move and its
+        delta is copied before the lock is released. So only different movers
+        run concurrently: the same mover moves the containers one after the
+        other. The deltas are added in the order of the movers so the result
+        does not depend on which task finishes first.
+        '''
+        for sc in containers:
+            self._prepare_move(sc)
+
+        locks = dict([(id(m), threading.Lock()) for m in self.movers])
+
+        def get_move(task):
+            sc, mover = task
+            with locks[id(mover)]:
+                return np.array(mover.get_move(sc, self.time_step,
+                                               self.model_time))
+
+        pool = _get_thread_pool()
+        tasks = [(sc, m) for sc in containers for m in self.movers]
 
-                # let model mark these particles to be removed
-                tbr_mask = sc['status_codes'] == oil_status.off_maps
-                sc['status_codes'][tbr_mask] = oil_status.to_be_removed
+        for (sc, _m), delta in zip(tasks,
+                                   pool.map(get_move, tasks, chunksize=1)):
+            sc['next_positions'] += delta
 
-                substances = sc.get_substances(False)
-                if len(substances) > 0:
-                    self._update_fate_status(sc)
+        pool.map(self._finish_move, containers, chunksize=1)
 
-                # the final move to the new positions
-                (sc['positions'])[:] = sc['next_positions']
+    def _prepare_move(self, sc):
+        # possibly refloat elements
+        self.map.refloat_elements(sc, self.time_step, self.model_time)
+
+        # reset next_positions
+        (sc['next_positions'])[:] = sc['positions']
+
+        # movers only process the in_water elements
+        sc.update_active_index()
+
+    def _finish_move(self, sc):
+        self.map.beach_elements(sc, self.model_time)
+
+        # let model mark these particles to be removed
+        tbr_mask = sc['status_codes'] == oil_status.off_maps
+        sc['status_codes'][tbr_mask] = oil_status.to_be_removed
+
+        substances = sc.get_substances(False)
+        if len(substances) > 0:
+            self._update_fate_status(sc)
+
+        # the final move to the new positions
+        (sc['positions'])[:] = sc['next_positions']
 
     def _update_fate_status(self, sc):
         '''
@@ -844,19 +1024,22 @@ class Model(GnomeId):
         update fate_status in move_elements
         '''
         if 'fate_status' in sc:
-            non_w_mask = sc['status_codes'] == oil_status.on_land
-            sc['fate_status'][non_w_mask] = fate.non_weather
+            status = sc['status_codes']
+            fate_status = sc['fate_status']
+            depth = sc['positions'][:, 2]
+
+            fate_status[status == oil_status.on_land] = fate.non_weather
 
-            w_mask = ((sc['status_codes'] == oil_status.in_water)
-                      & ~(sc['fate_status'] & fate.skim == fate.skim)
-                      & ~(sc['fate_status'] & fate.burn == fate.burn)
-                      & ~(sc['fate_status'] & fate.disperse == fate.disperse))
+            # in water and not marked for skimming, burning or dispersion -
+            # one test of the three bits
+            w_mask = ((status == oil_status.in_water) &
+                      ((fate_status &
+                        (fate.skim | fate.burn | fate.disperse)) == 0))
 
-            surf_mask = np.logical_and(w_mask, sc['positions'][:, 2] == 0)
-            subs_mask = np.logical_and(w_mask, sc['positions'][:, 2] > 0)
+            fate_status[w_mask & (depth == 0)] = fate.surface_weather
+            fate_status[w_mask & (depth > 0)] = fate.subsurf_weather
 
-            sc['fate_status'][surf_mask] = fate.surface_weather
-            sc['fate_status'][subs_mask] = fate.subsurf_weather
+            sc.clear_fate_masks()
 
     def weather_elements(self):
         '''
@@ -953,6 +1136,10 @@ class Model(GnomeId):
             if output is not None:
                 output_info[outputter.__class__.__name__] = output
 
+        # each outputter shares the same read-only data loaded from the cache
+        # for this step -- release it now that all outputters are done
+        self._cache.clear_shared()
+
         if len(output_info) > 1:
             # append 'valid' flag to output
             output_info['valid'] = valid
@@ -1085,6 +1272,47 @@ class Model(GnomeId):
 
         return output_data
 
+    def checkpoint(self, saveloc):
+        '''
+        Write the state of the run at the current step to folder saveloc,
+        so it can be continued from this step with :meth:`restart`. See
+        :mod:`gnome.persist.checkpoint` for what is saved.
+
+        :returns: saveloc
+        '''
+        if self.current_time_step < 0:
+            raise GnomeRuntimeError('the model run has not been started')
+
+        return write_checkpoint(self, saveloc)
+
+    def restart(self, checkpoint):
+        '''
+        Continue a run from a checkpoint written by :meth:`checkpoint`: the
+        model is set up for a run and the state at the checkpoint is
+        restored, so the next call to :meth:`step` computes the step after
+        it. The model must be configured as the model that was
+        checkpointed (same start_time, time_step, random_seed, movers,
+        weatherers and outputters)
+
+        The cache only holds the steps from the checkpoint on.
+
+        :param checkpoint: folder of the checkpoint
+
+        :returns: the current step
+        '''
+        self.rewind()
+        self.setup_model_run()
+
+        step = read_checkpoint(self, checkpoint)
+        self.current_time_step = step
+        self._env_samples.clear()
+
+        self._cache.save_timestep(self.current_time_step, self.spills)
+        self.logger.info('{0._pid} restarted {0.name} at step {1}'
+                         .format(self, step))
+
+        return step
+
     def _add_to_environ_collec(self, obj_added):
         '''
         if an environment object exists in obj_added, but not in the Model's
@@ -1182,7 +1410,7 @@ class Model(GnomeId):
 
         return saveloc
 
-    def save(self, saveloc='.', refs=None, overwrite=True):
+    def save(self, saveloc='.', refs=None, overwrite=True, store_data=False):
         '''
         save the model state in saveloc. If self.zipsave is True, then a
         zip archive is created and model files are saved to the archive.
@@ -1208,11 +1436,15 @@ class Model(GnomeId):
             a filename. It is upto the creator of the reference list to decide
             how to reference a nested object.
 
+        :param store_data: If True, large supporting data files are stored
+            uncompressed, and only once - see :meth:`GnomeId.save`
+
         :returns: references
         '''
         json_, saveloc, refs = super(Model, self).save(saveloc=saveloc,
                                                        refs=refs,
-                                                       overwrite=overwrite)
+                                                       overwrite=overwrite,
+                                                       store_data=store_data)
 
         # because a model can be saved mid-run and the SpillContainer data
         # required to reload is not covered in the schema, need to add the
@@ -1237,6 +1469,9 @@ class Model(GnomeId):
                                      spills=self.spills)
         nc_out.write_output(self.current_time_step)
 
+        # write_output only buffers the step: write it and close the files
+        nc_out.post_model_run()
+
         if isinstance(saveloc, zipfile.ZipFile):
             saveloc.write(nc_filename, nc_filename)
             if self.uncertain:
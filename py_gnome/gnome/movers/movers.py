@@ -43,6 +43,9 @@ class Process(GnomeId):
     NOTE: Since base class is not Serializable, it does not need
           a class level _schema attribute.
     """
+    # whether it is active is the only state a Process keeps during a run
+    _checkpoint_attrs = ('_active',)
+
     def __init__(self, **kwargs):
         """
         Initialize default Mover/Weatherer parameters
@@ -191,6 +194,30 @@ class Mover(Process):
 
         return delta
 
+    def _active_index(self, sc):
+        '''
+        index of the elements this mover needs to process. Only in_water
+        elements are moved, so gather these, compute the move and scatter
+        the results back with _scatter_delta()
+
+        SpillContainerData does not maintain an active index so move all
+        elements in that case.
+        '''
+        return getattr(sc, 'active_index', slice(None))
+
+    def _scatter_delta(self, sc, delta, active):
+        '''
+        return the (number_elements X 3) delta for all elements in sc given
+        the delta computed for only the active elements
+        '''
+        if isinstance(active, slice):
+            return delta
+
+        full = np.zeros((len(sc), 3), dtype=world_point_type)
+        full[active] = delta
+
+        return full
+
 
 class PyMover(Mover):
     def __init__(self, default_num_method='RK2',
@@ -300,6 +327,9 @@ class CyMover(Mover):
         # either a 1, or 2 depending on whether spill is certain or not
         self.spill_type = 0
 
+        # index of elements passed to the cython mover
+        self.active_elements = slice(None)
+
     def prepare_for_model_run(self):
         """
         Calls the contained cython mover's prepare_for_model_run()
@@ -374,8 +404,23 @@ class CyMover(Mover):
                                 self.positions, self.delta,
                                 self.status_codes, self.spill_type)
 
-        return (self.delta.view(dtype=world_point_type)
-                .reshape((-1, len(world_point))))
+        return self.get_delta(sc)
+
+    def get_delta(self, sc):
+        '''
+        return the delta computed by the cython mover for all elements in sc
+        '''
+        return self._scatter_delta(sc,
+                                   self.delta.view(dtype=world_point_type)
+                                   .reshape((-1, len(world_point))),
+                                   self.active_elements)
+
+    def get_active_data(self, sc, name):
+        '''
+        return the data array 'name' for the elements passed to the cython
+        mover in prepare_data_for_get_move()
+        '''
+        return sc[name][self.active_elements]
 
     def prepare_data_for_get_move(self, sc, model_time_datetime):
         """
@@ -387,19 +432,23 @@ class CyMover(Mover):
         """
         self.model_time = self.datetime_to_seconds(model_time_datetime)
 
+        if sc.uncertain:
+            self.spill_type = spill_type.uncertainty
+            # the C++ uncertainty arrays are indexed by the element's position
+            # in the data arrays, so the uncertain movers see all elements
+            self.active_elements = slice(None)
+        else:
+            self.spill_type = spill_type.forecast
+            self.active_elements = self._active_index(sc)
+
         # Get the data:
         try:
-            self.positions = sc['positions']
-            self.status_codes = sc['status_codes']
+            self.positions = sc['positions'][self.active_elements]
+            self.status_codes = sc['status_codes'][self.active_elements]
         except KeyError, err:
             raise ValueError('The spill container does not have the required'
                              'data arrays\n' + str(err))
 
-        if sc.uncertain:
-            self.spill_type = spill_type.uncertainty
-        else:
-            self.spill_type = spill_type.forecast
-
         # Array is not the same size, change view and reshape
         self.positions = (self.positions.view(dtype=world_point)
                           .reshape((len(self.positions),)))
@@ -247,8 +247,9 @@ class PyCurrentMover(movers.PyMover):
         positions = sc['positions']
 
         if self.active and len(positions) > 0:
-            status = sc['status_codes'] != oil_status.in_water
-            pos = positions[:]
+            # only move the in_water elements
+            active = self._active_index(sc)
+            pos = positions[active]
 
             res = self.delta_method(num_method)(sc, time_step,
                                                 model_time_datetime,
@@ -256,13 +257,17 @@ class PyCurrentMover(movers.PyMover):
                                                 self.current)
 
             if res.shape[1] == 2:
-                deltas = np.zeros_like(positions)
+                deltas = np.zeros_like(pos)
                 deltas[:, 0:2] = res
             else:
                 deltas = res
 
-            deltas = FlatEarthProjection.meters_to_lonlat(deltas, positions)
-            deltas[status] = (0, 0, 0)
+            deltas = FlatEarthProjection.meters_to_lonlat(deltas, pos)
+            if isinstance(active, slice):
+                status = sc['status_codes'] != oil_status.in_water
+                deltas[status] = (0, 0, 0)
+
+            deltas = self._scatter_delta(sc, deltas, active)
         else:
             deltas = np.zeros_like(positions)
 
@@ -172,7 +172,8 @@ class PyWindMover(movers.PyMover):
                                     sc['windage_range'][:, 1],
                                     sc['windages'],
                                     sc['windage_persist'],
-                                    time_step)
+                                    time_step,
+                                    rnd=rand.element_uniform(sc, 'windage'))
 
     def get_move(self, sc, time_step, model_time_datetime, num_method=None):
         """
@@ -194,15 +195,21 @@ class PyWindMover(movers.PyMover):
         positions = sc['positions']
 
         if self.active and len(positions) > 0:
-            status = sc['status_codes'] != oil_status.in_water
-            pos = positions[:]
+            # only move the in_water elements
+            active = self._active_index(sc)
+            pos = positions[active]
+            windages = sc['windages'][active]
 
             deltas = self.delta_method(num_method)(sc, time_step, model_time_datetime, pos, self.wind)
-            deltas[:, 0] *= sc['windages'] * self.wind_scale
-            deltas[:, 1] *= sc['windages'] * self.wind_scale
+            deltas[:, 0] *= windages * self.wind_scale
+            deltas[:, 1] *= windages * self.wind_scale
 
-            deltas = FlatEarthProjection.meters_to_lonlat(deltas, positions)
-            deltas[status] = (0, 0, 0)
+            deltas = FlatEarthProjection.meters_to_lonlat(deltas, pos)
+            if isinstance(active, slice):
+                status = sc['status_codes'] != oil_status.in_water
+                deltas[status] = (0, 0, 0)
+
+            deltas = self._scatter_delta(sc, deltas, active)
         else:
             deltas = np.zeros_like(positions)
 
@@ -17,6 +17,15 @@ from gnome.movers import CyMover, ProcessSchema
 from gnome.persist.validators import convertible_to_seconds
 from gnome.persist.extend_colander import LocalDateTime
 from gnome.utilities.inf_datetime import InfTime, MinusInfTime
+from gnome.utilities.rand import element_uniform
+
+
+# as in lib_gnome
+_meters_per_degree_lat = 111120.00024
+
+# candidate points drawn at a time per element for the first step, when
+# the move is a random point in the unit circle
+_circle_draws = 8
 
 
 class RandomMoverSchema(ProcessSchema):
@@ -38,6 +47,8 @@ class RandomMover(CyMover):
     """
     _schema = RandomMoverSchema
 
+    _checkpoint_attrs = CyMover._checkpoint_attrs + ('_first_step',)
+
     def __init__(self, **kwargs):
         """
         Uses super to invoke base class __init__ method.
@@ -57,6 +68,10 @@ class RandomMover(CyMover):
         self.mover = CyRandomMover(diffusion_coef=diffusion_coeff,
                                    uncertain_factor=uncertain_factor)
 
+        # like Random_c, the elements are moved within the unit circle on
+        # the first step of a run - set by prepare_for_model_run()
+        self._first_step = False
+
         super(RandomMover, self).__init__(**kwargs)
 
     @property
@@ -83,6 +98,87 @@ class RandomMover(CyMover):
     def uncertain_factor(self, value):
         self.mover.uncertain_factor = value
 
+    def prepare_for_model_run(self):
+        super(RandomMover, self).prepare_for_model_run()
+
+        self._first_step = True
+
+    def model_step_is_done(self, sc=None):
+        super(RandomMover, self).model_step_is_done(sc)
+
+        self._first_step = False
+
+    def get_move(self, sc, time_step, model_time_datetime):
+        """
+        If the spill container has random streams, the move is computed
+        here from them, the same way Random_c does it: a random point in
+        the unit circle on the first step, in the unit square after that.
+        Otherwise the C++ mover computes it with the global C++ random
+        generator.
+
+        Random_c's depth dependent diffusion is not reproduced - it cannot
+        be turned on from pyGNOME.
+        """
+        if getattr(sc, 'random_streams', None) is None:
+            return super(RandomMover, self).get_move(sc, time_step,
+                                                     model_time_datetime)
+
+        positions = sc['positions']
+        delta = np.zeros_like(positions)
+
+        if not self.active:
+            return delta
+
+        # like pyGNOME's Random_c, only diffuse the surface elements
+        idx = np.flatnonzero((sc['status_codes'] == oil_status.in_water) &
+                             (positions[:, 2] <= 0.))
+        if len(idx) == 0:
+            return delta
+
+        factor = self.uncertain_factor if sc.uncertain else 1.
+        coef = (np.sqrt(factor * 6. * (self.diffusion_coef / 10000.) *
+                        time_step) / _meters_per_degree_lat)
+
+        if self._first_step:
+            rnd = self._in_unit_circle(sc, idx)
+        else:
+            rnd = 2. * element_uniform(sc, 'diffusion', idx, draws=2) - 1.
+
+        delta[idx, 0] = (rnd[:, 0] * coef /
+                         np.cos(np.deg2rad(positions[idx, 1])))
+        delta[idx, 1] = rnd[:, 1] * coef
+
+        return delta
+
+    @staticmethod
+    def _in_unit_circle(sc, idx):
+        '''
+        random points in the unit circle for elements idx of sc, by
+        rejection like GetRandomVectorInUnitCircle: for each element, the
+        first of its candidate points in the unit square that is in the
+        circle
+        '''
+        rnd = np.empty((len(idx), 2))
+        todo = np.arange(len(idx))
+        batch = 0
+
+        while len(todo) > 0:
+            points = (2. * element_uniform(sc,
+                                           'diffusion_circle_{0}'.format(batch),
+                                           idx[todo],
+                                           draws=2 * _circle_draws) - 1.)
+            points = points.reshape(len(todo), _circle_draws, 2)
+
+            inside = (points ** 2).sum(axis=2) <= 1.
+            found = inside.any(axis=1)
+            first = inside.argmax(axis=1)
+
+            rnd[todo[found]] = points[found, first[found]]
+            todo = todo[~found]
+            batch += 1
+
+        return rnd
+
     def __repr__(self):
         return ('RandomMover(diffusion_coef={0}, uncertain_factor={1}, '
                 'active_range={2}, on={3})'
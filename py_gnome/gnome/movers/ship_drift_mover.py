@@ -162,7 +162,9 @@ class ShipDriftMover(Mover):
                                          sc['windage_range'][:, 1],
                                          sc['windages'],
                                          sc['windage_persist'],
-                                         time_step)
+                                         time_step,
+                                         rnd=rand.element_uniform(sc,
+                                                                  'windage'))
 
     def prepare_data_for_get_move(self, sc, model_time_datetime):
         """
@@ -19,6 +19,7 @@ from colander import (SchemaNode, Float)
 
 from gnome.basic_types import oil_status, mover_type
 from gnome.utilities.projections import FlatEarthProjection as proj
+from gnome.utilities.rand import element_uniform
 
 from gnome.movers import Mover, ProcessSchema
 
@@ -128,12 +129,18 @@ class SimpleMover(Mover):
                 num = sum(in_water_mask)
                 scale = self.uncertainty_scale * self.velocity \
                     * time_step
-                delta[in_water_mask, 0] += random.uniform(-scale[0], scale[0],
-                                                          num)
-                delta[in_water_mask, 1] += random.uniform(-scale[1], scale[1],
-                                                          num)
-                delta[in_water_mask, 2] += random.uniform(-scale[2], scale[2],
-                                                          num)
+
+                rnd = element_uniform(spill, 'simple_mover',
+                                      in_water_mask, draws=3)
+                if rnd is None:
+                    delta[in_water_mask, 0] += random.uniform(-scale[0],
+                                                              scale[0], num)
+                    delta[in_water_mask, 1] += random.uniform(-scale[1],
+                                                              scale[1], num)
+                    delta[in_water_mask, 2] += random.uniform(-scale[2],
+                                                              scale[2], num)
+                else:
+                    delta[in_water_mask] += scale * (2. * rnd - 1.)
 
             # scale for projection
 
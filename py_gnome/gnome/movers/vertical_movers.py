@@ -66,12 +66,11 @@ class RiseVelocityMover(CyMover):
                                 time_step,
                                 self.positions,
                                 self.delta,
-                                sc['rise_vel'],
+                                self.get_active_data(sc, 'rise_vel'),
                                 self.status_codes,
                                 self.spill_type)
 
-        return (self.delta.view(dtype=world_point_type)
-                .reshape((-1, len(world_point))))
+        return self.get_delta(sc)
 
 
 class TamocRiseVelocityMover(RiseVelocityMover):
@@ -20,7 +20,7 @@ from gnome.cy_gnome.cy_gridwind_mover import CyGridWindMover
 from gnome.cy_gnome.cy_ice_wind_mover import CyIceWindMover
 
 from gnome.utilities.time_utils import sec_to_datetime
-from gnome.utilities.rand import random_with_persistance
+from gnome.utilities.rand import random_with_persistance, element_uniform
 
 
 from gnome.environment import Wind, WindSchema
@@ -142,7 +142,8 @@ class WindMoversBase(CyMover):
                                     sc['windage_range'][:, 1],
                                     sc['windages'],
                                     sc['windage_persist'],
-                                    time_step)
+                                    time_step,
+                                    rnd=element_uniform(sc, 'windage'))
 
     def get_move(self, sc, time_step, model_time_datetime):
         """
@@ -159,11 +160,10 @@ class WindMoversBase(CyMover):
         if self.active and len(self.positions) > 0:
             self.mover.get_move(self.model_time, time_step,
                                 self.positions, self.delta,
-                                sc['windages'],
+                                self.get_active_data(sc, 'windages'),
                                 self.status_codes, self.spill_type)
 
-        return (self.delta.view(dtype=world_point_type)
-                .reshape((-1, len(world_point))))
+        return self.get_delta(sc)
 
     def _state_as_str(self):
         '''
@@ -11,6 +11,7 @@ from cPickle import loads, dumps
 import uuid
 
 import multiprocessing as mp
+import numpy as np
 import tblib.pickling_support
 
 
@@ -428,3 +429,252 @@ class ModelBroadcaster(GnomeId):
 
     def _set_weathering_output_only(self, idx):
         self.cmd('set_weathering_output_only', {}, idx=idx)
+
+
+# state inherited by each ModelEnsemble worker process
+_ensemble = {}
+
+
+def _init_ensemble_worker(model, mass_balance, status, keys, num_steps):
+    '''
+        Pool initializer for the ModelEnsemble worker processes.
+
+        The model and the shared memory arrays are inherited by the worker,
+        so nothing is pickled per ensemble member.
+    '''
+    root_logger = logging.getLogger()
+    handler_list = root_logger.handlers[:]
+
+    root_logger.setLevel(logging.CRITICAL)
+    [root_logger.removeHandler(h) for h in handler_list]
+
+    _ensemble.update(model=model,
+                     mass_balance=mass_balance,
+                     status=status,
+                     keys=keys,
+                     num_steps=num_steps)
+
+
+def _run_ensemble_member(member):
+    '''
+        Run one ensemble member to completion in a worker process.
+
+        The mass balance for each step is written to the shared memory as
+        the run progresses. Exceptions are caught and returned so a failed
+        member does not cancel the other members.
+
+        :returns: (idx, None) if successful or (idx, traceback string) if the
+                  run failed.
+    '''
+    idx, wind_speed_uncertainty, spill_amount_uncertainty = member
+
+    model = _ensemble['model']
+    keys = _ensemble['keys']
+    num_steps = _ensemble['num_steps']
+    status = _ensemble['status']
+
+    mass_balance = (np.frombuffer(_ensemble['mass_balance'])
+                    .reshape((len(status), num_steps, len(keys))))
+
+    try:
+        # py_gnome spill container uncertainty is not used here
+        model.spills.uncertain = False
+
+        for w in [e for e in model.environment if isinstance(e, Wind)]:
+            w.set_speed_uncertainty(wind_speed_uncertainty)
+
+        for s in model.spills:
+            s.set_amount_uncertainty(spill_amount_uncertainty)
+
+        model._cache.create_new_dir()
+        model._cache.enabled = False
+
+        del_list = [o for o in model.outputters
+                    if not isinstance(o, WeatheringOutput)]
+        for dl in del_list:
+            del model.outputters[dl.id]
+
+        if len(model.outputters) == 0:
+            model.outputters += WeatheringOutput()
+
+        for output in model:
+            step_num = output['step_num']
+            mb = output.get('WeatheringOutput')
+
+            if mb is None or step_num >= num_steps:
+                continue
+
+            for k, key in enumerate(keys):
+                if key in mb:
+                    mass_balance[idx, step_num, k] = mb[key]
+
+        status[idx] = ModelEnsemble.complete
+    except Exception:
+        status[idx] = ModelEnsemble.failed
+
+        return (idx, traceback.format_exc())
+
+    return (idx, None)
+
+
+class ModelEnsemble(GnomeId):
+    '''
+        Runs the uncertainty variations of a model as an ensemble on a
+        bounded pool of worker processes.
+
+        Unlike the ModelBroadcaster, which keeps one process per variation
+        and steps them one request at a time, each worker runs a whole
+        model run. The mass balance from the WeatheringOutput is written to
+        shared memory as the members run, and is available through the
+        mass_balance attribute and get_mass_balance().
+
+        Each member runs in a fresh worker process (maxtasksperchild=1) so it
+        starts from the model as it was when run() was called.
+    '''
+    pending = 0
+    complete = 1
+    failed = -1
+
+    # mass balance quantities recorded for each member and step
+    default_mass_balance_keys = ('amount_released',
+                                 'evaporated',
+                                 'natural_dispersion',
+                                 'sedimentation',
+                                 'dissolution',
+                                 'beached',
+                                 'off_maps',
+                                 'floating',
+                                 'skimmed',
+                                 'burned',
+                                 'chem_dispersed',
+                                 'water_content',
+                                 'avg_density',
+                                 'avg_viscosity',
+                                 )
+
+    def __init__(self, model,
+                 wind_speed_uncertainties,
+                 spill_amount_uncertainties,
+                 num_workers=None,
+                 mass_balance_keys=None):
+        '''
+            :param model: the model to run the ensemble for
+
+            :param wind_speed_uncertainties: sequence of wind speed
+                uncertainty values, one of {'down', 'normal', 'up'}
+
+            :param spill_amount_uncertainties: sequence of spill amount
+                uncertainty values, one of {'down', 'normal', 'up'}
+
+            :param num_workers=None: max number of worker processes. Default
+                is the number of available cores.
+
+            :param mass_balance_keys=None: mass balance quantities to record.
+                Default is default_mass_balance_keys
+        '''
+        self.model = model
+
+        if num_workers is None:
+            num_workers = mp.cpu_count()
+        self.num_workers = num_workers
+
+        if mass_balance_keys is None:
+            mass_balance_keys = self.default_mass_balance_keys
+        self.mass_balance_keys = tuple(mass_balance_keys)
+
+        self.members = []
+        self.lookup = {}
+        for wsu in wind_speed_uncertainties:
+            for sau in spill_amount_uncertainties:
+                self.lookup[(wsu, sau)] = len(self.members)
+                self.members.append((wsu, sau))
+
+        self.errors = {}
+        self._mass_balance = None
+        self._status = None
+
+    @property
+    def num_time_steps(self):
+        return self.model.num_time_steps
+
+    def run(self):
+        '''
+            Run all the ensemble members.
+
+            :returns: dict of {index: traceback string} for the members that
+                      failed. It is empty if all members were successful.
+        '''
+        num_steps = self.num_time_steps
+        size = len(self.members) * num_steps * len(self.mass_balance_keys)
+
+        self._mass_balance = mp.RawArray('d', size)
+        self.mass_balance[:] = np.nan
+
+        self._status = mp.RawArray('i', len(self.members))
+
+        pool = mp.Pool(processes=max(1, min(self.num_workers,
+                                            len(self.members))),
+                       initializer=_init_ensemble_worker,
+                       initargs=(self.model,
+                                 self._mass_balance,
+                                 self._status,
+                                 self.mass_balance_keys,
+                                 num_steps),
+                       maxtasksperchild=1)
+
+        tasks = [(idx, wsu, sau)
+                 for idx, (wsu, sau) in enumerate(self.members)]
+
+        self.errors = {}
+        try:
+            for idx, err in pool.imap_unordered(_run_ensemble_member, tasks):
+                if err is not None:
+                    self.logger.warning('ensemble member {0} failed:\n{1}'
+                                        .format(self.members[idx], err))
+                    self.errors[idx] = err
+
+            pool.close()
+        except Exception:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+        return self.errors
+
+    @property
+    def status(self):
+        '''
+            status of each member: pending, complete or failed
+        '''
+        if self._status is None:
+            return np.zeros((len(self.members),), dtype=np.int32)
+
+        return np.frombuffer(self._status, dtype=np.int32)
+
+    @property
+    def mass_balance(self):
+        '''
+            (num_members, num_time_steps, num_keys) array of the mass balance
+            of each member. Steps that were not output are NaN.
+        '''
+        if self._mass_balance is None:
+            return None
+
+        return (np.frombuffer(self._mass_balance)
+                .reshape((len(self.members),
+                          self.num_time_steps,
+                          len(self.mass_balance_keys))))
+
+    def get_mass_balance(self, uncertainty_values):
+        '''
+            Returns a dict of {key: array of values for each step} for the
+            member with the given uncertainty values
+
+            :param uncertainty_values: (wind_speed_uncertainty,
+                                        spill_amount_uncertainty)
+        '''
+        mb = self.mass_balance[self.lookup[uncertainty_values]]
+
+        return dict([(key, mb[:, k])
+                     for k, key in enumerate(self.mass_balance_keys)])
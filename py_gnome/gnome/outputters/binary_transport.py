@@ -0,0 +1,121 @@
+'''
+Binary encoding of the data the json outputters send to the web client
+
+The json outputters convert every value to a python float and the web
+server then encodes them as text, which for large runs is most of the
+cost of a step and most of the payload. In binary mode they return the
+arrays packed, little endian, in one buffer instead, with a layout that
+gives the name, dtype, shape and offset of each array::
+
+    {"layout": [{"name": "longitude", "dtype": "<i4", "shape": [N],
+                 "offset": 0, "scale": 1e-05, "origin": -70.1}, ...],
+     "buffer": <bytes>}
+
+Values are quantized to the precision the text output is rounded to:
+positions are fixed point integers relative to an origin, which is
+chosen once per run. Element ids are delta encoded.
+
+unpack_arrays() decodes a message; the web client does the same with
+typed arrays over the buffer.
+'''
+import numpy as np
+
+# offsets of the arrays in the buffer are multiples of this, so the client
+# can make typed arrays on the buffer without copying
+_alignment = 8
+
+
+def quantize(values, resolution, origin=0., dtype=np.int32):
+    '''
+    fixed point values: round((values - origin) / resolution)
+    '''
+    return np.round((np.asarray(values, dtype=np.float64) - origin) /
+                    resolution).astype(dtype)
+
+
+def delta_encode(values):
+    '''
+    delta encoding of integer values: the differences between successive
+    values, the first one being 0, in the smallest integer dtype that holds
+    them
+
+    :returns: (first, deltas) - the first value and the differences
+    '''
+    values = np.asarray(values, dtype=np.int64)
+
+    if len(values) == 0:
+        return 0, np.zeros((0,), dtype=np.uint8)
+
+    deltas = np.zeros(values.shape, dtype=np.int64)
+    deltas[1:] = np.diff(values)
+
+    dtype = np.result_type(np.min_scalar_type(deltas.min()),
+                           np.min_scalar_type(deltas.max()))
+
+    return int(values[0]), deltas.astype(dtype)
+
+
+def delta_decode(first, deltas):
+    return first + np.cumsum(deltas, dtype=np.int64)
+
+
+def pack_arrays(arrays):
+    '''
+    pack arrays into one little endian buffer
+
+    :param arrays: sequence of (name, array, attrs) where attrs is a dict
+        of attributes added to the layout of the array, such as the scale
+        and origin needed to decode it, or None
+    :returns: dict with the 'layout' of the arrays and the 'buffer'
+    '''
+    layout = []
+    chunks = []
+    offset = 0
+
+    for name, array, attrs in arrays:
+        array = np.ascontiguousarray(array)
+        array = array.astype(array.dtype.newbyteorder('<'), copy=False)
+
+        item = {'name': name,
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'offset': offset}
+        if attrs:
+            item.update(attrs)
+
+        layout.append(item)
+
+        data = array.tostring()
+        padding = -len(data) % _alignment
+
+        chunks.append(data + '\0' * padding)
+        offset += len(data) + padding
+
+    return {'layout': layout, 'buffer': ''.join(chunks)}
+
+
+def unpack_arrays(message):
+    '''
+    decode a message made by pack_arrays(). Quantized arrays are converted
+    back to floats and delta encoded ones to their values.
+
+    :returns: dict of name: array
+    '''
+    buf = message['buffer']
+    arrays = {}
+
+    for item in message['layout']:
+        dtype = np.dtype(item['dtype'])
+        count = int(np.prod(item['shape']))
+
+        array = np.frombuffer(buf, dtype=dtype, count=count,
+                              offset=item['offset']).reshape(item['shape'])
+
+        if 'first' in item:
+            array = delta_decode(item['first'], array)
+        elif 'scale' in item:
+            array = array * item['scale'] + item.get('origin', 0.)
+
+        arrays[item['name']] = array
+
+    return arrays
@@ -128,7 +128,7 @@ class TrajectoryGeoJsonOutput(Outputter):
         c_features = []
         uc_features = []
 
-        for sc in self.cache.load_timestep(step_num).items():
+        for sc in self._load_timestep(step_num).items():
             position = self._dataarray_p_types(sc['positions'])
             status = self._dataarray_p_types(sc['status_codes'])
             mass = self._dataarray_p_types(sc['mass'])
@@ -284,7 +284,7 @@ class IceGeoJsonOutput(Outputter):
         if self.on is False or not self._write_step:
             return None
 
-        for sc in self.cache.load_timestep(step_num).items():
+        for sc in self._load_timestep(step_num).items():
             pass
 
         model_time = date_to_sec(sc.current_time_stamp)
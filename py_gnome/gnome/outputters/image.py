@@ -187,7 +187,7 @@ class IceImageOutput(Outputter):
 
         # fixme -- doing all this cache stuff just to get the timestep..
         # maybe timestep should be passed in.
-        for sc in self.cache.load_timestep(step_num).items():
+        for sc in self._load_timestep(step_num).items():
             model_time = date_to_sec(sc.current_time_stamp)
             iso_time = sc.current_time_stamp.isoformat()
 
@@ -6,13 +6,14 @@ import copy
 from collections import Iterable
 
 import numpy as np
-from colander import SchemaNode, SequenceSchema, String, drop
+from colander import SchemaNode, SequenceSchema, String, Boolean, drop
 
 from gnome.utilities.time_utils import date_to_sec
 
 from gnome.movers import PyMover
 
 from .outputter import Outputter, BaseOutputterSchema
+from .binary_transport import pack_arrays, quantize, delta_encode
 from gnome.persist.base_schema import GeneralGnomeObjectSchema
 from gnome.movers.current_movers import CatsMoverSchema,\
     ComponentMoverSchema, GridCurrentMoverSchema, CurrentCycleMoverSchema,\
@@ -24,6 +25,7 @@ class SpillJsonSchema(BaseOutputterSchema):
     _additional_data = SequenceSchema(
         SchemaNode(String()), missing=drop, save=True, update=True
     )
+    binary = SchemaNode(Boolean(), missing=drop, save=True, update=True)
 
 
 class SpillJsonOutput(Outputter):
@@ -53,20 +55,69 @@ class SpillJsonOutput(Outputter):
             "step_num": <STEP_NUM>
             "timestamp": <TIMESTAMP>
         }
+
+    In binary mode, each item of "certain" and "uncertain" is instead a
+    message made by :func:`gnome.outputters.binary_transport.pack_arrays`:
+    longitude and latitude are int32 in units of 1e-5 degrees relative to
+    an origin chosen at the first step, mass is float32, status_code is uint8,
+    spill_num is uint16 and the element ids are delta encoded.
     '''
     _schema = SpillJsonSchema
 
-    def __init__(self, _additional_data=None, **kwargs):
+    # precision of the positions, in degrees
+    resolution = 1e-5
+
+    def __init__(self, _additional_data=None, binary=False, **kwargs):
         '''
-        :param list current_movers: A list or collection of current grid mover
-                                    objects.
+        :param list _additional_data: names of other data arrays to output
+        :param binary=False: output the data as typed binary buffers
 
         use super to pass optional \*\*kwargs to base class __init__ method
         '''
         self._additional_data =_additional_data if _additional_data else []
+        self.binary = binary
+        self._origin = None
 
         super(SpillJsonOutput, self).__init__(**kwargs)
 
+    def rewind(self):
+        super(SpillJsonOutput, self).rewind()
+        self._origin = None
+
+    def _binary_output(self, sc):
+        '''
+        the data of spill container sc packed in a binary buffer
+        '''
+        position = sc['positions']
+
+        if self._origin is None and len(position) > 0:
+            # the origin is fixed for the run, so positions are in the
+            # same frame from step to step
+            self._origin = tuple(np.round(position[0, :2], 2))
+
+        lon0, lat0 = self._origin if self._origin is not None else (0., 0.)
+        first_id, id_deltas = delta_encode(sc['id'])
+
+        position_attrs = {'scale': self.resolution}
+        arrays = [('longitude',
+                   quantize(position[:, 0], self.resolution, lon0),
+                   dict(position_attrs, origin=lon0)),
+                  ('latitude',
+                   quantize(position[:, 1], self.resolution, lat0),
+                   dict(position_attrs, origin=lat0)),
+                  ('status', sc['status_codes'].astype(np.uint8), None),
+                  ('mass', sc['mass'].astype(np.float32), None),
+                  ('spill_num', sc['spill_num'].astype(np.uint16), None),
+                  ('id', id_deltas, {'first': first_id})]
+
+        for d in self._additional_data:
+            arrays.append((d, sc[d].astype(np.float32), None))
+
+        out = pack_arrays(arrays)
+        out['length'] = len(position)
+
+        return out
+
     def write_output(self, step_num, islast_step=False):
         'dump data in geojson format'
         super(SpillJsonOutput, self).write_output(step_num, islast_step)
@@ -80,7 +131,15 @@ class SpillJsonOutput(Outputter):
         certain_scs = []
         uncertain_scs = []
 
-        for sc in self.cache.load_timestep(step_num).items():
+        for sc in self._load_timestep(step_num).items():
+            if self.binary:
+                if sc.uncertain:
+                    uncertain_scs.append(self._binary_output(sc))
+                else:
+                    certain_scs.append(self._binary_output(sc))
+
+                continue
+
             position = sc['positions']
             longitude = np.around(position[:, 0], 5).tolist()
             latitude = np.around(position[:, 1], 5).tolist()
@@ -124,7 +183,7 @@ class SpillJsonOutput(Outputter):
                        'certain': certain_scs,
                        'uncertain': uncertain_scs}
 
-        if self.output_dir:
+        if self.output_dir and not self.binary:
             output_info['output_filename'] = self.output_to_file(certain_scs,
                                                                  step_num)
             self.output_to_file(uncertain_scs, step_num)
@@ -143,6 +202,7 @@ class CurrentJsonSchema(BaseOutputterSchema):
         ),
         save=True, update=True, save_reference=True
     )
+    binary = SchemaNode(Boolean(), missing=drop, save=True, update=True)
     '''
     Nothing is required for initialization
     '''
@@ -176,20 +236,59 @@ class CurrentJsonOutput(Outputter):
                              }
         }
 
+
+    In binary mode, the value for each mover is a message made by
+    :func:`gnome.outputters.binary_transport.pack_arrays` with magnitude
+    and direction as int16 in hundredths. The center points of the grid
+    the velocities are given for are only in the first message of the run,
+    as float32 'longitude' and 'latitude'.
     '''
     _schema = CurrentJsonSchema
 
-    def __init__(self, current_movers, **kwargs):
+    # precision of magnitude and direction
+    resolution = 0.01
+
+    def __init__(self, current_movers, binary=False, **kwargs):
         '''
         :param list current_movers: A list or collection of current grid mover
                                     objects.
+        :param binary=False: output the data as typed binary buffers
 
         use super to pass optional \*\*kwargs to base class __init__ method
         '''
         self.current_movers = current_movers
+        self.binary = binary
+
+        # ids of the movers whose grid was sent in this run
+        self._grid_sent = set()
 
         super(CurrentJsonOutput, self).__init__(**kwargs)
 
+    def _binary_output(self, cm, magnitude, direction):
+        arrays = []
+
+        if cm.id not in self._grid_sent:
+            centers = np.asarray(cm.get_center_points())
+            if centers.dtype.names:
+                # world points of the cython movers
+                centers = np.column_stack((centers['long'], centers['lat']))
+
+            arrays.append(('longitude', centers[:, 0].astype(np.float32),
+                           None))
+            arrays.append(('latitude', centers[:, 1].astype(np.float32),
+                           None))
+            self._grid_sent.add(cm.id)
+
+        attrs = {'scale': self.resolution}
+        arrays.append(('magnitude',
+                       quantize(magnitude, self.resolution, dtype=np.int16),
+                       attrs))
+        arrays.append(('direction',
+                       quantize(direction, self.resolution, dtype=np.int16),
+                       attrs))
+
+        return pack_arrays(arrays)
+
     def write_output(self, step_num, islast_step=False):
         'dump data in geojson format'
         super(CurrentJsonOutput, self).write_output(step_num, islast_step)
@@ -197,7 +296,7 @@ class CurrentJsonOutput(Outputter):
         if self.on is False or not self._write_step:
             return None
 
-        for sc in self.cache.load_timestep(step_num).items():
+        for sc in self._load_timestep(step_num).items():
             model_time = date_to_sec(sc.current_time_stamp)
 
         json_ = {}
@@ -221,6 +320,10 @@ class CurrentJsonOutput(Outputter):
             direction = np.arctan2(y, x) - np.pi/2
             magnitude = np.sqrt(x**2 + y**2)
 
+            if self.binary:
+                json_[cm.id] = self._binary_output(cm, magnitude, direction)
+                continue
+
             direction = np.round(direction, 2)
             magnitude = np.round(magnitude, 2)
 
@@ -253,6 +356,7 @@ class CurrentJsonOutput(Outputter):
     def rewind(self):
         'remove previously written files'
         super(CurrentJsonOutput, self).rewind()
+        self._grid_sent = set()
 
     def current_movers_to_dict(self):
         '''
@@ -322,7 +426,7 @@ class IceJsonOutput(Outputter):
         if self.on is False or not self._write_step:
             return None
 
-        for sc in self.cache.load_timestep(step_num).items():
+        for sc in self._load_timestep(step_num).items():
             pass
 
         model_time = date_to_sec(sc.current_time_stamp)
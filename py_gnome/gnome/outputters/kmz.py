@@ -6,6 +6,7 @@ import os
 from datetime import timedelta, datetime
 import zipfile
 import base64
+import tempfile
 
 from colander import SchemaNode, String, drop
 
@@ -39,10 +40,16 @@ class KMZOutput(Outputter):
 
     time_formatter = '%m/%d/%Y %H:%M'
 
-    def __init__(self, filename, **kwargs):
+    def __init__(self, filename, stream=True, **kwargs):
         '''
         :param str output_dir=None: output directory for kmz files.
 
+        :param stream=True: write the kml of each step to a temporary file
+            in the output directory as the model runs and zip it at the
+            end. If False, the kml is kept in memory until the last step,
+            which takes memory in proportion to the run length times the
+            number of elements.
+
         uses super to pass optional \*\*kwargs to base class __init__ method
         '''
         # a little check:
@@ -54,6 +61,10 @@ class KMZOutput(Outputter):
         self.filename = filename + ".kmz"
         self.kml_name = os.path.split(filename)[-1] + ".kml"
 
+        self.stream = stream
+        self._kml_file = None
+        self.kml_tmp_filename = None
+
         super(KMZOutput, self).__init__(**kwargs)
 
     def prepare_for_model_run(self,
@@ -103,14 +114,27 @@ class KMZOutput(Outputter):
         # shouldn't be required if the above worked!
         self._file_exists_error(self.filename)
 
-        # create a list to hold what will be the contents of the kml
-        self.kml = [kmz_templates.header_template
-                    .format(caveat=kmz_templates.caveat,
-                            kml_name=self.kml_name,
-                            valid_timestring=model_start_time.strftime(self.time_formatter),
-                            issued_timestring=datetime.now().strftime(self.time_formatter),
-                            )
-                    ]
+        header = (kmz_templates.header_template
+                  .format(caveat=kmz_templates.caveat,
+                          kml_name=self.kml_name,
+                          valid_timestring=model_start_time.strftime(self.time_formatter),
+                          issued_timestring=datetime.now().strftime(self.time_formatter),
+                          ))
+
+        if self.stream:
+            # the kml goes to a file next to the output as the model runs,
+            # so the run can be looked at before it is done
+            fd, self.kml_tmp_filename = tempfile.mkstemp(
+                suffix='.kml',
+                prefix=os.path.splitext(os.path.basename(self.filename))[0],
+                dir=os.path.dirname(os.path.abspath(self.filename)))
+            self._kml_file = os.fdopen(fd, 'wb')
+            self.kml = None
+        else:
+            # create a list to hold what will be the contents of the kml
+            self.kml = []
+
+        self._write_kml(header)
 
         # netcdf outputter has this --  not sure why
         # self._middle_of_run = True
@@ -124,7 +148,7 @@ class KMZOutput(Outputter):
             return None
 
         # add to the kml list:
-        for sc in self.cache.load_timestep(step_num).items():
+        for sc in self._load_timestep(step_num).items():
             # loop through uncertain and certain LEs
             # extract the data
             start_time = sc.current_time_stamp
@@ -141,28 +165,57 @@ class KMZOutput(Outputter):
             water_positions = positions[sc['status_codes'] == oil_status.in_water]
             beached_positions = positions[sc['status_codes'] == oil_status.on_land]
 
-            self.kml.append(kmz_templates.build_one_timestep(water_positions,
-                                                             beached_positions,
-                                                             start_time,
-                                                             end_time,
-                                                             sc.uncertain
-                                                             ))
+            self._write_kml(kmz_templates.build_one_timestep(water_positions,
+                                                            beached_positions,
+                                                            start_time,
+                                                            end_time,
+                                                            sc.uncertain
+                                                            ))
 
         if islast_step:  # now we really write the file:
-            self.kml.append(kmz_templates.footer)
+            self._write_kml(kmz_templates.footer)
 
             with zipfile.ZipFile(self.filename, 'w',
                                  compression=zipfile.ZIP_DEFLATED) as kmzfile:
                 kmzfile.writestr('dot.png', base64.b64decode(DOT))
                 kmzfile.writestr('x.png', base64.b64decode(X))
-                kmzfile.writestr(self.kml_name,
-                                 "".join(self.kml).encode('utf8'))
+
+                if self.stream:
+                    self._kml_file.close()
+                    self._kml_file = None
+
+                    # ZipFile.write() copies the file in chunks
+                    kmzfile.write(self.kml_tmp_filename, self.kml_name)
+                else:
+                    kmzfile.writestr(self.kml_name,
+                                     "".join(self.kml).encode('utf8'))
+
+            self._remove_kml_tmp_file()
 
         output_info = {'time_stamp': sc.current_time_stamp.isoformat(),
                        'output_filename': self.filename}
 
         return output_info
 
+    def _write_kml(self, kml):
+        if self._kml_file is not None:
+            self._kml_file.write(kml.encode('utf8'))
+        else:
+            self.kml.append(kml)
+
+    def _remove_kml_tmp_file(self):
+        if self._kml_file is not None:
+            self._kml_file.close()
+            self._kml_file = None
+
+        if self.kml_tmp_filename is not None:
+            try:
+                os.remove(self.kml_tmp_filename)
+            except OSError:
+                pass
+
+            self.kml_tmp_filename = None
+
     def rewind(self):
         '''
         reset a few parameter and call base class rewind to reset
@@ -186,6 +239,9 @@ class KMZOutput(Outputter):
         except OSError:
             pass  # it must not be there
 
+        # kml of a run that did not finish
+        self._remove_kml_tmp_file()
+
 
 # These icons were encoded by the "build_icons" script
 # (they are base64 encoded 3-pixel sized dots in a 32x32 transparent PNG)
@@ -1,6 +1,8 @@
 """
 templates for the kmz  outputter
 """
+import numpy as np
+
 
 caveat = ("This trajectory was produced by GNOME "
           "(General NOAA Operational Modeling Environment), "
@@ -114,6 +116,23 @@ point_template = """             <Point>
 """
 
 
+# same as point_template, for formatting all the points of a step with a
+# single % operation in format_points()
+point_format = point_template.replace('{:.6f}', '%.6f')
+
+
+def format_points(positions):
+    """
+    kml for all the positions -- the same as formatting point_template for
+    each point, but done in one call
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    if len(positions) == 0:
+        return ""
+
+    return (point_format * len(positions)) % tuple(positions[:, :2].ravel())
+
+
 timestep_header_template = """<Folder>
   <name>{date_string}:{certain}</name>
 """
@@ -164,10 +183,7 @@ def build_one_timestep(floating_positions,
 
         data['status'] = status
         kml.append(one_run_header.format(**data))
-
-        for point in positions:
-            kml.append(point_template.format(*point[:2]))
-
+        kml.append(format_points(positions))
         kml.append(one_run_footer)
 
     kml.append(timestep_footer)
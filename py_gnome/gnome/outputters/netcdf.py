@@ -14,6 +14,7 @@ from colander import SchemaNode, String, drop, Int, Bool
 from gnome import __version__
 from gnome.basic_types import oil_status, world_point_type
 from gnome.persist.extend_colander import FilenameSchema
+from gnome.utilities.nc_particles import ParticleFileReader
 
 
 from . import Outputter, BaseOutputterSchema
@@ -173,6 +174,9 @@ class NetCDFOutputSchema(BaseOutputterSchema):
     _middle_of_run = SchemaNode(
         Bool(), missing=drop, save=True, read_only=True, test_equal=False
     )
+    batch_size = SchemaNode(
+        Int(), missing=drop, save=True, update=True
+    )
 
 
 class NetCDFOutput(Outputter):
@@ -273,6 +277,7 @@ class NetCDFOutput(Outputter):
                  surface_conc="kde",
                  _middle_of_run=False,
                  _start_idx=0,
+                 batch_size=None,
                  **kwargs):
         """
         Constructor for Net_CDFOutput object. It reads data from cache and
@@ -311,6 +316,11 @@ class NetCDFOutput(Outputter):
             final step is written regardless of output_timestep
         :type output_last_step: boolean
 
+        :param batch_size=None: number of output steps to hold in memory
+            before writing them to the file. If None, steps are written once
+            at least chunksize elements are held so each write fills a chunk.
+        :type batch_size: int
+
         use super to pass optional kwargs to base class __init__ method
         """
         self._check_filename(netcdf_filename)
@@ -350,6 +360,16 @@ class NetCDFOutput(Outputter):
         # smaller ones
         # The default in netcdf4 is 1 -- which works really badly
         self._chunksize = 1024
+        self.batch_size = batch_size
+
+        # datasets kept open for the run and the steps that have not been
+        # written to them yet: {filename: [step data, ...]}
+        self._datasets = {}
+        self._pending = {}
+
+        # index in the 'data' dimension of the next element written to
+        # each file
+        self._data_idx = {}
 
         # need to keep track of starting index for writing data since variable
         # number of particles are released
@@ -556,6 +576,7 @@ class NetCDFOutput(Outputter):
         if not self.on:
             return
 
+        self._close_datasets()
         self.clean_output_files()
 
         self._update_var_attributes(spills)
@@ -630,6 +651,11 @@ class NetCDFOutput(Outputter):
                                             shape=('time',),
                                             chunksz=(256,))
 
+            # keep the file open for the rest of the run
+            self._datasets[file_] = nc.Dataset(file_, 'a')
+            self._pending[file_] = []
+            self._data_idx[file_] = 0
+
         # need to keep track of starting index for writing data since variable
         # number of particles are released
         self._start_idx = 0
@@ -698,7 +724,10 @@ class NetCDFOutput(Outputter):
         if self.on is False or not self._write_step:
             return None
 
-        for sc in self.cache.load_timestep(step_num).items():
+        # the uncertain file has as many elements as the forecast file
+        start_idx = self._start_idx
+
+        for sc in self._load_timestep(step_num).items():
             if sc.uncertain and self._u_netcdf_filename is not None:
                 file_ = self._u_netcdf_filename
             else:
@@ -706,47 +735,135 @@ class NetCDFOutput(Outputter):
 
             time_stamp = sc.current_time_stamp
 
-            with nc.Dataset(file_, 'a') as rootgrp:
-                rg_vars = rootgrp.variables
-                idx = len(rg_vars['time'])
+            if file_ not in self._datasets:
+                # resuming a run, for instance from a save file
+                self._datasets[file_] = nc.Dataset(file_, 'a')
+                self._pending[file_] = []
+                self._data_idx[file_] = start_idx
+
+            # buffer the data -- it is written in batches by _flush()
+            data = {}
+            for var_name in self.arrays_to_output:
+                # special case positions:
+                if var_name == 'longitude':
+                    data[var_name] = sc['positions'][:, 0].copy()
+                elif var_name == 'latitude':
+                    data[var_name] = sc['positions'][:, 1].copy()
+                elif var_name == 'depth':
+                    data[var_name] = sc['positions'][:, 2].copy()
+                else:
+                    data[var_name] = np.array(sc[var_name])
 
-                rg_vars['time'][idx] = nc.date2num(time_stamp,
-                                                   rg_vars['time'].units,
-                                                   rg_vars['time'].calendar)
-                pc = rg_vars['particle_count']
-                pc[idx] = len(sc)
+            self._pending[file_].append((time_stamp,
+                                         len(sc),
+                                         data,
+                                         dict(sc.mass_balance),
+                                         self._data_idx[file_]))
 
-                _end_idx = self._start_idx + pc[idx]
+            self._data_idx[file_] += len(sc)
 
-                # add the data:
-                for var_name in self.arrays_to_output:
-                    # special case positions:
-                    if var_name == 'longitude':
-                        rg_vars['longitude'][self._start_idx:_end_idx] = sc['positions'][:, 0]
-                    elif var_name == 'latitude':
-                        rg_vars['latitude'][self._start_idx:_end_idx] = sc['positions'][:, 1]
-                    elif var_name == 'depth':
-                        rg_vars['depth'][self._start_idx:_end_idx] = sc['positions'][:, 2]
-                    else:
-                        rg_vars[var_name][self._start_idx:_end_idx] = sc[var_name]
-
-                # write mass_balance data
-                if sc.mass_balance:
-                    grp = rootgrp.groups['mass_balance']
-                    for key, val in sc.mass_balance.iteritems():
-                        if key not in grp.variables:
-                            self._create_nc_var(grp,
-                                                key, 'float', ('time', ),
-                                                (self._chunksize,)
-                                                )
-                        grp.variables[key][idx] = val
+        # set _start_idx for the next timestep
+        self._start_idx = self._data_idx[self.netcdf_filename]
 
-        self._start_idx = _end_idx  # set _start_idx for the next timestep
+        if islast_step:
+            # nothing more will be written in this run
+            self._close_datasets()
+        elif self._batch_is_full():
+            self._flush()
 
         return {'netcdf_filename': (self.netcdf_filename,
                                     self._u_netcdf_filename),
                 'time_stamp': time_stamp}
 
+    def _batch_is_full(self):
+        'True if the buffered steps should be written to file'
+        pending = self._pending.get(self.netcdf_filename, [])
+
+        if self.batch_size is not None:
+            return len(pending) >= self.batch_size
+
+        return sum([step[1] for step in pending]) >= self._chunksize
+
+    def _flush(self):
+        """
+        write the buffered steps to the open datasets. Each variable is
+        written as one contiguous slab covering all the buffered steps.
+        """
+        for file_, pending in self._pending.iteritems():
+            if len(pending) == 0:
+                continue
+
+            rootgrp = self._datasets[file_]
+            rg_vars = rootgrp.variables
+
+            t_idx = len(rg_vars['time'])
+            t_end = t_idx + len(pending)
+
+            counts = np.array([step[1] for step in pending], dtype=np.int32)
+            start_idx = pending[0][4]
+            end_idx = start_idx + int(counts.sum())
+
+            times = nc.date2num([step[0] for step in pending],
+                                rg_vars['time'].units,
+                                rg_vars['time'].calendar)
+            rg_vars['time'][t_idx:t_end] = times
+            rg_vars['particle_count'][t_idx:t_end] = counts
+
+            if end_idx > start_idx:
+                for var_name in self.arrays_to_output:
+                    rg_vars[var_name][start_idx:end_idx] = \
+                        np.concatenate([step[2][var_name] for step in pending])
+
+            # write mass_balance data
+            mass_balance = [step[3] for step in pending]
+            if any(mass_balance):
+                grp = rootgrp.groups['mass_balance']
+
+                keys = set()
+                for mb in mass_balance:
+                    keys.update(mb.keys())
+
+                for key in keys:
+                    if key not in grp.variables:
+                        self._create_nc_var(grp,
+                                            key, 'float', ('time', ),
+                                            (self._chunksize,)
+                                            )
+
+                    if all([key in mb for mb in mass_balance]):
+                        grp.variables[key][t_idx:t_end] = \
+                            [mb[key] for mb in mass_balance]
+                    else:
+                        for ix, mb in enumerate(mass_balance):
+                            if key in mb:
+                                grp.variables[key][t_idx + ix] = mb[key]
+
+            rootgrp.sync()
+            self._pending[file_] = []
+
+    def _close_datasets(self):
+        'write any buffered data and close the datasets'
+        if self._datasets:
+            self._flush()
+
+        for rootgrp in self._datasets.itervalues():
+            rootgrp.close()
+
+        self._datasets = {}
+        self._pending = {}
+        self._data_idx = {}
+
+    def post_model_run(self):
+        '''
+        write any buffered data and close the NetCDF files
+        '''
+        self._close_datasets()
+
+    def __del__(self):
+        'write the steps of a run that was not completed'
+        if getattr(self, '_datasets', None):
+            self._close_datasets()
+
     def clean_output_files(self):
         '''
         deletes output files that may be around
@@ -768,14 +885,15 @@ class NetCDFOutput(Outputter):
     def rewind(self):
         '''
         reset a few parameter and call base class rewind to reset
-        internal variables.
+        internal variables. The steps of an interrupted run that are still
+        buffered are written to the file first.
         '''
         super(NetCDFOutput, self).rewind()
 
+        self._close_datasets()
         self._middle_of_run = False
         self._start_idx = 0
 
-    # fixme: we should use the code in nc_particles for this!!!
     @classmethod
     def read_data(klass,
                   netcdf_file,
@@ -841,7 +959,7 @@ class NetCDFOutput(Outputter):
 
         arrays_dict = {}
         with nc.Dataset(netcdf_file) as data:
-            _start_ix = 0
+            reader = ParticleFileReader(data)
 
             # first find the index of index in which we are interested
             time_ = data.variables['time']
@@ -857,22 +975,13 @@ class NetCDFOutput(Outputter):
                     index = 0
             else:
                 if time is not None:
-                    time_offset = nc.date2num(time, time_.units,
-                                              calendar=time_.calendar)
-                    if time_offset < 0:
-                        'desired time is before start of model'
-                        index = 0
-                    else:
-                        index = abs(time_[:] - time_offset).argmin()
+                    index = reader.index_of_time(time)
                 elif index is not None:
                     if index < 0:
                         index = len(time_) + index
 
-            for idx in range(index):
-                _start_ix += data.variables['particle_count'][idx]
-
-            _stop_ix = _start_ix + data.variables['particle_count'][index]
-            elem = data.variables['particle_count'][index]
+            _start_ix, _stop_ix = reader.step_range(index)
+            elem = _stop_ix - _start_ix
 
             c_time = nc.num2date(time_[index], time_.units,
                                  calendar=time_.calendar)
@@ -903,26 +1012,27 @@ class NetCDFOutput(Outputter):
                 data_arrays = set(which_data)
 
             # get the data
+            # it's OK if an array is not there, not all standard_arrays
+            # will always be output
+            variables = [name for name in data_arrays
+                         if name in data.variables]
+            if 'positions' in data_arrays:
+                variables.extend(['longitude', 'latitude', 'depth'])
+
+            step_data = reader.get_timestep(index, variables)
+
             for array_name in data_arrays:
                 # special case time and positions:
                 if array_name == 'positions':
                     positions = np.zeros((elem, 3), dtype=world_point_type)
 
-                    positions[:, 0] = \
-                        data.variables['longitude'][_start_ix:_stop_ix]
-                    positions[:, 1] = \
-                        data.variables['latitude'][_start_ix:_stop_ix]
-                    positions[:, 2] = \
-                        data.variables['depth'][_start_ix:_stop_ix]
+                    positions[:, 0] = step_data['longitude']
+                    positions[:, 1] = step_data['latitude']
+                    positions[:, 2] = step_data['depth']
 
                     arrays_dict['positions'] = positions
-                else:
-                    try:
-                        arrays_dict[array_name] = data.variables[array_name][_start_ix:_stop_ix]
-                    except KeyError:
-                        # it's OK if it's not there, not all standard_arrays
-                        # will always be output
-                        pass
+                elif array_name in step_data:
+                    arrays_dict[array_name] = step_data[array_name]
 
             # get mass_balance
             weathering_data = {}
@@ -936,6 +1046,10 @@ class NetCDFOutput(Outputter):
         return (arrays_dict, weathering_data)
 
     def to_dict(self, json_=None):
+        if json_ == 'save' and self._datasets:
+            # make sure file contains all the data written so far
+            self._flush()
+
         dict_ = super(NetCDFOutput, self).to_dict(json_)
         if json_ == 'save':
             dict_['netcdf_filename'] = os.path.join('./', dict_['netcdf_filename'])
@@ -56,6 +56,16 @@ class Outputter(GnomeId):
 
     _surf_conc_computed = False
 
+    # a restarted run is written to new output, only where the outputter is
+    # in its output schedule is checkpointed
+    _checkpoint_attrs = ('_model_start_time', '_dt_since_lastoutput',
+                         '_write_step', '_is_first_output',
+                         '_surf_conc_computed')
+
+    # set to True if the outputter modifies the element data it loads from
+    # the cache -- see _load_timestep()
+    copy_on_write = False
+
     def __init__(self,
                  cache=None,
                  on=True,
@@ -325,6 +335,22 @@ class Outputter(GnomeId):
                 compute_surface_concentration(sc, self.surface_conc)
                 self._surf_conc_computed = True
 
+                # data shared with other outputters is now out of date
+                self.cache.clear_shared()
+
+    def _load_timestep(self, step_num):
+        """
+        Returns the SpillContainerPairData for step_num from the cache.
+
+        The data for a step is loaded once and shared, read-only, by all
+        the outputters that write the step. Outputters that need to modify
+        the data must set copy_on_write = True to get their own copy.
+        """
+        if self.copy_on_write:
+            return self.cache.load_timestep(step_num)
+
+        return self.cache.load_shared_timestep(step_num)
+
     def clean_output_files(self):
         '''
         cleans out the output dir
@@ -398,7 +424,7 @@ class Outputter(GnomeId):
 
         for step_num in range(num_time_steps):
             if (step_num > 0 and step_num < num_time_steps - 1):
-                next_ts = (self.cache.load_timestep(step_num).items()[0].
+                next_ts = (self._load_timestep(step_num).items()[0].
                            current_time_stamp)
                 ts = next_ts - model_time
 
@@ -409,7 +435,7 @@ class Outputter(GnomeId):
 
             self.write_output(step_num, last_step)
 
-            model_time = (self.cache.load_timestep(step_num)
+            model_time = (self._load_timestep(step_num)
                           .items()[0]
                           .current_time_stamp)
 
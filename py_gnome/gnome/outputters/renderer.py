@@ -9,6 +9,7 @@ This one used the new map_canvas, which uses the gd rendering lib.
 import os
 from os.path import basename
 import glob
+import itertools
 
 import numpy as np
 import py_gd
@@ -18,7 +19,9 @@ from colander import SchemaNode, String, drop
 from gnome.basic_types import oil_status
 
 from gnome.utilities.file_tools import haz_files
-from gnome.utilities.map_canvas import MapCanvas
+from gnome.utilities.map_canvas import (MapCanvas, unique_pixels,
+                                        pixel_segments, draw_segments,
+                                        projection_key)
 
 from gnome.utilities import projections
 from gnome.utilities.projections import ProjectionSchema
@@ -31,6 +34,9 @@ from gnome.persist.extend_colander import FilenameSchema
 from . import Outputter, BaseOutputterSchema
 
 
+# versions of the grid layers -- see GridVisLayer.grid
+_layer_versions = itertools.count()
+
 
 class RendererSchema(BaseOutputterSchema):
     # not sure if bounding box needs defintion separate from LongLatBounds
@@ -165,6 +171,9 @@ class Renderer(Outputter, MapCanvas):
         self.map_filename = map_filename
         self.output_dir = output_dir
 
+        # incremented when a layer of the background is replaced
+        self._background_version = 0
+
         if map_filename is not None and land_polygons is None:
             self.land_polygons = haz_files.ReadBNA(map_filename, 'PolygonSet')
         elif land_polygons is not None:
@@ -229,6 +238,9 @@ class Renderer(Outputter, MapCanvas):
         self.grids = []
         self.props = []
 
+        # what the background image was drawn for -- see draw_background()
+        self._background_key = None
+
     @property
     def delay(self):
         return self._delay if 'gif' in self.formats else -1
@@ -237,6 +249,32 @@ class Renderer(Outputter, MapCanvas):
     def delay(self, d):
         self._delay = d
 
+    @property
+    def land_polygons(self):
+        '''
+        the land polygons drawn on the background. If they are changed in
+        place, call draw_background(force=True).
+        '''
+        return self._land_polygons
+
+    @land_polygons.setter
+    def land_polygons(self, polygons):
+        self._land_polygons = polygons
+        self._background_version += 1
+
+    @property
+    def raster_map(self):
+        '''
+        the raster map drawn on the background, if not None. If it is
+        changed in place, call draw_background(force=True).
+        '''
+        return self._raster_map
+
+    @raster_map.setter
+    def raster_map(self, raster_map):
+        self._raster_map = raster_map
+        self._background_version += 1
+
     @property
     def repeat(self):
         return self._repeat if 'gif' in self.formats else False
@@ -391,12 +429,40 @@ class Renderer(Outputter, MapCanvas):
         for name in files:
             os.remove(name)
 
-    def draw_background(self):
+    def _background_state(self):
+        """
+        what the background image depends on: the viewport and the static
+        layers drawn on it
+        """
+        return (projection_key(self.projection),
+                self._background_version,
+                self.draw_map_bounds,
+                self.draw_spillable_area,
+                self.raster_map_fill,
+                self.raster_map_outline,
+                tuple([(g.version, g.on, g.color, g.width)
+                       for g in self.grids]))
+
+    def clear_background(self):
+        super(Renderer, self).clear_background()
+
+        self._background_key = None
+
+    def draw_background(self, force=False):
         """
         Draws the background image -- just land for now
 
         This should be called whenever the scale changes
+
+        The background is only drawn again if the viewport or the layers
+        drawn on it have changed since it was last drawn, or if force is
+        True.
         """
+        state = self._background_state()
+
+        if not force and state == self._background_key:
+            return
+
         # create a new background image
         self.clear_background()
         self.draw_land()
@@ -408,6 +474,8 @@ class Renderer(Outputter, MapCanvas):
         self.draw_tags()
         self.draw_grids()
 
+        self._background_key = state
+
     def add_grid(self, grid, on=True, color='grid_1', width=2):
         layer = GridVisLayer(grid, self.projection, on, color, width)
 
@@ -576,6 +644,20 @@ class Renderer(Outputter, MapCanvas):
         if not self._write_step:
             return None
 
+        image_filename, time_stamp = self._render_frame(step_num,
+                                                        self.formats)
+
+        self.last_filename = image_filename
+
+        return {'image_filename': image_filename,
+                'time_stamp': time_stamp}
+
+    def _render_frame(self, step_num, formats):
+        """
+        draw the frame of step_num and write it in formats
+
+        :returns: (image filename, time stamp of the step)
+        """
         image_filename = os.path.join(self.output_dir,
                                       self.foreground_filename_format.format(step_num))
 
@@ -584,34 +666,19 @@ class Renderer(Outputter, MapCanvas):
         if self.draw_back_to_fore:
             self.copy_back_to_fore()
 
-        # draw prop for self.draw_ontop second so it draws on top
-        scp = self.cache.load_timestep(step_num).items()
-        if len(scp) == 1:
-            self.draw_elements(scp[0])
-        else:
-            if self.draw_ontop == 'forecast':
-                self.draw_elements(scp[1])
-                self.draw_elements(scp[0])
-            else:
-                self.draw_elements(scp[0])
-                self.draw_elements(scp[1])
-
-        time_stamp = scp[0].current_time_stamp
+        time_stamp = self._draw(step_num)
 
         self.draw_timestamp(time_stamp)
         self.draw_props(time_stamp)
 
-        for ftype in self.formats:
+        for ftype in formats:
             if ftype == 'gif':
                 self.animation.add_frame(self.fore_image, self.delay)
             else:
                 image_filename += ftype
                 self.save_foreground(image_filename, file_type=ftype)
 
-        self.last_filename = image_filename
-
-        return {'image_filename': image_filename,
-                'time_stamp': time_stamp}
+        return image_filename, time_stamp
 
     def post_model_run(self):
         """
@@ -628,7 +695,7 @@ class Renderer(Outputter, MapCanvas):
         """
 
         # draw prop for self.draw_ontop second so it draws on top
-        scp = self.cache.load_timestep(step_num).items()
+        scp = self._load_timestep(step_num).items()
         if len(scp) == 1:
             self.draw_elements(scp[0])
         else:
@@ -663,14 +730,30 @@ class Renderer(Outputter, MapCanvas):
 class GridVisLayer(object):
     def __init__(self, grid, projection, on=True,
                  color='grid_1', width=1):
-        self.grid = grid
         self.projection = projection
         self.on = on
-
-        self.lines = self._get_lines(grid)
+        self.grid = grid
         self.color = color
         self.width = width
 
+    @property
+    def grid(self):
+        return self._grid
+
+    @grid.setter
+    def grid(self, grid):
+        '''
+        Each grid set gets a new version, unique to the layer, that the
+        background of the Renderer is keyed on. Call
+        draw_background(force=True) after changing the grid in place.
+        '''
+        self._grid = grid
+        self.lines = self._get_lines(grid)
+        self.version = next(_layer_versions)
+
+        # (projection_key, pixel segments) of the last viewport drawn
+        self._segments = (None, None)
+
     def _get_lines(self, grid):
         if isinstance(grid, Grid_S):
             name = 'node'
@@ -685,6 +768,32 @@ class GridVisLayer(object):
 
             return grid.nodes[grid.edges]
 
+    def _get_segments(self):
+        '''
+        the distinct pixel segments of the grid lines in the current
+        viewport, computed once per viewport
+        '''
+        key = projection_key(self.projection)
+
+        if self._segments[0] != key:
+            lines = self.projection.to_pixel_multipoint(self.lines,
+                                                        asint=True)
+
+            # segments between successive points along the lines
+            start = [lines[:, :-1].reshape(-1, 2)]
+            end = [lines[:, 1:].reshape(-1, 2)]
+
+            if len(lines[0]) > 2:
+                # curvilinear grid; ugrids never have line segments greater
+                # than 2 points
+                start.append(lines[:-1].reshape(-1, 2))
+                end.append(lines[1:].reshape(-1, 2))
+
+            self._segments = (key, pixel_segments(np.vstack(start),
+                                                  np.vstack(end)))
+
+        return self._segments[1]
+
     def draw_to_image(self, img):
         '''
         Draws the grid to the image
@@ -692,17 +801,7 @@ class GridVisLayer(object):
         if not self.on:
             return
 
-        lines = self.projection.to_pixel_multipoint(self.lines, asint=True)
-
-        for l in lines:
-            img.draw_polyline(l, line_color=self.color, line_width=self.width)
-
-        if len(lines[0]) > 2:
-            # curvilinear grid; ugrids never have line segments greater than
-            # 2 points
-            for l in lines.transpose((1, 0, 2)).copy():
-                img.draw_polyline(l, line_color=self.color,
-                                  line_width=self.width)
+        draw_segments(img, self._get_segments(), self.color, self.width)
 
 
 class GridPropVisLayer(object):
@@ -721,6 +820,30 @@ class GridPropVisLayer(object):
         self.width = width
         self.scale = scale
 
+        # (location, start points, 1 / cos(latitude)) of the vectors -- the
+        # grid does not change
+        self._start = None
+
+    def _get_start(self, location):
+        if self._start is None or self._start[0] != location:
+            if location == 'faces':
+                if self.prop.grid.face_coordinates is None:
+                    self.prop.grid.build_face_coordinates()
+                start = self.prop.grid.face_coordinates
+            else:
+                try:
+                    start = self.prop.grid.nodes.reshape(-1, 2)
+                except AttributeError:
+                    start = np.column_stack((self.prop.grid.node_lon,
+                                             self.prop.grid.node_lat))
+
+            start = np.array(start, dtype=np.float64).reshape(-1, 2)
+
+            self._start = (location, start,
+                           1.0 / np.cos(np.deg2rad(start[:, 1])))
+
+        return self._start[1].copy(), self._start[2]
+
     def draw_to_image(self, img, time):
         if not self.on:
             return
@@ -745,32 +868,22 @@ class GridPropVisLayer(object):
         data_u = data_u.reshape(-1)
         data_v = data_v.reshape(-1)
 
-        start = None
-
-        try:
-            start = self.prop.grid.nodes.copy().reshape(-1, 2)
-        except AttributeError:
-            start = np.column_stack((self.prop.grid.node_lon,
-                                     self.prop.grid.node_lat))
-
-        if self.prop.grid.infer_location(data_u) == 'faces':
-            if self.prop.grid.face_coordinates is None:
-                self.prop.grid.build_face_coordinates()
-            start = self.prop.grid.face_coordinates
-
-        if hasattr(data_u, 'mask'):
-            start[data_u.mask] = [0., 0.]
+        start, inv_cos_lat = self._get_start(self.prop.grid
+                                             .infer_location(data_u))
 
         data_u *= self.scale * 8.9992801e-06
         data_v *= self.scale * 8.9992801e-06
-        data_u /= np.cos(np.deg2rad(start[:, 1]))
+        data_u *= inv_cos_lat
+
+        if hasattr(data_u, 'mask'):
+            start[np.ma.getmaskarray(data_u)] = [0., 0.]
 
         end = start.copy()
         end[:, 0] += data_u
         end[:, 1] += data_v
 
         if hasattr(data_u, 'mask'):
-            end[data_u.mask] = [0., 0.]
+            end[np.ma.getmaskarray(data_u)] = [0., 0.]
 
         bounds = self.projection.image_box
 
@@ -786,13 +899,8 @@ class GridPropVisLayer(object):
         start = self.projection.to_pixel_multipoint(start, asint=True)
         end = self.projection.to_pixel_multipoint(end, asint=True)
 
-        img.draw_dots(start, diameter=self.size, color=self.color)
-
-        line = np.array([[0., 0.], [0., 0.]])
+        img.draw_dots(unique_pixels(start), diameter=self.size,
+                      color=self.color)
 
-        for i in xrange(0, len(start)):
-            line[0] = start[i]
-            line[1] = end[i]
-            img.draw_polyline(line,
-                              line_color=self.color,
-                              line_width=self.width)
+        draw_segments(img, pixel_segments(start, end),
+                      self.color, self.width)
@@ -5,8 +5,8 @@ import os
 import zipfile
 
 from colander import SchemaNode, Boolean, drop
-import shapefile as shp
 from gnome.persist.extend_colander import FilenameSchema
+from gnome.utilities.point_shapefile import PointShapefileWriter
 
 
 from .outputter import Outputter, BaseOutputterSchema
@@ -30,6 +30,16 @@ class ShapeOutput(Outputter):
 
     time_formatter = '%m/%d/%Y %H:%M'
 
+    # (name, type, size, decimal) of the attribute columns -- the size and
+    # decimal are the pyshp defaults the files have always been written with
+    fields = [('Time', 'C', 50, 0),
+              ('LE id', 'N', 50, 0),
+              ('Depth', 'N', 50, 0),
+              ('Mass', 'N', 50, 0),
+              ('Age', 'N', 50, 0),
+              ('Surf_Conc', 'F', 50, 0),
+              ('Status_Code', 'N', 50, 0)]
+
     def __init__(self, filename, zip_output=True, surface_conc="kde",
                  **kwargs):
         '''
@@ -47,6 +57,9 @@ class ShapeOutput(Outputter):
 
         self.zip_output = zip_output
 
+        self.w = None
+        self.w_u = None
+
         surface_conc = "kde"  # force this, as it will try!
         super(ShapeOutput, self).__init__(surface_conc=surface_conc, **kwargs)
 
@@ -104,17 +117,10 @@ class ShapeOutput(Outputter):
                      ',PRIMEM["Greenwich",0],'
                      'UNIT["degree",0.0174532925199433]]')
 
+        # the records of each step are written to the files as the model
+        # runs; they are only zipped at the end
         for sc in self.sc_pair.items():
-            w = shp.Writer(shp.POINT)
-            w.autobalance = 1
-
-            w.field('Time', 'C')
-            w.field('LE id', 'N')
-            w.field('Depth', 'N')
-            w.field('Mass', 'N')
-            w.field('Age', 'N')
-            w.field('Surf_Conc', 'F')
-            w.field('Status_Code', 'N')
+            w = PointShapefileWriter(self._shapefile_name(sc), self.fields)
 
             if sc.uncertain:
                 self.w_u = w
@@ -129,7 +135,7 @@ class ShapeOutput(Outputter):
         if not self.on or not self._write_step:
             return None
 
-        for sc in self.cache.load_timestep(step_num).items():
+        for sc in self._load_timestep(step_num).items():
             self._record_shape_entries(sc)
 
             if islast_step:
@@ -146,28 +152,26 @@ class ShapeOutput(Outputter):
         return output_info
 
     def _record_shape_entries(self, sc):
+        '''
+        write the records for all the elements of the step in one block
+        '''
         curr_time = sc.current_time_stamp
         writer = self._get_shape_writer(sc)
+        positions = sc['positions']
 
-        for k, p in enumerate(sc['positions']):
-            writer.point(p[0], p[1])
+        if sc.uncertain:
+            surf_conc = 0.0
+        else:
+            surf_conc = sc['surface_concentration']
 
-            if sc.uncertain:
-                writer.record(curr_time.strftime('%Y-%m-%dT%H:%M:%S'),
-                              sc['id'][k],
-                              p[2],
-                              sc['mass'][k],
-                              sc['age'][k],
-                              0.0,
-                              sc['status_codes'][k])
-            else:
-                writer.record(curr_time.strftime('%Y-%m-%dT%H:%M:%S'),
-                              sc['id'][k],
-                              p[2],
-                              sc['mass'][k],
-                              sc['age'][k],
-                              sc['surface_concentration'][k],
-                              sc['status_codes'][k])
+        writer.write(positions[:, 0], positions[:, 1],
+                     [curr_time.strftime('%Y-%m-%dT%H:%M:%S'),
+                      sc['id'],
+                      positions[:, 2],
+                      sc['mass'],
+                      sc['age'],
+                      surf_conc,
+                      sc['status_codes']])
 
     def _get_shape_writer(self, spill_container):
         if spill_container.uncertain:
@@ -175,15 +179,17 @@ class ShapeOutput(Outputter):
         else:
             return self.w
 
-    def _save_and_archive_shapefiles(self, sc):
-        writer = self._get_shape_writer(sc)
-
+    def _shapefile_name(self, sc):
         if sc.uncertain:
-            filename = self.filename + '_uncert'
+            return self.filename + '_uncert'
         else:
-            filename = self.filename
+            return self.filename
+
+    def _save_and_archive_shapefiles(self, sc):
+        writer = self._get_shape_writer(sc)
+        filename = self._shapefile_name(sc)
 
-        writer.save(filename)
+        writer.close()
 
         prj_file = open('{}.prj'.format(filename), "w")
         prj_file.write(self.epsg)
@@ -221,8 +227,16 @@ class ShapeOutput(Outputter):
 
         here in case it needs to be called from elsewhere
         '''
-        try:
-            os.remove(self.filename + '.zip')
-            os.remove(self.filename + '_uncert.zip')
-        except OSError:
-            pass  # it must not be there
+        # files of a run that did not finish
+        for writer in (self.w, self.w_u):
+            if writer is not None:
+                writer.close()
+
+        self.w = self.w_u = None
+
+        for filename in (self.filename, self.filename + '_uncert'):
+            for suf in ['zip', 'shp', 'prj', 'dbf', 'shx']:
+                try:
+                    os.remove(filename + '.' + suf)
+                except OSError:
+                    pass  # it must not be there
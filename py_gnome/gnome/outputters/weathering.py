@@ -76,7 +76,7 @@ class WeatheringOutput(Outputter):
 
         # return a dict - json of the mass_balance data
         # weathering outputter should only apply to forecast spill_container
-        sc = self.cache.load_timestep(step_num).items()[0]
+        sc = self._load_timestep(step_num).items()[0]
 
         dict_ = {}
         dict_.update(sc.mass_balance)
@@ -6,6 +6,7 @@ import collections
 import os
 import json
 import tempfile
+from operator import attrgetter
 
 from colander import (SchemaNode, deferred, drop, required, Invalid,
                       UnsupportedFields,
@@ -16,6 +17,7 @@ from extend_colander import NumpyFixedLenSchema
 
 from gnome.gnomeobject import Refs, class_from_objtype
 from gnome.persist.extend_colander import OrderedCollectionType
+from gnome.persist.zip_members import ZipMember, registered
 from gnome.utilities.geometry.polygons import PolygonSet
 
 log = logging.getLogger(__name__)
@@ -407,6 +409,11 @@ class ObjType(SchemaType):
         zipfile is an open zipfile.Zipfile in append mode
         returns the name of the file in the archive
         '''
+        data_members = registered(zipfile_)
+        if data_members is not None:
+            # saving with store_data: uncompressed and deduplicated
+            return data_members.add(raw_path)
+
         d_fname = os.path.split(raw_path)[1]
 
         # add datafile to zip archive
@@ -533,15 +540,9 @@ class ObjType(SchemaType):
         if isinstance(saveloc, zipfile.ZipFile):
             dirname = os.path.dirname(saveloc.fp.name)
 
-            # Keep an eye on this. It may cause previously existing files
-            # to be recognized incorrectly as what's in the zip since it's a
-            # simple existence check
-            if not os.path.exists(os.path.join(dirname, filename)):
-                saveloc.extract(filename, dirname)
-
-                return os.path.join(dirname, filename)
-            else:
-                return os.path.join(dirname, filename)
+            # a file that is there already is used if its size and CRC are
+            # those of the member, otherwise it is replaced
+            return ZipMember(saveloc, filename).extract(dirname)
         elif os.path.exists(os.path.join(saveloc, filename)):
             return os.path.join(saveloc, filename)
         elif os.path.exists(filename):
@@ -628,6 +629,29 @@ class ObjTypeSchema(MappingSchema):
 
     name = SchemaNode(String())
 
+    # shared instances of the schema classes, see instance()
+    _instances = {}
+
+    @classmethod
+    def instance(cls):
+        '''
+        Returns an instance of this schema class that is shared by all
+        callers. Building a schema tree is expensive, and serializing a
+        model asks for the schema of every object several times, so use
+        this instead of creating a new instance unless the schema is going
+        to be changed.
+
+        The instance, and the node lists and accessors cached on it, must
+        not be modified.
+        '''
+        # keyed by class so subclasses get their own instance
+        schema = ObjTypeSchema._instances.get(cls)
+
+        if schema is None:
+            schema = ObjTypeSchema._instances[cls] = cls()
+
+        return schema
+
     def __init__(self, *args, **kwargs):
         super(ObjTypeSchema, self).__init__(*args, **kwargs)
 
@@ -713,21 +737,84 @@ class ObjTypeSchema(MappingSchema):
         directly.
 
         If attr is 'all' it just returns a list of all child node names
+
+        The lists are computed once per schema instance; do not modify the
+        list that is returned.
         '''
-        if attr == 'all':
-            return [n.name for n in self.children]
-        else:
-            # sequences need to be taken into account. If present they will
-            # considered to always have 'save' and 'update' as true,
-            # read as false,
-            return [n.name for n in self.children
-                    if hasattr(n, attr) and getattr(n, attr)]
+        cache = self._cache('nodes_by_attr')
+
+        if attr not in cache:
+            if attr == 'all':
+                cache[attr] = [n.name for n in self.children]
+            else:
+                # sequences need to be taken into account. If present they
+                # will considered to always have 'save' and 'update' as true,
+                # read as false,
+                cache[attr] = [n.name for n in self.children
+                               if hasattr(n, attr) and getattr(n, attr)]
+
+        return cache[attr]
+
+    def get(self, name, default=None):
+        '''
+        child node called name - same as colander's get() but uses a dict
+        built the first time it is called instead of searching the children
+        '''
+        cache = self._cache('children')
+
+        if len(cache) == 0:
+            cache.update([(c.name, c) for c in self.children])
+
+        return cache.get(name, default)
+
+    def get_attrs(self, obj, attr='all'):
+        '''
+        Returns a dict of the attributes of obj that have the schema
+        attribute attr set (see get_nodes_by_attr) - this is the body of
+        GnomeId.to_dict().
+
+        The attributes are read with an operator.attrgetter built once for
+        each attr.
+        '''
+        getters = self._cache('attr_getters')
+
+        if attr not in getters:
+            names = tuple(self.get_nodes_by_attr(attr))
+
+            if len(names) == 0:
+                getter = lambda obj: ()
+            elif len(names) == 1:
+                # attrgetter returns the value, not a tuple, for one name
+                getter = lambda obj, _g=attrgetter(names[0]): (_g(obj),)
+            else:
+                getter = attrgetter(*names)
+
+            getters[attr] = (names, getter)
+
+        names, getter = getters[attr]
+
+        return dict(zip(names, getter(obj)))
+
+    def _cache(self, name):
+        '''
+        dict for caching things computed from the children. It is emptied
+        if the children change, e.g. when colander clones the node.
+        '''
+        children, caches = self.__dict__.get('_caches', (None, None))
+
+        if (children is not self.children or
+                caches['num_children'] != len(children)):
+            caches = {'num_children': len(self.children)}
+            self.__dict__['_caches'] = (self.children, caches)
+
+        return caches.setdefault(name, {})
 
     @staticmethod
     def register_refs(node, subappstruct, refs):
         if (node.schema_type in (Sequence, OrderedCollectionType) and
                 isinstance(node.children[0], ObjTypeSchema)):
-            [subitem._schema.register_refs(subitem._schema(), subitem, refs)
+            [subitem._schema.register_refs(subitem._schema.instance(),
+                                           subitem, refs)
              for subitem in subappstruct]
 
         if not isinstance(node, ObjTypeSchema) or subappstruct is None:
@@ -737,8 +824,9 @@ class ObjTypeSchema(MappingSchema):
             refs[subappstruct.id] = subappstruct
 
         names = node.get_nodes_by_attr('all')
+        schema = subappstruct._schema.instance()
         for n in names:
-            subappstruct._schema.register_refs(subappstruct._schema().get(n),
+            subappstruct._schema.register_refs(schema.get(n),
                                                getattr(subappstruct, n), refs)
 
     @staticmethod
@@ -841,7 +929,7 @@ class GeneralGnomeObjectSchema(ObjTypeSchema):
 
         for s in self.acceptable_schemas:
             if schema is s or issubclass(schema, s):
-                return schema()
+                return schema.instance()
 
         raise TypeError('This type of object {} is not supported. '
                         'Schema: {}'
@@ -0,0 +1,408 @@
+'''
+Checkpoint and restart of a running Model
+
+Model.save() only writes the configuration of a model: the state reached
+mid-run (the elements, the mass balance, where the weatherers and the
+outputters are in their schedules...) is lost, so a run has to start again
+from the model start time to get back to where it was.
+
+write_checkpoint() writes this state to a folder:
+
+    - checkpoint.json: a small manifest with the model step, the state of
+      the random number generators and the state of the spills, movers,
+      weatherers and outputters
+    - one .npy file per data array of each spill container, written raw so
+      they are memory mapped (copy on write) when the checkpoint is read,
+      rather than read and parsed
+
+The files are written under temporary names and moved in place, so a
+model restarted from a folder can checkpoint to the same folder while its
+data arrays are still mapped from the files being replaced.
+
+read_checkpoint() restores the state into a model that has the same
+configuration and has been set up for a run - Model.restart() does both.
+
+The state of an object is the instance attributes named in its
+_checkpoint_attrs: the attributes that change as the model runs, holding
+"plain" data - numbers, strings, datetimes, numpy arrays and lists, tuples
+and dicts of these. The configuration is not saved, it is the one of the
+model being restarted, and neither are references to other objects - they
+are set up again by the model. Sub-objects whose state is saved with it are
+named in _checkpoint_children (see GnomeId).
+
+What is not captured:
+
+    - the state of the C++ random number generator and of the C++ movers
+      (eg: the uncertainty of the wind and current movers). A model with a
+      random_seed does not use the former for the elements.
+    - the output already written: the outputters are set up again when
+      restarting and write the steps after the checkpoint, with their
+      output schedule restored.
+'''
+import os
+import json
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import six
+
+MANIFEST = 'checkpoint.json'
+FORMAT_VERSION = 1
+
+# arrays with at most this many values are written in the manifest
+INLINE_SIZE = 64
+
+
+def replace_file(tmp, path):
+    '''
+    move the file tmp to path. On POSIX systems, the file that was at path
+    is unlinked rather than overwritten, so arrays of a restarted model that
+    are still memory mapped from it keep their data
+    '''
+    if os.name == 'nt' and os.path.exists(path):
+        # os.rename cannot replace a file on Windows
+        os.remove(path)
+
+    os.rename(tmp, path)
+
+
+def is_plain(value):
+    '''
+    True if value can be written to a checkpoint: scalars, strings,
+    datetimes, numpy arrays that do not hold objects, and lists, tuples and
+    dicts of these
+    '''
+    if value is None or isinstance(value, (bool, six.integer_types, float,
+                                           six.string_types, datetime,
+                                           timedelta)):
+        return True
+
+    if isinstance(value, np.ndarray):
+        return (type(value) is np.ndarray and
+                value.dtype.kind in 'biufcSUMm')
+
+    if isinstance(value, np.generic):
+        return value.dtype.kind in 'biufSUMm'
+
+    if isinstance(value, (list, tuple)):
+        return all(is_plain(v) for v in value)
+
+    if isinstance(value, dict):
+        return all(is_plain(k) and is_plain(v)
+                   for k, v in six.iteritems(value))
+
+    return False
+
+
+class ArrayStore(object):
+    '''
+    encodes values for the json manifest, writing the large arrays to .npy
+    files in folder - and decodes them back
+    '''
+    def __init__(self, folder):
+        self.folder = folder
+        self._count = 0
+
+    def write_array(self, array, name=None):
+        '''
+        write array to its own .npy file. The file is written under a
+        temporary name and then moved in place - see replace_file()
+
+        :returns: the name of the file, relative to the folder
+        '''
+        if name is None:
+            name = 'array_{0}'.format(self._count)
+            self._count += 1
+
+        filename = name + '.npy'
+        path = os.path.join(self.folder, filename)
+
+        with open(path + '.tmp', 'wb') as outfile:
+            np.save(outfile, np.ascontiguousarray(array))
+
+        replace_file(path + '.tmp', path)
+
+        return filename
+
+    def read_array(self, filename, mmap=False):
+        '''
+        read an array written by write_array. If mmap is True, the file is
+        memory mapped copy on write: its pages are only read when used and
+        changes are not written back to it
+        '''
+        path = os.path.join(self.folder, filename)
+
+        if mmap:
+            try:
+                return np.asarray(np.load(path, mmap_mode='c'))
+            except ValueError:
+                # empty arrays cannot be memory mapped
+                pass
+
+        return np.load(path)
+
+    def encode(self, value):
+        '''
+        json serializable form of the plain value
+        '''
+        if isinstance(value, np.ndarray):
+            if value.size <= INLINE_SIZE and value.dtype.kind in 'biuf':
+                return {'__array__': value.tolist(),
+                        'dtype': value.dtype.str,
+                        'shape': value.shape}
+
+            return {'__array__': self.write_array(value)}
+
+        if isinstance(value, np.generic):
+            return {'__scalar__': self.encode(value.item()),
+                    'dtype': value.dtype.str}
+
+        if isinstance(value, datetime):
+            return {'__datetime__': value.isoformat()}
+
+        if isinstance(value, timedelta):
+            return {'__timedelta__': (value.days, value.seconds,
+                                      value.microseconds)}
+
+        if isinstance(value, tuple):
+            return {'__tuple__': [self.encode(v) for v in value]}
+
+        if isinstance(value, list):
+            return [self.encode(v) for v in value]
+
+        if isinstance(value, dict):
+            return {'__dict__': [(self.encode(k), self.encode(v))
+                                 for k, v in six.iteritems(value)]}
+
+        return value
+
+    def decode(self, obj):
+        '''
+        value encoded by encode()
+        '''
+        if isinstance(obj, list):
+            return [self.decode(v) for v in obj]
+
+        if six.PY2 and isinstance(obj, six.text_type):
+            # json gives unicode - give back the str that was written
+            try:
+                return obj.encode('ascii')
+            except UnicodeEncodeError:
+                return obj
+
+        if not isinstance(obj, dict):
+            return obj
+
+        if '__array__' in obj:
+            data = obj['__array__']
+            if isinstance(data, six.string_types):
+                return self.read_array(data)
+
+            return np.array(data,
+                            dtype=np.dtype(str(obj['dtype']))
+                            ).reshape(obj['shape'])
+
+        if '__scalar__' in obj:
+            return np.dtype(str(obj['dtype'])).type(
+                self.decode(obj['__scalar__']))
+
+        if '__datetime__' in obj:
+            value = obj['__datetime__']
+            fmt = ('%Y-%m-%dT%H:%M:%S.%f' if '.' in value
+                   else '%Y-%m-%dT%H:%M:%S')
+
+            return datetime.strptime(value, fmt)
+
+        if '__timedelta__' in obj:
+            return timedelta(*obj['__timedelta__'])
+
+        if '__tuple__' in obj:
+            return tuple(self.decode(v) for v in obj['__tuple__'])
+
+        if '__dict__' in obj:
+            return dict((self.decode(k), self.decode(v))
+                        for k, v in obj['__dict__'])
+
+        raise ValueError('unknown value in checkpoint: {0}'.format(obj))
+
+
+def object_state(obj, store):
+    '''
+    the plain instance attributes of obj named in its _checkpoint_attrs,
+    and the state of its _checkpoint_children
+    '''
+    attrs = {}
+    for name in getattr(obj, '_checkpoint_attrs', ()):
+        if name in obj.__dict__ and is_plain(obj.__dict__[name]):
+            attrs[name] = store.encode(obj.__dict__[name])
+
+    children = {}
+    for name in getattr(obj, '_checkpoint_children', ()):
+        child = getattr(obj, name, None)
+        if child is not None:
+            children[name] = object_state(child, store)
+
+    return {'class': obj.__class__.__name__,
+            'attrs': attrs,
+            'children': children}
+
+
+def set_object_state(obj, state, store):
+    '''
+    restore the state returned by object_state(). The attributes are set
+    directly in the instance __dict__ so property setters are not invoked.
+    '''
+    if obj.__class__.__name__ != state['class']:
+        raise ValueError('checkpoint is for a {0}, not a {1}'
+                         .format(state['class'], obj.__class__.__name__))
+
+    for name, value in six.iteritems(state['attrs']):
+        obj.__dict__[str(name)] = store.decode(value)
+
+    for name, child_state in six.iteritems(state['children']):
+        set_object_state(getattr(obj, name), child_state, store)
+
+
+def _collection_state(objs, store):
+    return [object_state(obj, store) for obj in objs]
+
+
+def _set_collection_state(objs, states, store, what):
+    objs = list(objs)
+
+    if len(objs) != len(states):
+        raise ValueError('checkpoint has {0} {1}, the model has {2}'
+                         .format(len(states), what, len(objs)))
+
+    for obj, state in zip(objs, states):
+        set_object_state(obj, state, store)
+
+
+def write_checkpoint(model, folder):
+    '''
+    write the current state of model to folder, which is created if it does
+    not exist. The manifest is written last so a folder with a manifest
+    always holds a complete checkpoint.
+
+    :returns: the folder
+    '''
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    store = ArrayStore(folder)
+
+    containers = []
+    for i, sc in enumerate(model.spills.items()):
+        data_arrays = {}
+        for name in sc.data_arrays:
+            data_arrays[name] = store.write_array(sc[name],
+                                                  'sc{0}_{1}'.format(i, name))
+
+        containers.append({
+            'uncertain': sc.uncertain,
+            'current_time_stamp': store.encode(sc.current_time_stamp),
+            'data_arrays': data_arrays,
+            'mass_balance': store.encode(sc.mass_balance),
+            'spills': _collection_state(sc.spills, store),
+        })
+
+    manifest = {
+        'version': FORMAT_VERSION,
+        'model': {'start_time': store.encode(model.start_time),
+                  'current_time_step': model.current_time_step,
+                  'time_step': model.time_step,
+                  'num_time_steps': model.num_time_steps,
+                  'random_seed': model.random_seed},
+        'random_state': {'numpy': store.encode(np.random.get_state()),
+                         'python': store.encode(random.getstate())},
+        'spill_containers': containers,
+        'movers': _collection_state(model.movers, store),
+        'weatherers': _collection_state(model.weatherers, store),
+        'weatherer_ids': [w.id for w in model.weatherers],
+        'outputters': _collection_state(model.outputters, store),
+    }
+
+    manifest_file = os.path.join(folder, MANIFEST)
+    with open(manifest_file + '.tmp', 'w') as outfile:
+        json.dump(manifest, outfile)
+
+    replace_file(manifest_file + '.tmp', manifest_file)
+
+    return folder
+
+
+def read_checkpoint(model, folder):
+    '''
+    restore the state written by write_checkpoint() into model. The model
+    must have the configuration of the model that was checkpointed and be
+    set up for a run (Model.setup_model_run()).
+
+    :param folder: the checkpoint folder, or its manifest file
+
+    :returns: the model step of the checkpoint
+    '''
+    if os.path.isfile(folder):
+        folder = os.path.dirname(folder)
+
+    with open(os.path.join(folder, MANIFEST)) as infile:
+        manifest = json.load(infile)
+
+    if manifest['version'] > FORMAT_VERSION:
+        raise ValueError('checkpoint format version {0} is not supported'
+                         .format(manifest['version']))
+
+    store = ArrayStore(folder)
+    model_state = manifest['model']
+
+    for name in ('start_time', 'time_step', 'random_seed'):
+        value = store.decode(model_state[name])
+        if value != getattr(model, name):
+            raise ValueError('checkpoint is for a model with {0}={1}'
+                             .format(name, value))
+
+    containers = list(model.spills.items())
+    if len(containers) != len(manifest['spill_containers']):
+        raise ValueError('checkpoint is for a model with uncertain={0}'
+                         .format(len(manifest['spill_containers']) > 1))
+
+    _set_collection_state(model.movers, manifest['movers'], store, 'movers')
+    _set_collection_state(model.weatherers, manifest['weatherers'], store,
+                          'weatherers')
+    _set_collection_state(model.outputters, manifest['outputters'], store,
+                          'outputters')
+
+    # the response systems keep their totals in the mass balance under
+    # their id, which is not the id of the weatherer in this model
+    new_ids = dict(zip(manifest.get('weatherer_ids', []),
+                       [w.id for w in model.weatherers]))
+
+    for sc, sc_state in zip(containers, manifest['spill_containers']):
+        _set_collection_state(sc.spills, sc_state['spills'], store,
+                              'spills')
+
+        data_arrays = {}
+        for name, filename in six.iteritems(sc_state['data_arrays']):
+            data_arrays[str(name)] = store.read_array(filename, mmap=True)
+
+        # the arrays are adopted into new buffers when elements are released
+        sc._data_arrays = data_arrays
+        sc._buffers = {}
+        sc._active_index = None
+        sc._blob_index = None
+        sc.reset_fate_dataview()
+        sc.clear_fate_masks()
+
+        mass_balance = store.decode(sc_state['mass_balance'])
+        if 'systems' in mass_balance:
+            mass_balance['systems'] = dict(
+                (new_ids.get(k, k), v)
+                for k, v in six.iteritems(mass_balance['systems']))
+
+        sc.mass_balance = mass_balance
+        sc.current_time_stamp = store.decode(sc_state['current_time_stamp'])
+
+    np.random.set_state(store.decode(manifest['random_state']['numpy']))
+    random.setstate(store.decode(manifest['random_state']['python']))
+
+    return model_state['current_time_step']
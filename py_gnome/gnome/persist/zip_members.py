@@ -0,0 +1,304 @@
+'''
+Supporting data files in save files
+
+By default the data files of a save file (the netCDF files of the currents,
+winds and grids, the bna files of the maps...) are deflated into the zip
+archive and extracted again, whole, when the save file is loaded. For
+large netCDF files, which are usually compressed already, this costs
+minutes of compression for little gain, and loading doubles the disk
+space they use.
+
+When saving with store_data=True, the data files are instead written by
+DataMembers:
+
+    - files larger than STORE_THRESHOLD, and files that are compressed
+      formats already, are written with ZIP_STORED, so their bytes are
+      copied as they are
+    - a file is written once however many objects refer to it, or under
+      whatever name: members are deduplicated by content hash
+
+When loading, the objects are given paths to their data files, so
+ZipMember.extract() writes each member to the folder of the archive --
+once: a member that is there already, with the same size and CRC, is not
+written again. A stored member is copied straight from its offset in the
+archive rather than through the zipfile module.
+'''
+import os
+import struct
+import shutil
+import hashlib
+import tempfile
+import weakref
+import zipfile
+import zlib
+
+from gnome.persist.checkpoint import replace_file
+
+# files at least this large (in bytes) are not compressed
+STORE_THRESHOLD = 1 << 20
+
+# extensions of formats that do not compress further
+COMPRESSED_EXTENSIONS = ('.nc', '.nc4', '.cdf', '.grb', '.grib', '.grb2',
+                         '.gz', '.bz2', '.zip', '.png', '.jpg')
+
+_chunk_size = 1 << 20
+
+# ZipFile -> DataMembers, for archives being written with store_data
+_registry = weakref.WeakKeyDictionary()
+
+
+def file_digest(filename):
+    '''
+    sha1 hex digest and crc32 of the contents of filename
+    '''
+    sha = hashlib.sha1()
+    crc = 0
+
+    with open(filename, 'rb') as infile:
+        chunk = infile.read(_chunk_size)
+
+        while chunk:
+            sha.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            chunk = infile.read(_chunk_size)
+
+    return sha.hexdigest(), crc & 0xffffffff
+
+
+def file_crc(filename):
+    '''
+    crc32 of the contents of filename, as in the zip info of a member
+    '''
+    crc = 0
+
+    with open(filename, 'rb') as infile:
+        chunk = infile.read(_chunk_size)
+
+        while chunk:
+            crc = zlib.crc32(chunk, crc)
+            chunk = infile.read(_chunk_size)
+
+    return crc & 0xffffffff
+
+
+class DataMembers(object):
+    '''
+    writes the supporting data files of a save file, uncompressed if
+    they are large and once per content
+    '''
+    def __init__(self, zipfile_, threshold=STORE_THRESHOLD):
+        '''
+        :param zipfile_: zipfile.ZipFile open for writing
+        :param threshold=STORE_THRESHOLD: size in bytes from which data
+            files are stored uncompressed
+        '''
+        self.zipfile = zipfile_
+        self.threshold = threshold
+
+        # content hash -> name in the archive
+        self.members = {}
+
+    def register(self):
+        '''
+        use this to write the data files of self.zipfile
+        '''
+        _registry[self.zipfile] = self
+
+        return self
+
+    def compress_type(self, filename):
+        if (os.path.getsize(filename) >= self.threshold or
+                filename.lower().endswith(COMPRESSED_EXTENSIONS)):
+            return zipfile.ZIP_STORED
+
+        return zipfile.ZIP_DEFLATED
+
+    def add(self, raw_path):
+        '''
+        add the file raw_path to the archive if its contents are not in it
+        already
+
+        :returns: the name of the member with the contents of raw_path
+        '''
+        digest, crc = file_digest(raw_path)
+
+        if digest in self.members:
+            return self.members[digest]
+
+        arcname = os.path.split(raw_path)[1]
+        names = self.zipfile.namelist()
+
+        if arcname in names:
+            info = self.zipfile.getinfo(arcname)
+
+            if (info.CRC == crc and
+                    info.file_size == os.path.getsize(raw_path)):
+                # written by a previous save to this archive
+                self.members[digest] = arcname
+
+                return arcname
+
+            # another file of the same name
+            arcname = '{0}_{1}'.format(digest[:8], arcname)
+
+        if arcname not in names:
+            self.zipfile.write(raw_path, arcname,
+                               compress_type=self.compress_type(raw_path))
+
+        self.members[digest] = arcname
+
+        return arcname
+
+
+def registered(zipfile_):
+    '''
+    the DataMembers writing the data files of zipfile_, or None if they
+    are written the default way
+    '''
+    try:
+        return _registry.get(zipfile_)
+    except TypeError:
+        return None
+
+
+class ZipMember(object):
+    '''
+    a member of a zip archive, copied in place if it is stored uncompressed
+    '''
+    # the fixed part of a local file header
+    _local_header = struct.Struct('<4s2B4HL2L2H')
+
+    def __init__(self, zipfile_, name):
+        '''
+        :param zipfile_: open zipfile.ZipFile
+        :param name: name of the member
+        '''
+        self.zipfile = zipfile_
+        self.name = name
+        self.info = zipfile_.getinfo(name)
+        self._offset = None
+
+    @property
+    def size(self):
+        return self.info.file_size
+
+    @property
+    def stored(self):
+        return self.info.compress_type == zipfile.ZIP_STORED
+
+    @property
+    def archive(self):
+        '''
+        path of the archive, or None if it is not a file on disk
+        '''
+        filename = self.zipfile.filename
+
+        if filename is not None and os.path.isfile(filename):
+            return filename
+
+        return None
+
+    @property
+    def offset(self):
+        '''
+        offset of the data of the member in the archive
+        '''
+        if self._offset is None:
+            fp = self.zipfile.fp
+            position = fp.tell()
+
+            try:
+                fp.seek(self.info.header_offset)
+                header = self._local_header.unpack(
+                    fp.read(self._local_header.size))
+            finally:
+                fp.seek(position)
+
+            if header[0] != zipfile.stringFileHeader:
+                raise zipfile.BadZipfile('Bad local header for {0}'
+                                         .format(self.name))
+
+            # file name and extra field lengths
+            self._offset = (self.info.header_offset +
+                            self._local_header.size +
+                            header[-2] + header[-1])
+
+        return self._offset
+
+    def is_extracted(self, path):
+        '''
+        True if the file at path has the contents of the member
+        '''
+        return (os.path.isfile(path) and
+                os.path.getsize(path) == self.size and
+                file_crc(path) == self.info.CRC)
+
+    def _open(self):
+        'open the member for reading'
+        if self.stored and self.archive is not None:
+            return _MemberFile(self.archive, self.offset, self.size)
+
+        return self.zipfile.open(self.name)
+
+    def extract(self, dirname):
+        '''
+        extract the member to dirname, unless it is there already
+
+        The member is written to a temporary file that then replaces the
+        file at its path (see replace_file()), so a stale file is never
+        partly overwritten.
+
+        :returns: path of the extracted file
+        '''
+        path = os.path.join(dirname, self.name)
+
+        if self.is_extracted(path):
+            return path
+
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                        prefix=os.path.basename(path) + '.',
+                                        suffix='.part')
+        try:
+            src = self._open()
+            try:
+                with os.fdopen(fd, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, _chunk_size)
+            finally:
+                src.close()
+
+            replace_file(tmp_path, path)
+            tmp_path = None
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return path
+
+
+class _MemberFile(object):
+    '''
+    read only file object for a range of bytes of a file
+    '''
+    def __init__(self, filename, offset, size):
+        self.size = size
+
+        self._file = open(filename, 'rb')
+        self._file.seek(offset)
+        self._pos = 0
+
+    def read(self, n=-1):
+        remaining = self.size - self._pos
+
+        if n is None or n < 0 or n > remaining:
+            n = remaining
+
+        data = self._file.read(n)
+        self._pos += len(data)
+
+        return data
+
+    def close(self):
+        self._file.close()
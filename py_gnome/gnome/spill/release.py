@@ -111,6 +111,8 @@ class Release(GnomeId):
     """
     _schema = BaseReleaseSchema
 
+    _checkpoint_attrs = ('num_released', 'start_time_invalid')
+
     def __init__(self,
                  release_time=None,
                  num_elements=0,
@@ -230,6 +232,9 @@ class PointLineRelease(Release):
     """
     _schema = PointLineReleaseSchema
 
+    _checkpoint_attrs = Release._checkpoint_attrs + ('_next_release_pos',
+                                                     '_delta_pos')
+
     def __init__(self,
                  release_time=None,
                  start_position=None,
@@ -648,6 +653,10 @@ class PointLineRelease(Release):
 class ContinuousRelease(Release):
     _schema = ContinuousReleaseSchema
 
+    # the initial and the continuous releases count their own elements
+    _checkpoint_attrs = ('initial_done', 'num_initial_released')
+    _checkpoint_children = ('initial_release', 'continuous')
+
     def __init__(self,
                  release_time=None,
                  start_position=None,
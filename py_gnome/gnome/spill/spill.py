@@ -210,6 +210,10 @@ class Spill(BaseSpill):
 
     valid_vol_units = _valid_units('Volume')
     valid_mass_units = _valid_units('Mass')
+
+    # the release knows how many elements it has released
+    _checkpoint_children = ('release',)
+
     # attributes that need to be there for the __setattr__ magic to work
     # release = None  # just to make sure it's there.
     # element_type = None
@@ -29,6 +29,7 @@ from gnome.array_types import (positions,
                                default_array_types)
 
 from gnome.utilities.orderedcollection import OrderedCollection
+from gnome.utilities.blobs import BlobIndex
 import gnome.spill
 from gnome import AddLogger
 from gnome.exceptions import GnomeRuntimeError
@@ -51,6 +52,102 @@ from gnome.exceptions import GnomeRuntimeError
 #                                 'spills'])
 
 
+class FateMasks(object):
+    '''
+    The fate categories of the elements of a spill container.
+
+    'status_codes', 'fate_status', the depth and 'mass' are combined into
+    one byte per element and unpacked to a bit matrix in a single pass;
+    the masks and indices of every fate, and the mass balance partitions,
+    are then read from that instead of being recomputed from the data
+    arrays each time one of them is needed.
+    '''
+    # bits of the code
+    _fate_bits = 0x3f
+    _has_mass = 6
+    _floating = 7
+
+    def __init__(self, sc):
+        self.fate_status = sc['fate_status']
+        self.status_codes = sc['status_codes']
+        self.mass = sc['mass']
+
+        # bits 0-5: 'fate_status', 6: mass > 0, 7: in water, on the surface
+        code = self.fate_status & self._fate_bits
+        code |= (self.mass > 0.0).view(np.uint8) << self._has_mass
+        code |= (((self.status_codes == oil_status.in_water) &
+                  (sc['positions'][:, 2] == 0.0)).view(np.uint8)
+                 << self._floating)
+        self.code = code
+
+        # column 7 - n holds bit n of the code
+        self._bits = np.unpackbits(code[:, np.newaxis], axis=1).view(bool)
+
+        self._masks = {}
+        self._indices = {}
+
+    def __len__(self):
+        return len(self.code)
+
+    def is_valid(self, sc):
+        '''
+        False if the data arrays of sc were reallocated since the masks were
+        computed. Changes to the values must be signaled with
+        SpillContainer.clear_fate_masks()
+        '''
+        return (sc['fate_status'] is self.fate_status and
+                sc['mass'] is self.mass and
+                len(sc) == len(self))
+
+    def _bit(self, n):
+        return self._bits[:, 7 - n]
+
+    def __getitem__(self, fate):
+        '''
+        mask of the elements with 'mass' > 0 that have the given fate. The
+        fate is a name in gnome.basic_types.fate or 'all'
+        '''
+        if fate not in self._masks:
+            if fate == 'all':
+                mask = self._bit(self._has_mass)
+            else:
+                bit = int(np.log2(getattr(bt_fate, fate)))
+                mask = self._bit(bit) & self._bit(self._has_mass)
+
+            self._masks[fate] = mask
+
+        return self._masks[fate]
+
+    def index(self, fate):
+        '''
+        indices of the elements in the mask for fate
+        '''
+        if fate not in self._indices:
+            self._indices[fate] = np.flatnonzero(self[fate])
+
+        return self._indices[fate]
+
+    def partitions(self):
+        '''
+        sums of 'mass' for the mass balance: 'floating' (in water on the
+        surface), 'non_weathering', 'beached' and 'off_maps', in one
+        bincount over the combinations of these categories
+        '''
+        segment = self._bit(self._floating).astype(np.intp)
+        segment += 2 * ((self.code & self._fate_bits) == bt_fate.non_weather)
+        segment += 4 * (self.status_codes == oil_status.on_land)
+        segment += 8 * (self.status_codes == oil_status.off_maps)
+
+        sums = np.bincount(segment, weights=self.mass, minlength=16)
+        bins = np.arange(16)
+
+        return dict([(name, sums[(bins & flag) > 0].sum())
+                     for name, flag in (('floating', 1),
+                                        ('non_weathering', 2),
+                                        ('beached', 4),
+                                        ('off_maps', 8))])
+
+
 class FateDataView(AddLogger):
     _dicts_ = ('surface_weather', 'subsurf_weather', 'skim', 'burn',
                'disperse', 'non_weather', 'all')
@@ -66,45 +163,76 @@ class FateDataView(AddLogger):
         # properties of old LEs and properties of newly released LEs
         self.all = {}
 
+        # for each fate: index of the elements of the view in the SC arrays,
+        # the arrays as they were gathered, and the names of the arrays
+        # asked for since the last update_sc()
+        self._index = {}
+        self._gathered = {}
+        self._requested = {}
+        self.clear_masks()
+
+    def clear_masks(self):
+        self._masks = None
+
+    def get_masks(self, sc):
+        '''
+        the FateMasks of sc, computed once for all the fates and kept until
+        the fate_status or mass of the elements change
+        '''
+        if self._masks is None or not self._masks.is_valid(sc):
+            self._masks = FateMasks(sc)
+
+        return self._masks
+
     def _get_fate_mask(self, sc, fate):
         '''
         get fate_status mask over SC - only include LEs with 'mass' > 0.0
         '''
-        if fate == 'all':
-            # look at all fate data
-            w_mask = np.asarray([True] * len(sc))
-        else:
-            w_mask = (sc['fate_status'] & getattr(bt_fate, fate) ==
-                      getattr(bt_fate, fate))
-
-        w_mask = np.logical_and(w_mask, sc['mass'] > 0.0)
-        return w_mask
+        return self.get_masks(sc)[fate]
 
-    def _set_data(self, sc, array_types, fate_mask, fate_status):
+    def _set_data(self, sc, array_types, fate_status):
         '''
         Set the data arrays in the FateDataView
-        
-        fate_mask is the data already masked for the desired 'fate' option
 
-        fate_status is the status the mask is for ('surface_weather', etc.)
+        The elements of the fate are gathered with their index, and only the
+        arrays in array_types that the view does not hold yet are gathered.
+        The arrays already in the view are kept as long as the index of the
+        fate has not changed.
+
+        fate_status is the status the data is for ('surface_weather', etc.)
         '''
-        # # return all data associated with substance
-        # if 'substance' in sc:
-        #     fate_mask = np.logical_and(sc['substance'] == self.substance_id,
-        #                                fate_mask)
+        masks = self.get_masks(sc)
+        index = masks.index(fate_status)
+        data = getattr(self, fate_status)
 
-        if np.all(fate_mask):
+        if len(index) == len(sc):
             # no need to make a copy of array
             setattr(self, fate_status, sc._data_arrays)
-        else:
-            dict_to_update = getattr(self, fate_status)
-            for at in array_types:
-                array = sc._array_name(at)
+            self._index[fate_status] = None
+
+            return
 
-                if array not in dict_to_update:
-                    dict_to_update[array] = sc[array][fate_mask]
+        if (data is sc._data_arrays or
+                not np.array_equal(self._index.get(fate_status), index)):
+            # elements were released, moved to another fate... outside of
+            # this view, so gather the data again
+            data = {}
+            self._index[fate_status] = index
+            self._gathered[fate_status] = {}
 
-            setattr(self, fate_status, dict_to_update)
+        gathered = self._gathered[fate_status]
+        requested = self._requested.setdefault(fate_status, set())
+
+        for at in array_types:
+            array = sc._array_name(at)
+
+            if array not in data:
+                data[array] = sc[array].take(index, axis=0)
+                gathered[array] = data[array]
+
+            requested.add(array)
+
+        setattr(self, fate_status, data)
 
     def get_data(self, sc, array_types, fate_status='surface_weather'):
         '''
@@ -116,61 +244,77 @@ class FateDataView(AddLogger):
         '''
         # always add 'id' to array_types
         array_types.add('id')
-        self._set_data(sc,
-                       array_types,
-                       self._get_fate_mask(sc, fate_status),
-                       fate_status)
+        self._set_data(sc, array_types, fate_status)
+
         return getattr(self, fate_status)
 
     def update_sc(self, sc, fate_status='surface_weather'):
         '''
         update SC arrays with FateDataView arrays for specified fate
-        - update all arrays just to make sure everything is in sync
 
-        After update, remove LEs with mass = 0. Since weatherers call this at
-        the end of a weathering step, this ensures zero mass LEs are removed
-        from the arrays.
+        Only the arrays that were asked for since the last update, or that
+        were replaced in the view, are written back - the others are
+        unchanged copies.
+
+        After update, remove LEs with mass = 0 or that changed fate from the
+        view. Since weatherers call this at the end of a weathering step,
+        this ensures zero mass LEs are removed from the arrays. The rows of
+        these LEs are dropped from the arrays of the view, and its index,
+        rather than gathering the view again.
 
         .. note:: the 'id' of each LE corresponds with the index into SC array
                   when it was added. if LEs are removed, then this will not be
-                  the case. Do not rely on this indexing. Instead, get the mask
-                  again - the assumption is that the fate_mask should be the
-                  same between getting the data and resync'ing the original arrays
-                  in the SC
+                  the case. Do not rely on this indexing. The view keeps the
+                  index of its elements in the SC arrays, so it must not be
+                  used across a release or a split of the elements.
         '''
         d_to_sync = getattr(self, fate_status)
 
-        if d_to_sync is sc._data_arrays:
+        # mass and fate_status may change
+        self.clear_masks()
+
+        if d_to_sync is sc._data_arrays or len(d_to_sync) == 0:
+            # the data was changed in place
             return
 
-        w_mask = self._get_fate_mask(sc, fate_status)
-
-        # if 'substance' in sc:
-        #     w_mask = np.logical_and(sc['substance'] == self.substance_id,
-        #                             w_mask)
-
-        # if fate_status of LEs was updated, then reset data attribute. This is
-        # because the data in the attribute is no longer valid. For instance,
-        # if the 'burn' started with 'surface_weather' data_arrays, then
-        # marked some of these LEs to be burned, they should no longer be
-        # contained in the 'surface_weather' dict - easiest to reset the dict
-        # and let it be recreated when the next weatherer asks for data.
-        reset_view = False
-        if ('fate_status' in d_to_sync and
-                np.any(sc['fate_status'][w_mask] != d_to_sync['fate_status'])):
-            reset_view = True
-        elif ('mass' in d_to_sync and
-              np.any(np.isclose(d_to_sync['mass'], 0))):
-            # probably need a threshold close to 0.0 as opposed to equality
-            reset_view = True
-            self.logger.debug(self._pid + "found LEs with 'mass' equal to 0. "
-                              "reset_view")
+        index = self._index[fate_status]
+        gathered = self._gathered[fate_status]
+        requested = self._requested.pop(fate_status, set())
+
+        # if fate_status of LEs was updated, they can now be in the views of
+        # other fates, which have to be gathered again.
+        fate_changed = ('fate_status' in d_to_sync and
+                        np.any(sc['fate_status'][index] !=
+                               d_to_sync['fate_status']))
 
         for key, val in d_to_sync.iteritems():
-            sc[key][w_mask] = val
+            if key in requested or gathered.get(key) is not val:
+                sc[key][index] = val
+
+        # LEs that are no longer in this view
+        keep = np.ones((len(index),), dtype=bool)
+        if 'mass' in d_to_sync:
+            keep &= d_to_sync['mass'] > 0.0
+
+        if fate_changed and fate_status != 'all':
+            bit = getattr(bt_fate, fate_status)
+            keep &= (d_to_sync['fate_status'] & bit) == bit
+
+        if not np.all(keep):
+            self.logger.debug(self._pid + "removing {0} LEs from the {1} view"
+                              .format(len(keep) - keep.sum(), fate_status))
 
-        if reset_view:
-            setattr(self, fate_status, {})
+            for key in d_to_sync.keys():
+                d_to_sync[key] = d_to_sync[key][keep]
+                gathered[key] = d_to_sync[key]
+
+            self._index[fate_status] = index[keep]
+
+        if fate_changed:
+            for other in self._dicts_:
+                if other not in (fate_status, 'all'):
+                    setattr(self, other, {})
+                    self._index.pop(other, None)
 
     def _reset_fatedata(self, sc, ix):
         '''
@@ -178,12 +322,19 @@ class FateDataView(AddLogger):
         '''
         for fate in self._dicts_:
             data = getattr(self, fate)
-            if len(data) > 0:
+            if len(data) > 0 and data is not sc._data_arrays:
                 idx = np.where(data['id'] == ix)[0]
                 if len(idx) > 0:
-                    self._set_data(sc, data.keys(),
-                                   self._get_fate_mask(sc, fate),
-                                   fate)
+                    # gather the arrays again into the same dict
+                    names = data.keys()
+                    data.clear()
+
+                    index = self.get_masks(sc).index(fate)
+                    for name in names:
+                        data[name] = sc[name].take(index, axis=0)
+
+                    self._index[fate] = index
+                    self._gathered[fate] = dict(data)
 
 
 class SpillContainerData(object):
@@ -222,6 +373,10 @@ class SpillContainerData(object):
         self._data_arrays = data_arrays
         self.current_time_stamp = None
         self.mass_balance = {}
+
+        # gnome.utilities.rand.RandomStreams set by the Model if it has a
+        # random_seed; otherwise the global random generators are used
+        self.random_streams = None
         self.substance = None
 
         # following internal variable is used when comparing two SpillContainer
@@ -304,7 +459,8 @@ class SpillContainerData(object):
             'compare dict not including _data_arrays'
             if isinstance(val, dict):
                 val_is_dict.append(key)
-            elif key == '_substances_spills' or key == '_fate_data_view':
+            elif key in ('_substances_spills', '_fate_data_view',
+                         '_active_index', '_blob_index'):
                 '''
                 this is just another view of the data - no need to write extra
                 code to check equality for this
@@ -314,7 +470,12 @@ class SpillContainerData(object):
                 return False
 
         # check key, val that are dicts
+        # '_buffers' is only the preallocated storage backing _data_arrays;
+        # its capacity can differ even if the data is the same
         for item in val_is_dict:
+            if item == '_buffers':
+                continue
+
             if set(self.__dict__[item]) != set(other.__dict__[item]):
                 # dicts should contain the same keys
                 return False
@@ -392,6 +553,9 @@ class SpillContainer(AddLogger, SpillContainerData):
     positions = spill_container['positions'] : returns a (num_LEs, 3) array of
     world_point_types
     """
+    # smallest buffer allocated for a data array once elements are released
+    _min_capacity = 16
+
     def __init__(self, uncertain=False):
         super(SpillContainer, self).__init__(uncertain=uncertain)
         self.spills = OrderedCollection(dtype=gnome.spill.spill.BaseSpill)
@@ -423,6 +587,15 @@ class SpillContainer(AddLogger, SpillContainerData):
         self._array_types = default_array_types.copy()
         self._data_arrays = {}
 
+        # preallocated storage backing each data array - see _reserve()
+        self._buffers = {}
+
+        # index of elements that are in_water - see update_active_index()
+        self._active_index = None
+
+        # elements grouped by release - see blob_index
+        self._blob_index = None
+
 
     def _reset__substances_spills(self):
         ## Most of this not needed
@@ -457,6 +630,20 @@ class SpillContainer(AddLogger, SpillContainerData):
         # for viewer in self._fate_data_list:
         #     viewer.reset()
 
+    def fate_masks(self):
+        '''
+        return the FateMasks of the elements, computed once until the
+        'fate_status' or 'mass' of the elements change
+        '''
+        return self._fate_data_view.get_masks(self)
+
+    def clear_fate_masks(self):
+        '''
+        call this after changing 'fate_status' or 'mass' directly in the
+        data arrays, rather than through the FateDataView
+        '''
+        self._fate_data_view.clear_masks()
+
     def _set_substancespills(self):
         '''
         _substances could change when spills are added/deleted
@@ -641,6 +828,60 @@ class SpillContainer(AddLogger, SpillContainerData):
                     self._append_array_types(spill.get_initializer(name).
                                              array_types)
 
+    def _initial_capacity(self):
+        '''
+        Number of elements to presize the data arrays for. Each spill that is
+        on knows how many elements it will release over the run, so use the
+        sum of these so continuous releases do not need to grow the arrays.
+        '''
+        capacity = 0
+        for spill in self.spills:
+            if not spill.on:
+                continue
+            try:
+                num = spill.num_elements
+            except AttributeError:
+                continue
+
+            if num:
+                capacity += int(num)
+
+        return capacity
+
+    def _reserve(self, name, num_elements):
+        '''
+        return the buffer that backs data array 'name' making sure it has
+        room for at least num_elements. The data array, self._data_arrays[name],
+        is always a view of the first len(self) elements of this buffer.
+
+        If capacity is exceeded, the buffer grows geometrically (doubles) so
+        repeated releases only copy the data O(log N) times. If the data array
+        was replaced by something other than a view of the buffer (for eg:
+        __setitem__), then the new array is adopted into a new buffer.
+        '''
+        data = self._data_arrays[name]
+        buf = self._buffers.get(name)
+
+        if (buf is not None and
+                (data is buf or data.base is buf) and
+                len(buf) >= num_elements):
+            return buf
+
+        capacity = len(buf) if buf is not None else 0
+        capacity = max(num_elements, 2 * capacity, self._min_capacity)
+
+        new_buf = np.empty((capacity,) + data.shape[1:], dtype=data.dtype)
+        new_buf[:len(data)] = data
+        self._buffers[name] = new_buf
+
+        return new_buf
+
+    def _set_length(self, name, buf, num_elements):
+        '''
+        expose the first num_elements of buf as the data array 'name'
+        '''
+        self._data_arrays[name] = buf[:num_elements]
+
     def _append_data_arrays(self, num_released):
         """
         initialize data arrays once spill has spawned particles
@@ -648,6 +889,9 @@ class SpillContainer(AddLogger, SpillContainerData):
 
         :param int num_released: number of particles released
 
+        The new elements are written into the spare capacity of the buffer
+        backing each data array - the existing elements are only copied if
+        the buffer needs to grow.
         """
         for name, atype in self._array_types.iteritems():
             # initialize all arrays even if 0 length
@@ -665,7 +909,11 @@ class SpillContainer(AddLogger, SpillContainerData):
                                             initial_value=tuple([0] * self._oil_comp_array_len))
             else:
                 a_append = atype.initialize(num_released)
-            self._data_arrays[name] = np.r_[self._data_arrays[name], a_append]
+
+            num = len(self._data_arrays[name])
+            buf = self._reserve(name, num + num_released)
+            buf[num:num + num_released] = a_append
+            self._set_length(name, buf, num + num_released)
 
     # def _set_substance_array(self, subs_idx, num_rel_by_substance):
     #     '''
@@ -837,6 +1085,62 @@ class SpillContainer(AddLogger, SpillContainerData):
         self.initialize_data_arrays()
         self.mass_balance = {}  # reset to empty dict
 
+    @property
+    def active_index(self):
+        '''
+        Index of elements that are in_water - these are the only elements
+        the movers need to process. Returns slice(None) if all elements are
+        active so movers can use views instead of copies of the data arrays.
+
+        This is computed by update_active_index() which the Model calls in
+        move_elements() after elements are refloated. It is invalidated
+        whenever the number of elements changes.
+        '''
+        if self._active_index is None:
+            return self.update_active_index()
+
+        return self._active_index
+
+    def update_active_index(self):
+        '''
+        recompute the index of active (in_water) elements
+
+        :returns: the new active_index
+        '''
+        active = np.where(self['status_codes'] == oil_status.in_water)[0]
+        if len(active) == len(self):
+            self._active_index = slice(None)
+        else:
+            self._active_index = active
+
+        return self._active_index
+
+    @property
+    def blob_index(self):
+        '''
+        BlobIndex grouping the elements by ('spill_num', 'age') - elements
+        released together from the same spill form a blob. Age increases by
+        the same amount for all elements so the grouping only changes when
+        elements are released, split or removed; it is invalidated in these
+        cases and rebuilt lazily.
+        '''
+        if self._blob_index is None:
+            self._blob_index = BlobIndex(self['age'], self['spill_num'])
+
+        return self._blob_index
+
+    def get_blob_index(self, fate_status='surface_weather'):
+        '''
+        return the BlobIndex for the elements in the FateDataView for the
+        given fate_status - the blob ids correspond with the data returned by
+        substancefatedata()/itersubstancedata() for the same fate_status
+        '''
+        view = self._get_fatedataview()
+        if getattr(view, fate_status) is self._data_arrays:
+            return self.blob_index
+
+        return self.blob_index.subset(view._get_fate_mask(self, fate_status))
+
     def get_spill_mask(self, spill):
         return self['spill_num'] == self.spills.index(spill)
 
@@ -905,7 +1209,7 @@ class SpillContainer(AddLogger, SpillContainerData):
         # 'substance' data_array may have been added so initialize after
         # _set_substancespills() is invoked
         self._set_substancespills()
-        self.initialize_data_arrays()
+        self.initialize_data_arrays(self._initial_capacity())
 
         # fixme: maybe better to let map do this, but it does not have a
         #       prepare_for_model_run() yet so can't do it there
@@ -914,12 +1218,17 @@ class SpillContainer(AddLogger, SpillContainerData):
         self.mass_balance['beached'] = 0.0
         self.mass_balance['off_maps'] = 0.0
 
-    def initialize_data_arrays(self):
+    def initialize_data_arrays(self, capacity=0):
         """
         initialize_data_arrays() is called without input data during rewind
         and prepare_for_model_run to define all data arrays.
         At this time the arrays are empty.
+
+        :param capacity=0: number of elements to preallocate storage for.
+            The data arrays are still empty, but releasing up to capacity
+            elements does not require the arrays to be reallocated.
         """
+        self._buffers = {}
         for name, atype in self._array_types.iteritems():
             # Initialize data_arrays with 0 elements
             # fixme: is every array type with None shape neccesarily
@@ -932,6 +1241,10 @@ class SpillContainer(AddLogger, SpillContainerData):
             else:
                 self._data_arrays[name] = atype.initialize_null()
 
+            if capacity > 0:
+                buf = self._reserve(name, capacity)
+                self._set_length(name, buf, 0)
+
     def release_elements(self, time_step, model_time):
         """
         Called at the end of a time step
@@ -983,6 +1296,10 @@ class SpillContainer(AddLogger, SpillContainerData):
 
         # reset fate_data_view at each step - do it after release elements
         self.reset_fate_dataview()
+        if total_rel > 0:
+            self._active_index = None
+            self._blob_index = None
+
         return total_rel
 
         # substance index - used label elements from same substance
@@ -1066,11 +1383,18 @@ class SpillContainer(AddLogger, SpillContainerData):
             raise
 
         for name, at in self.array_types.iteritems():
-            data = self[name]
             split_elems = at.split_element(num, self[name][idx], l_frac)
-            data = np.insert(data, idx, split_elems[:-1], 0)
-            data[idx + len(split_elems) - 1] = split_elems[-1]
-            self._data_arrays[name] = data
+
+            # shift the elements after idx into the spare capacity of the
+            # buffer instead of reallocating the whole array with np.insert
+            n_elems = len(self[name])
+            buf = self._reserve(name, n_elems + num - 1)
+            buf[idx + num:n_elems + num - 1] = buf[idx + 1:n_elems].copy()
+            buf[idx:idx + num] = split_elems
+            self._set_length(name, buf, n_elems + num - 1)
+
+        self._active_index = None
+        self._blob_index = None
 
         # update fate_dataview which contains this LE
         # for now we only have one type of substance
@@ -1090,9 +1414,19 @@ class SpillContainer(AddLogger, SpillContainerData):
                                  oil_status.to_be_removed)[0]
 
         if len(to_be_removed) > 0:
+            keep = np.ones(len(self), dtype=bool)
+            keep[to_be_removed] = False
+            n_keep = np.count_nonzero(keep)
+
             for key in self._array_types.keys():
-                self._data_arrays[key] = np.delete(self[key], to_be_removed,
-                                                   axis=0)
+                # compact in place so the buffer's capacity is retained
+                kept = self[key][keep]
+                buf = self._reserve(key, n_keep)
+                buf[:n_keep] = kept
+                self._set_length(key, buf, n_keep)
+
+            self._active_index = None
+            self._blob_index = None
 
     def __str__(self):
         return ('gnome.spill_container.SpillContainer\n'
@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+
+"""
+Caching, background solving and interpolation of TAMOC plume solutions
+
+A near-field plume solve takes tens of seconds, and TamocSpill re-runs it
+every tamoc_interval, even though the release parameters and the ambient
+profile often have not changed, or have changed by less than the model
+can resolve. This module provides the pieces TamocSpill uses to avoid
+that:
+
+    - solve_key() makes a hashable key of the release parameters and the
+      ambient profile, with the floating point values rounded to a number
+      of significant digits, and the state of the input files.
+    - SolveCache is a (thread safe) LRU cache of solutions by key.
+    - PlumeSolver is a background thread that solves plumes while the
+      model goes on stepping with the previous solution.
+    - DropletTable interpolates the solution between solutions computed at
+      a grid of values of some of the release parameters.
+
+A solution is the (droplets, dissolved components) pair returned by
+TamocSpill._run_tamoc(). Nothing in here needs tamoc itself.
+"""
+
+import os
+import copy
+import threading
+import Queue
+from collections import OrderedDict
+
+import numpy as np
+
+
+def _quantize(value, digits):
+    '''
+    hashable version of value, floats rounded to digits significant digits
+    '''
+    if isinstance(value, dict):
+        return tuple([(k, _quantize(value[k], digits))
+                      for k in sorted(value)])
+
+    if isinstance(value, (list, tuple)):
+        return tuple([_quantize(v, digits) for v in value])
+
+    if isinstance(value, np.ndarray):
+        return (value.shape,
+                tuple([_quantize(v, digits) for v in value.ravel().tolist()]))
+
+    if isinstance(value, (float, np.floating)):
+        return float('{0:.{1}g}'.format(float(value), digits))
+
+    if isinstance(value, np.generic):
+        return value.item()
+
+    return value
+
+
+def _file_state(path):
+    '''
+    (path, modification time, size) of a file, or None if it is not one
+    '''
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+
+    return (os.path.abspath(path), stat.st_mtime, stat.st_size)
+
+
+def solve_key(parameters, digits=4, files=()):
+    '''
+    key identifying the plume solution for a set of parameters
+
+    :param parameters: the tamoc_parameters of a TamocSpill
+    :param digits=4: number of significant digits the floating point
+        parameters, including the ambient velocity profiles, are rounded to
+    :param files=(): paths of the input files the solution depends on,
+        like the ctd file. They are identified by their modification time
+        and size, so editing one of them gives another key.
+    '''
+    return ((_quantize(parameters, digits),) +
+            tuple([_file_state(f) for f in files]))
+
+
+class SolveCache(object):
+    '''
+    least recently used cache of plume solutions by solve_key()
+    '''
+    def __init__(self, max_size=16):
+        '''
+        :param max_size=16: number of solutions kept
+        '''
+        self.max_size = max_size
+
+        self._solutions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._solutions)
+
+    def __contains__(self, key):
+        return key in self._solutions
+
+    def get(self, key):
+        '''
+        the solution for key, or None if it is not in the cache
+        '''
+        with self._lock:
+            try:
+                solution = self._solutions.pop(key)
+            except KeyError:
+                return None
+
+            self._solutions[key] = solution
+
+            return solution
+
+    def put(self, key, solution):
+        with self._lock:
+            self._solutions.pop(key, None)
+            self._solutions[key] = solution
+
+            while len(self._solutions) > max(self.max_size, 1):
+                self._solutions.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._solutions.clear()
+
+
+class PlumeSolver(threading.Thread):
+    """
+    Background thread that solves plumes.
+
+    Jobs are (key, solve, parameters) tuples, solve(parameters) returning
+    the solution. Solutions are put in the cache, and kept until they are
+    collected with wait(); so are the exceptions raised by solve, which
+    wait() raises again.
+    """
+    def __init__(self, cache):
+        super(PlumeSolver, self).__init__(name='PlumeSolver')
+        self.daemon = True
+
+        self.cache = cache
+        self.jobs = Queue.Queue()
+
+        self._cond = threading.Condition()
+        self._pending = set()
+        self._done = {}     # key: (solution, error)
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            (key, solve, parameters) = job
+            solution = error = None
+            try:
+                solution = solve(parameters)
+                self.cache.put(key, solution)
+            except Exception, excp:
+                error = excp
+
+            with self._cond:
+                self._pending.discard(key)
+                self._done[key] = (solution, error)
+                self._cond.notify_all()
+
+    def stop(self):
+        self.jobs.put(None)
+
+    def shutdown(self):
+        '''
+        stop the thread once the jobs submitted are done, and wait for it
+        '''
+        self.stop()
+
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+
+    def submit(self, key, solve, parameters):
+        '''
+        solve the plume for parameters, unless it is being solved already
+        '''
+        with self._cond:
+            if key in self._pending or key in self._done:
+                return
+
+            self._pending.add(key)
+
+        self.jobs.put((key, solve, parameters))
+
+    def done(self, key):
+        with self._cond:
+            return key in self._done
+
+    def wait(self, key):
+        '''
+        wait for the solution for key, which must have been submitted
+
+        :returns: the solution
+        '''
+        with self._cond:
+            while key not in self._done:
+                if key not in self._pending:
+                    # collected already by another waiter
+                    solution = self.cache.get(key)
+                    if solution is None:
+                        raise KeyError('no plume solve submitted for {0}'
+                                       .format(key))
+                    return solution
+
+                self._cond.wait()
+
+            solution, error = self._done.pop(key)
+
+        if error is not None:
+            raise error
+
+        return solution
+
+
+class DropletTable(object):
+    '''
+    Interpolates plume solutions on a grid of values of some of the release
+    parameters, instead of solving the plume for every value.
+
+    The solutions at the grid nodes are computed as they are needed, or
+    all at once by precompute(), and cached. A lookup interpolates
+    multilinearly between the solutions at the corners of the grid cell
+    the parameters are in: the mass flux, radius, density and position of
+    each droplet, and the mass flux and position of each dissolved
+    component. Parameters outside of the grid are clamped to its edges.
+    If the corner solutions do not have the same number of droplets,
+    the solution at the nearest corner is used instead.
+    '''
+    _droplet_attrs = ('mass_flux', 'radius', 'density', 'position')
+    _dissolved_attrs = ('mass_flux', 'position')
+
+    def __init__(self, axes, solve, cache=None, digits=4, files=()):
+        '''
+        :param axes: dict of parameter name: values at which it is solved
+        :param solve: function returning the solution for a dict of
+            parameters
+        :param cache=None: SolveCache for the solutions at the nodes
+        :param digits=4: significant digits of the solve_key()
+        :param files=(): input files of the solve_key()
+        '''
+        self.axes = OrderedDict([(name, np.sort(np.asarray(values,
+                                                           dtype=np.float64)))
+                                 for name, values in sorted(axes.items())])
+        self.solve = solve
+        self.cache = SolveCache(self.num_nodes) if cache is None else cache
+        self.digits = digits
+        self.files = files
+
+    @property
+    def num_nodes(self):
+        return int(np.prod([len(v) for v in self.axes.values()]))
+
+    def _node(self, parameters, index):
+        'the parameters at the node of the grid at index'
+        node = copy.deepcopy(parameters)
+
+        for (name, values), i in zip(self.axes.items(), index):
+            node[name] = float(values[i])
+
+        return node
+
+    def solution(self, parameters, index):
+        '''
+        the solution at the node at index, for the other parameters
+        '''
+        node = self._node(parameters, index)
+        key = solve_key(node, self.digits, self.files)
+
+        solution = self.cache.get(key)
+        if solution is None:
+            solution = self.solve(node)
+            self.cache.put(key, solution)
+
+        return solution
+
+    def precompute(self, parameters):
+        '''
+        solve the plume at all the nodes of the grid
+        '''
+        for index in np.ndindex(*[len(v) for v in self.axes.values()]):
+            self.solution(parameters, index)
+
+    def _weights(self, name, value):
+        '''
+        the indices of the nodes on either side of value and their weights
+        '''
+        values = self.axes[name]
+
+        if len(values) == 1 or value <= values[0]:
+            return [(0, 1.0)]
+        if value >= values[-1]:
+            return [(len(values) - 1, 1.0)]
+
+        i = int(np.searchsorted(values, value)) - 1
+        frac = (value - values[i]) / (values[i + 1] - values[i])
+
+        return [(i, 1.0 - frac), (i + 1, frac)]
+
+    def lookup(self, parameters):
+        '''
+        the solution for parameters, interpolated between the nodes
+
+        :returns: (droplets, dissolved components)
+        '''
+        corners = [([], 1.0)]
+        for name in self.axes:
+            corners = [(index + [i], weight * w)
+                       for index, weight in corners
+                       for i, w in self._weights(name,
+                                                 float(parameters[name]))]
+
+        corners = [(tuple(index), weight)
+                   for index, weight in corners if weight > 0.0]
+        solutions = [(self.solution(parameters, index), weight)
+                     for index, weight in corners]
+
+        if len(solutions) == 1:
+            return solutions[0][0]
+
+        droplets = self._blend([(s[0], w) for s, w in solutions],
+                               self._droplet_attrs)
+        dissolved = self._blend([(s[1], w) for s, w in solutions],
+                                self._dissolved_attrs)
+
+        if droplets is None or dissolved is None:
+            return max(solutions, key=lambda s: s[1])[0]
+
+        return droplets, dissolved
+
+    @staticmethod
+    def _blend(weighted, attrs):
+        '''
+        weighted sum of the attrs of lists of objects with the same length,
+        or None if they don't have the same length
+        '''
+        lists = [objs for objs, _w in weighted]
+        if len(set([len(objs) for objs in lists])) != 1:
+            return None
+
+        blended = []
+        for objs in zip(*lists):
+            obj = copy.deepcopy(objs[0])
+
+            for attr in attrs:
+                value = sum([np.asarray(getattr(o, attr), dtype=np.float64) * w
+                             for o, (_objs, w) in zip(objs, weighted)])
+                setattr(obj, attr, value if np.ndim(value) else float(value))
+
+            blended.append(obj)
+
+        return blended
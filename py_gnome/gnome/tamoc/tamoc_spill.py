@@ -24,6 +24,8 @@ from tamoc import dbm, sintef, dispersed_phases, params
 from tamoc import bent_plume_model as bpm
 from tamoc import chemical_properties as chem
 
+from .plume_solves import solve_key, SolveCache, PlumeSolver, DropletTable
+
 __all__ = []
 
 
@@ -131,9 +133,31 @@ class TamocSpill(gnome.spill.spill.BaseSpill):
     """
     Models a spill
 
+    The plume solutions are cached by their (rounded) release parameters
+    and ambient profile, so an interval, or a rewound run, with the same
+    conditions does not solve the plume again.
+
+    With background_solve=True, a plume that has to be solved is solved
+    in a background thread, and the spill goes on releasing the droplets
+    of the previous solution until it is done. Only the first solve of a
+    run is waited for. The thread is started by the first background solve
+    and stopped by rewind().
+
+    With droplet_table={parameter name: values}, the plume is solved at
+    the grid of those values of the parameters (like 'release_flowrate'
+    or 'depth') and the solution is interpolated between them.
+
     TODO: we should not be using complex multidemensional values as
           parameter defaults such as the one used for 'tamoc_parameters'
     """
+    # input files of the release fluid composition and chemical data
+    composition_file = './Input/API_2000.csv'
+    chem_data_file = './Input/API_ChemData.csv'
+
+    # the droplets are not saved - a restarted run solves the plume again
+    _checkpoint_attrs = ('num_released', 'amount_released',
+                         'last_tamoc_time')
+
     def __init__(self,
                  release_time=None,
                  start_position=None,
@@ -165,8 +189,22 @@ class TamocSpill(gnome.spill.spill.BaseSpill):
                                    'depths': np.array([0, 1])},
                  data_sources={'currents': None,
                                'salinity': None,
-                               'temperature': None}
+                               'temperature': None},
+                 solve_cache_size=16,
+                 solve_digits=4,
+                 background_solve=False,
+                 droplet_table=None
                  ):
+        """
+        :param solve_cache_size=16: number of plume solutions cached
+        :param solve_digits=4: significant digits the release parameters
+            and ambient profile are rounded to when looking up a cached
+            solution
+        :param background_solve=False: solve the plume in a background
+            thread, releasing the previous solution until it is done
+        :param droplet_table=None: dict of parameter name: values at which
+            the plume is solved, to interpolate the solution between
+        """
         super(TamocSpill, self).__init__()
 
         self.release_time = release_time
@@ -188,6 +226,27 @@ class TamocSpill(gnome.spill.spill.BaseSpill):
         self.tamoc_parameters = tamoc_parameters
         self.data_sources = data_sources
 
+        self.solve_digits = solve_digits
+        self.background_solve = background_solve
+
+        self._solve_cache = SolveCache(solve_cache_size)
+        # started by the first background solve
+        self._solver = None
+        self._pending_key = None
+
+        # the inputs read from files, and the ambient profiles
+        self._inputs = None
+        self._profiles = SolveCache(4)
+
+        if droplet_table is not None:
+            self.droplet_table = DropletTable(droplet_table,
+                                              self._run_tamoc,
+                                              self._solve_cache,
+                                              solve_digits,
+                                              self._input_files())
+        else:
+            self.droplet_table = None
+
     def update_environment_conditions(self, current_time):
         ds = self.data_sources
         if ds['currents'] is not None:
@@ -235,30 +294,131 @@ class TamocSpill(gnome.spill.spill.BaseSpill):
         reached last_tamoc_run + interval
         """
         if self.on:
+            if self._pending_key is not None:
+                self._collect_solution()
+
             if self.tamoc_interval is None:
                 if self.last_tamoc_time is None:
                     self.last_tamoc_time = current_time
-                    self.droplets, self.diss_components = self._run_tamoc()
+                    self._update_droplets(wait=True)
                 return self.droplets
 
             if (current_time >= self.release_time and
                     (self.last_tamoc_time is None or self.droplets is None) or
                     current_time >= self.last_tamoc_time + self.tamoc_interval and
                     current_time < self.end_release_time):
+                wait = self.last_tamoc_time is None or self.droplets is None
                 self.last_tamoc_time = current_time
-                self.droplets, self.diss_components = self._run_tamoc()
+                self._update_droplets(wait)
 
         return self.droplets
 
-    def _run_tamoc(self):
+    def _input_files(self):
+        return (self.tamoc_parameters['fname_ctd'],
+                self.composition_file,
+                self.chem_data_file)
+
+    def _update_droplets(self, wait):
+        """
+        get the plume solution for the current tamoc_parameters: from the
+        droplet table, the cache, or by solving the plume.
+
+        In background_solve mode the solve is only waited for if wait is
+        True, else the solution is collected by a later run_tamoc()
+        """
+        tp = copy.deepcopy(self.tamoc_parameters)
+
+        if self.droplet_table is not None:
+            self.droplets, self.diss_components = self.droplet_table.lookup(tp)
+            return
+
+        key = solve_key(tp, self.solve_digits, self._input_files())
+        solution = self._solve_cache.get(key)
+
+        if solution is None:
+            if not self.background_solve:
+                solution = self._run_tamoc(tp)
+                self._solve_cache.put(key, solution)
+            else:
+                if self._solver is None or not self._solver.is_alive():
+                    self._solver = PlumeSolver(self._solve_cache)
+                    self._solver.start()
+
+                self._solver.submit(key, self._run_tamoc, tp)
+
+                if not wait:
+                    self._pending_key = key
+                    return
+
+                solution = self._solver.wait(key)
+
+        self._pending_key = None
+        self.droplets, self.diss_components = solution
+
+    def _stop_solver(self):
+        '''
+        stop the background solve thread. It is started again by the next
+        background solve.
+        '''
+        if self._solver is not None:
+            self._solver.shutdown()
+            self._solver = None
+
+    def __del__(self):
+        if getattr(self, '_solver', None) is not None:
+            self._stop_solver()
+
+    def _collect_solution(self):
+        'use the solution solved in the background, if it is done'
+        key = self._pending_key
+
+        if key in self._solve_cache or self._solver.done(key):
+            self._pending_key = None
+            self.droplets, self.diss_components = self._solver.wait(key)
+
+    def _read_inputs(self):
+        """
+        the release fluid composition and chemical data, read once for as
+        long as their files do not change
+        """
+        files = (self.composition_file, self.chem_data_file)
+        key = solve_key({}, files=files)
+
+        if self._inputs is None or self._inputs[0] != key:
+            composition, mass_frac = self.get_composition(files[0])
+            data, _units = chem.load_data(files[1])
+
+            self._inputs = (key, composition, mass_frac, data)
+
+        return self._inputs[1:]
+
+    def _get_ambient_profile(self, nc_file, fname_ctd, ua, va, wa, depths):
+        'get_profile(), for the profiles that were not got already'
+        key = solve_key({'nc_file': nc_file,
+                         'ua': ua, 'va': va, 'wa': wa,
+                         'depths': depths},
+                        self.solve_digits, (fname_ctd,))
+
+        profile = self._profiles.get(key)
+        if profile is None:
+            profile = self.get_profile(nc_file, fname_ctd, ua, va, wa, depths)
+            self._profiles.put(key, profile)
+
+        return profile
+
+    def _run_tamoc(self, tamoc_parameters=None):
         """
         this is the code that actually calls and runs tamoc_output
 
+        :param tamoc_parameters=None: the parameters to solve the plume
+            for, self.tamoc_parameters by default
+
         it returns a list of TAMOC droplet objects
         """
         # Release conditions
 
-        tp = self.tamoc_parameters
+        tp = (self.tamoc_parameters if tamoc_parameters is None
+              else tamoc_parameters)
 
         # Release depth (m)
         z0 = tp['depth']
@@ -308,14 +468,12 @@ class TamocSpill(gnome.spill.spill.BaseSpill):
         wa = tp['wa']
         depths = tp['depths']
 
-        profile = self.get_profile(nc_file, fname_ctd, ua, va, wa, depths)
-
-        # Get the release fluid composition
-        fname_composition = './Input/API_2000.csv'
-        composition, mass_frac = self.get_composition(fname_composition)
+        profile = self._get_ambient_profile(nc_file, fname_ctd,
+                                            ua, va, wa, depths)
 
-        # Read in the user-specified properties for the chemical data
-        data, units = chem.load_data('./Input/API_ChemData.csv')
+        # Get the release fluid composition, and the user-specified
+        # properties for the chemical data
+        composition, mass_frac, data = self._read_inputs()
         oil = dbm.FluidMixture(composition, user_data=data)
 
         # oil.delta = self.load_delta('./Input/API_Delta.csv',oil.nc)
@@ -521,7 +679,21 @@ class TamocSpill(gnome.spill.spill.BaseSpill):
         So we copy them temporarily to local variables before we deepcopy
         our Spill object.
         """
-        u_copy = copy.deepcopy(self)
+        # the solutions, and the thread solving them, are shared
+        shared = (self._solve_cache, self._solver, self.droplet_table,
+                  self._profiles)
+        (self._solve_cache, self._solver, self.droplet_table,
+         self._profiles) = (None, None, None, None)
+
+        try:
+            u_copy = copy.deepcopy(self)
+        finally:
+            (self._solve_cache, self._solver, self.droplet_table,
+             self._profiles) = shared
+
+        (u_copy._solve_cache, u_copy._solver, u_copy.droplet_table,
+         u_copy._profiles) = shared
+
         self.logger.debug(self._pid + "deepcopied spill {0}".format(self.id))
 
         return u_copy
@@ -535,7 +707,11 @@ class TamocSpill(gnome.spill.spill.BaseSpill):
         self.amount_released = 0
 
         # don't want to run tamoc on every rewind!
+        # -- the solutions are cached, so it is not solved again if the
+        #    conditions are the same
         self.last_tamoc_time = None
+        self._pending_key = None
+        self._stop_solver()
 
     def num_elements_to_release(self, current_time, time_step):
         """
@@ -0,0 +1,129 @@
+'''
+Index of the "blobs" of elements in a SpillContainer
+
+A blob is a group of elements that were released together - they share the
+same 'spill_num' and 'age'. Spreading and Langmuir compute their properties
+per blob, then divide the result back into the elements used to model the
+blob.
+
+BlobIndex groups the elements once with a stable sort of the key arrays so
+per blob reductions can be done with np.bincount/np.add.reduceat in a
+single pass over the data instead of building a boolean mask over all the
+elements for every blob.
+'''
+
+import numpy as np
+
+
+class BlobIndex(object):
+    '''
+    Sorted group index over one or more key arrays
+
+    Elements with equal values in all the key arrays belong to the same
+    blob. Blobs are numbered in sorted key order, the last key being the
+    primary sort key (same convention as np.lexsort)
+
+    :attr ids: blob number of each element
+    :attr order: indices that sort the elements by blob. The sort is stable
+        so within a blob, elements are in the order they appear in the data
+    :attr offsets: start of each blob in the sorted order
+    :attr counts: number of elements in each blob
+    '''
+    def __init__(self, *keys):
+        if len(keys) == 0:
+            raise ValueError('BlobIndex requires at least one key array')
+
+        keys = [np.asarray(key) for key in keys]
+        num = len(keys[0])
+
+        if num == 0:
+            self._set(np.zeros((0,), dtype=np.intp),
+                      np.zeros((0,), dtype=np.intp),
+                      np.zeros((0,), dtype=np.intp))
+            return
+
+        order = np.lexsort(keys)
+
+        # a new blob starts wherever any key changes in the sorted order
+        starts = np.zeros((num,), dtype=bool)
+        starts[0] = True
+        for key in keys:
+            s_key = key[order]
+            starts[1:] |= s_key[1:] != s_key[:-1]
+
+        ids = np.empty((num,), dtype=np.intp)
+        ids[order] = np.cumsum(starts) - 1
+
+        self._set(ids, order, np.flatnonzero(starts))
+
+    @classmethod
+    def _from_ids(cls, ids):
+        '''
+        create a BlobIndex from blob ids that are already numbered 0 to n - 1
+        '''
+        index = cls.__new__(cls)
+        order = np.argsort(ids, kind='mergesort')
+
+        starts = np.ones((len(ids),), dtype=bool)
+        starts[1:] = ids[order][1:] != ids[order][:-1]
+
+        index._set(ids, order, np.flatnonzero(starts))
+        return index
+
+    def _set(self, ids, order, offsets):
+        self.ids = ids
+        self.order = order
+        self.offsets = offsets
+        self.counts = np.diff(np.append(offsets, len(ids)))
+
+    def __len__(self):
+        'number of blobs'
+        return len(self.offsets)
+
+    @property
+    def num_elements(self):
+        return len(self.ids)
+
+    def sum(self, values):
+        '''
+        sum of values for each blob
+
+        :param values: array the same length as the key arrays
+        :returns: array of length len(self)
+        '''
+        if len(self) == 0:
+            return np.zeros((0,), dtype=np.float64)
+
+        return np.add.reduceat(np.asarray(values)[self.order], self.offsets)
+
+    def first(self, values):
+        '''
+        value of the first element of each blob - use this for values that
+        are the same for all the elements in a blob
+        '''
+        return np.asarray(values)[self.order[self.offsets]]
+
+    def broadcast(self, blob_values):
+        '''
+        expand per blob values back to the elements
+
+        :param blob_values: array of length len(self)
+        :returns: array the same length as the key arrays
+        '''
+        return np.asarray(blob_values)[self.ids]
+
+    def subset(self, mask):
+        '''
+        BlobIndex for the elements selected by the boolean mask. Blobs that
+        are left empty are dropped, the remaining blobs keep their order.
+        This is used to get the index for a FateDataView without sorting
+        again.
+        '''
+        if len(self) == 0:
+            return self
+
+        ids = self.ids[mask]
+        present = np.bincount(ids, minlength=len(self)) > 0
+        renumber = np.cumsum(present) - 1
+
+        return self._from_ids(renumber[ids])
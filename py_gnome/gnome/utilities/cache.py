@@ -10,6 +10,8 @@ import warnings
 import tempfile
 import shutil
 import copy
+import threading
+import Queue
 from multiprocessing import Lock
 
 import numpy
@@ -62,18 +64,63 @@ import atexit
 atexit.register(clean_up_cache)
 
 
+class _CacheWriter(threading.Thread):
+    """
+    Background thread that writes the snapshots of the element data to disk
+    for an ElementCache in async_write mode.
+
+    Jobs are (step_num, filename, data) tuples. When a job is done, the
+    cache's _write_done() is called so it can recycle the snapshot buffers
+    and wake up anyone waiting on that step.
+    """
+    def __init__(self, cache):
+        super(_CacheWriter, self).__init__(name='ElementCacheWriter')
+        self.daemon = True
+
+        self.cache = cache
+        self.jobs = Queue.Queue()
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            (step_num, filename, data) = job
+            error = None
+            try:
+                np.savez(filename, **data)
+            except Exception, excp:
+                error = excp
+
+            self.cache._write_done(step_num, error)
+
+    def stop(self):
+        self.jobs.put(None)
+
+
 class ElementCache(object):
     """
     Cache for element data -- i.e. the data associated with the particles.
     This caches UncertainSpillContainerPair
     The cache can be accessed to re-draw the LE movies, etc.
 
+    If async_write is True, the data is copied into a pool of reusable
+    buffers on the model thread and written to disk by a background thread.
+    load_timestep() only blocks if the step it asks for is still being
+    written. Call flush() to wait for all writes to complete and raise any
+    error that occurred while writing.
+
     TODO: This is a really fragile module in terms of handling multiple
           instances.  The __del__() method of previous instances can clear
           the _cache_dir at the whim of the GC.
           We may want to manage this differently.
     """
-    def __init__(self, cache_dir=None, enabled=True):
+    # max number of steps that can be waiting to be written to disk by
+    # the background writer before save_timestep() blocks
+    max_pending = 2
+
+    def __init__(self, cache_dir=None, enabled=True, async_write=False):
         """
         initialize a new cache object
 
@@ -81,6 +128,8 @@ class ElementCache(object):
                                should be stored.
                                If not provided, a temp dir will be created by
                                the python tempfile module
+        :param async_write=False: write the cache to disk in a background
+                                  thread.
         """
         self.create_new_dir(cache_dir)
 
@@ -93,8 +142,23 @@ class ElementCache(object):
 
         self.lock = Lock()
 
+        # state for background writes
+        self.async_write = async_write
+        self._writer = None
+        self._cond = threading.Condition()
+        self._pending = {}          # step_num: number of files being written
+        self._step_buffers = {}     # step_num: list of buffers used by step
+        self._pool = []             # buffers available for reuse
+        self._write_error = None
+
+        # (step_num, SpillContainerPairData) - see load_shared_timestep()
+        self._shared = None
+
     def __del__(self):
         'Clear out the cache when this object is deleted'
+        if self._writer is not None:
+            self._writer.stop()
+
         with self.lock:
             if os.path.isdir(self._cache_dir):
                 shutil.rmtree(self._cache_dir)
@@ -128,41 +192,159 @@ class ElementCache(object):
         :param step_num: the step number of the data
         :param spill_container: the spill container at this step
         """
-        for sc in spill_container_pair.items():
-            data = copy.deepcopy(sc.data_arrays)
-
-            self._set_weathering_data(sc, data)
-
-            if sc.current_time_stamp:
-                data['current_time_stamp'] = np.array(sc.current_time_stamp)
+        self.clear_shared()
+        write_async = self.enabled and self.async_write
 
-            # # note: this assumes that the certain SC will be first!
+        if write_async:
+            self._wait_for_pending(self.max_pending)
 
-            if sc.uncertain:
-                self.recent[step_num][1] = data
+        for sc in spill_container_pair.items():
+            if write_async:
+                data = self._snapshot(step_num, sc.data_arrays)
             else:
-                # this creates a new dict, so only one step is saved
-                self.recent = {step_num: [data, None]}
+                data = copy.deepcopy(sc.data_arrays)
+
+            self._keep_recent(step_num, sc, data)
 
             # write the data if enabled
-            # could be threaded -- data is a copy, so doesn't need to be
-            #                      re-used by anything
-            if self.enabled:
+            if write_async:
+                self._submit(step_num,
+                             self._make_filename(step_num, sc.uncertain),
+                             data)
+            elif self.enabled:
                 filename = self._make_filename(step_num, sc.uncertain)
                 np.savez(filename, **data)
 
-    def load_timestep(self, step_num):
+    def _keep_recent(self, step_num, sc, data):
+        '''
+        add the mass balance and time stamp of sc to data, and hold it in
+        self.recent as the data of the most recent step
+        '''
+        self._set_weathering_data(sc, data)
+
+        if sc.current_time_stamp:
+            data['current_time_stamp'] = np.array(sc.current_time_stamp)
+
+        # # note: this assumes that the certain SC will be first!
+
+        if sc.uncertain:
+            self.recent[step_num][1] = data
+        else:
+            # this creates a new dict, so only one step is saved
+            old_steps = self.recent.keys()
+            self.recent = {step_num: [data, None]}
+            self._release_buffers(old_steps)
+
+    def _snapshot(self, step_num, data_arrays):
+        """
+        copy the data_arrays into a buffer from the pool. Buffers keep spare
+        capacity so they can be reused as the number of elements grows.
+        Returns a dict of views into the buffer.
+        """
+        with self._cond:
+            buf = self._pool.pop() if self._pool else {}
+            self._step_buffers.setdefault(step_num, []).append(buf)
+
+        data = {}
+        for name, arr in data_arrays.iteritems():
+            store = buf.get(name)
+            if (store is None or
+                    store.dtype != arr.dtype or
+                    store.shape[1:] != arr.shape[1:] or
+                    len(store) < len(arr)):
+                capacity = len(arr) if store is None else max(len(arr),
+                                                              2 * len(store))
+                store = np.empty((capacity,) + arr.shape[1:], dtype=arr.dtype)
+                buf[name] = store
+
+            data[name] = store[:len(arr)]
+            data[name][:] = arr
+
+        return data
+
+    def _submit(self, step_num, filename, data):
+        'queue data to be written by the background writer'
+        with self._cond:
+            self._pending[step_num] = self._pending.get(step_num, 0) + 1
+
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = _CacheWriter(self)
+            self._writer.start()
+
+        self._writer.jobs.put((step_num, filename, data))
+
+    def _write_done(self, step_num, error=None):
+        'called by the background writer when a file has been written'
+        with self._cond:
+            if error is not None and self._write_error is None:
+                self._write_error = error
+
+            self._pending[step_num] -= 1
+            if self._pending[step_num] == 0:
+                del self._pending[step_num]
+                self._release_buffers([step_num])
+
+            self._cond.notify_all()
+
+    def _release_buffers(self, steps):
+        """
+        return the buffers used by steps to the pool once they are
+        neither being written nor held in self.recent
+        """
+        with self._cond:
+            for step_num in steps:
+                if step_num in self._pending or step_num in self.recent:
+                    continue
+
+                self._pool.extend(self._step_buffers.pop(step_num, []))
+
+    def _wait_for_pending(self, max_pending=0, step_num=None):
+        """
+        block till fewer than max_pending steps are being written or, if
+        step_num is given, till that step has been written
+        """
+        with self._cond:
+            if step_num is None:
+                while len(self._pending) > max_pending:
+                    self._cond.wait()
+            else:
+                while step_num in self._pending:
+                    self._cond.wait()
+
+    def flush(self):
+        """
+        wait for all queued writes to complete. If any of the writes failed,
+        raise a CacheError
+        """
+        self._wait_for_pending()
+
+        with self._cond:
+            error = self._write_error
+            self._write_error = None
+
+        if error is not None:
+            raise CacheError('failed to write element cache: {0}'
+                             .format(error))
+
+    def load_timestep(self, step_num, read_only=False):
         """
         Returns a SpillContainer with the data arrays cached on disk
 
         :param step_num: the step number you want to load.
+        :param read_only=False: if True, the data arrays are read-only views
+            of the cached data so the most recent step is not copied.
         """
         # look first in in-memory cache.
         try:
             # make a copy because we pop out the current_time_stamp
             # make these changes to the copy so the self.recent does not change
 
-            (data_arrays, u_data_arrays) = copy.deepcopy(self.recent[step_num])
+            if read_only:
+                (data_arrays, u_data_arrays) = \
+                    [self._read_only(d) for d in self.recent[step_num]]
+            else:
+                (data_arrays, u_data_arrays) = \
+                    copy.deepcopy(self.recent[step_num])
 
             # copy.deepcopy(self.recent[step_num]) converts
             # 'current_time_stamp' to datetime object
@@ -176,6 +358,8 @@ class ElementCache(object):
                         np.array(u_data_arrays['current_time_stamp'])
         except KeyError:
             # not in the recent dict: try to load from disk
+            # if it is still being written, wait for it
+            self._wait_for_pending(step_num=step_num)
             try:
                 data_arrays = \
                     dict(np.load(self._make_filename(step_num)))
@@ -189,6 +373,10 @@ class ElementCache(object):
             except IOError:
                 u_data_arrays = None
 
+            if read_only:
+                data_arrays = self._read_only(data_arrays)
+                u_data_arrays = self._read_only(u_data_arrays)
+
         # HOWEVER, loading numpy arrays
         #     data_arrays = dict(np.load(self._make_filename(step_num)))
         # converts current_time_stamp to numpy.ndarray objects
@@ -221,6 +409,37 @@ class ElementCache(object):
 
         return scp
 
+    def _read_only(self, data_arrays):
+        'returns a dict of read-only views of data_arrays'
+        if data_arrays is None:
+            return None
+
+        views = {}
+        for name, arr in data_arrays.iteritems():
+            views[name] = arr.view()
+            views[name].flags.writeable = False
+
+        return views
+
+    def load_shared_timestep(self, step_num):
+        """
+        Returns read-only data for step_num that is shared by all callers.
+        The step is only loaded once, no matter how many outputters ask
+        for it, until it is invalidated by clear_shared() or by saving a new
+        step to the cache.
+
+        :param step_num: the step number you want to load.
+        """
+        if self._shared is None or self._shared[0] != step_num:
+            self._shared = (step_num,
+                            self.load_timestep(step_num, read_only=True))
+
+        return self._shared[1]
+
+    def clear_shared(self):
+        'release the data shared by load_shared_timestep()'
+        self._shared = None
+
     def _set_weathering_data(self, sc, data):
         'add mass balance data to arrays'
         if sc.mass_balance:
@@ -250,11 +469,193 @@ class ElementCache(object):
         return mb_data
 
     def rewind(self):
-        'Rewinds the cache -- clearing out everything'
+        '''
+        Rewinds the cache -- clearing out everything
+
+        Any pending writes are completed first; if one of them failed the
+        CacheError is raised once the cache is cleared.
+        '''
+        error = None
+        try:
+            self.flush()
+        except CacheError, excp:
+            error = excp
+
         # clean out the in-memory cache
         self.recent = {}
+        self.clear_shared()
+        with self._cond:
+            self._step_buffers = {}
 
         # clean out the disk cache
         if os.path.isdir(self._cache_dir):
             shutil.rmtree(self._cache_dir)
         os.mkdir(self._cache_dir)
+
+        if error is not None:
+            raise error
+
+
+class MemmapElementCache(ElementCache):
+    """
+    ElementCache that stores the element data in one raw binary file per
+    data array for the whole run, with an index of (start, count) for each
+    step -- like the 'particle_count'/'data_index' scheme used by
+    nc_particles.
+
+    Saving a step appends each data array to its file. Loading a step
+    returns read-only views into memory-mapped files -- no decompression
+    and no copying -- so replaying a long run for output is cheap.
+
+    The mass_balance and current_time_stamp are small, so these are kept in
+    memory. Like for the ElementCache, a copy of the most recent step is held
+    in self.recent, so the outputters can add to it (surface_concentration)
+    before it is written out.
+    """
+    def __init__(self, cache_dir=None, enabled=True):
+        super(MemmapElementCache, self).__init__(cache_dir, enabled)
+        self._reset_index()
+
+    def _reset_index(self):
+        # one index per certain/uncertain SpillContainer
+        # step_num: (start, count, mass_balance, current_time_stamp)
+        self._index = ({}, {})
+        # name: (dtype, shape of one element, number of elements in file)
+        self._columns = ({}, {})
+        # name: open file handle
+        self._files = ({}, {})
+        # name: np.memmap of file
+        self._maps = ({}, {})
+
+    def _close_files(self):
+        for files in self._files:
+            for fh in files.itervalues():
+                fh.close()
+
+        self._files = ({}, {})
+        self._maps = ({}, {})
+
+    def __del__(self):
+        self._close_files()
+        super(MemmapElementCache, self).__del__()
+
+    def _make_column_filename(self, name, uncertain=False):
+        'Returns the filename of the file holding data array: name'
+        if uncertain:
+            return os.path.join(self._cache_dir, '{0}_uncert.dat'.format(name))
+        else:
+            return os.path.join(self._cache_dir, '{0}.dat'.format(name))
+
+    def save_timestep(self, step_num, spill_container_pair):
+        """
+        append a time step of data to the cache
+
+        :param step_num: the step number of the data
+        :param spill_container: the spill container at this step
+        """
+        if not self.enabled:
+            return super(MemmapElementCache, self).save_timestep(
+                step_num, spill_container_pair)
+
+        self.clear_shared()
+
+        for sc in spill_container_pair.items():
+            ix = int(sc.uncertain)
+            columns = self._columns[ix]
+            count = len(sc)
+            start = None
+
+            for name, arr in sc.data_arrays.iteritems():
+                if name not in columns:
+                    columns[name] = (arr.dtype, arr.shape[1:], 0)
+                    self._files[ix][name] = \
+                        open(self._make_column_filename(name, sc.uncertain),
+                             'wb')
+
+                dtype, shape, num = columns[name]
+                if dtype != arr.dtype or shape != arr.shape[1:]:
+                    raise CacheError('data array {0} changed type or shape '
+                                     'during the run'.format(name))
+
+                if start is None:
+                    start = num
+                elif start != num:
+                    raise CacheError('data arrays are not aligned in cache')
+
+                fh = self._files[ix][name]
+                fh.write(np.ascontiguousarray(arr, dtype=dtype).tostring())
+                fh.flush()
+
+                columns[name] = (dtype, shape, num + count)
+
+            self._index[ix][step_num] = (start or 0,
+                                         count,
+                                         copy.deepcopy(sc.mass_balance),
+                                         sc.current_time_stamp)
+
+            self._keep_recent(step_num, sc, copy.deepcopy(sc.data_arrays))
+
+    def _column_view(self, ix, name, start, count):
+        'read-only view of count elements of data array: name from start'
+        dtype, shape, num = self._columns[ix][name]
+
+        if count == 0:
+            return np.zeros((0,) + shape, dtype=dtype)
+
+        mmap = self._maps[ix].get(name)
+        if mmap is None or len(mmap) < start + count:
+            # the file has grown since it was mapped
+            mmap = np.memmap(self._make_column_filename(name, bool(ix)),
+                             dtype=dtype, mode='r', shape=(num,) + shape)
+            self._maps[ix][name] = mmap
+
+        return mmap[start:start + count]
+
+    def _load_sc(self, step_num, uncertain=False):
+        ix = int(uncertain)
+        (start, count, mass_balance, time_stamp) = self._index[ix][step_num]
+
+        data_arrays = {}
+        for name in self._columns[ix]:
+            data_arrays[name] = self._column_view(ix, name, start, count)
+
+        sc = SpillContainerData(data_arrays, uncertain=uncertain)
+        sc.mass_balance = copy.deepcopy(mass_balance)
+        if time_stamp:
+            sc.current_time_stamp = time_stamp
+
+        return sc
+
+    def load_timestep(self, step_num, read_only=True):
+        """
+        Returns a SpillContainerPairData with read-only views of the data
+        arrays cached on disk
+
+        :param step_num: the step number you want to load.
+        :param read_only=True: data is always read-only for this cache unless
+            step_num is the most recent step, which is held in memory.
+        """
+        if step_num in self.recent:
+            # the most recent step may have been added to by the outputters
+            return super(MemmapElementCache, self).load_timestep(step_num,
+                                                                 read_only)
+
+        if step_num not in self._index[0]:
+            raise CacheError('step: {0} is not in the cache'
+                             .format(step_num))
+
+        sc = self._load_sc(step_num)
+
+        if step_num in self._index[1]:
+            u_sc = self._load_sc(step_num, uncertain=True)
+        else:
+            u_sc = None
+
+        return SpillContainerPairData(sc, u_sc)
+
+    def rewind(self):
+        'Rewinds the cache -- clearing out everything'
+        self._close_files()
+        self._reset_index()
+
+        super(MemmapElementCache, self).rewind()
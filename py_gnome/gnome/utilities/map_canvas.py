@@ -25,6 +25,59 @@ import unit_conversion as uc
 from gnome.utilities.projections import FlatEarthProjection
 
 
+def unique_pixels(points):
+    """
+    the distinct rows of an Nx2 (or NxM) array of integer pixel coordinates
+
+    Many elements or vectors usually fall on the same pixels -- there is
+    no need to draw them more than once.
+    """
+    points = np.ascontiguousarray(points)
+
+    if len(points) < 2:
+        return points
+
+    rows = points.view([('', points.dtype)] * points.shape[1]).ravel()
+
+    return np.unique(rows).view(points.dtype).reshape(-1, points.shape[1])
+
+
+def pixel_segments(start, end):
+    """
+    Nx4 array of (x1, y1, x2, y2) of the distinct, non-empty segments from
+    the pixels start to the pixels end
+    """
+    segments = np.hstack((np.asarray(start, dtype=np.int32).reshape(-1, 2),
+                          np.asarray(end, dtype=np.int32).reshape(-1, 2)))
+
+    # the same pixel at both ends is a dot, which is drawn anyway
+    segments = segments[(segments[:, 0] != segments[:, 2]) |
+                        (segments[:, 1] != segments[:, 3])]
+
+    return unique_pixels(segments)
+
+
+def draw_segments(img, segments, line_color, line_width=1):
+    """
+    draw the segments of an Nx4 array of (x1, y1, x2, y2) pixel coordinates
+    to a py_gd image, all in the same color and width
+    """
+    draw_line = img.draw_line
+
+    for x1, y1, x2, y2 in segments.tolist():
+        draw_line((x1, y1), (x2, y2), line_color, line_width)
+
+
+def projection_key(projection):
+    """
+    hashable description of the state of a projection -- what is drawn
+    with it changes when it does
+    """
+    return tuple([None if v is None else tuple(np.ravel(v).tolist())
+                  for v in (projection.center, projection.scale,
+                            projection.offset, projection.image_size)])
+
+
 class MapCanvas(object):
     """
     A class to draw maps, etc.
@@ -276,7 +329,7 @@ class MapCanvas(object):
         if shape not in ('round', 'x'):
             raise ValueError('only "round" and "x" are supported shapes')
 
-        points = self.projection.to_pixel(points, asint=True)
+        points = unique_pixels(self.projection.to_pixel(points, asint=True))
         img = self.back_image if background else self.fore_image
 
         if shape == 'round':
@@ -346,6 +399,39 @@ class MapCanvas(object):
                           line_color=line_color,
                           line_width=line_width)
 
+    def draw_segments(self,
+                      start,
+                      end,
+                      line_color,
+                      line_width=1,
+                      background=False):
+        """
+        Draw a set of line segments all in the same color
+
+        Segments that fall on the same pixels are only drawn once.
+
+        :param start: the start points of the segments
+        :type start: Nx2 array of (lon, lat)
+
+        :param end: the end points of the segments
+        :type end: Nx2 array of (lon, lat)
+
+        :param line_color: the color of the lines
+        :type line_color:  color name or index
+
+        :param line_width=1: width of line
+        :type line_width: integer
+
+        :param background=False: whether to draw to the background image.
+        :type background: bool
+        """
+        segments = pixel_segments(self.projection.to_pixel(start, asint=True),
+                                  self.projection.to_pixel(end, asint=True))
+
+        img = self.back_image if background else self.fore_image
+
+        draw_segments(img, segments, line_color, line_width)
+
     def draw_text(self, text_list, size='small', color='black', align='lt',
                   background='none', draw_to_back=False):
         """
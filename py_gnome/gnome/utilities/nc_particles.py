@@ -6,12 +6,23 @@ This is a test case for working with what hopefully will be a CF standard
 """  # Change the / operator to ensure true division throughout (Zelenke).
 
 from __future__ import division
+import os
+import hashlib
+import tempfile
 from datetime import datetime
 
 import numpy as np
 
 import netCDF4
 
+from gnome.persist.checkpoint import replace_file
+from gnome.utilities.raster_cache import user_cache_dir
+
+
+# where the indexes of the particle ids are saved
+_index_dir = os.environ.get('GNOME_PARTICLE_INDEX_DIR',
+                            user_cache_dir('particle_index'))
+
 
 class particle_trajectory:
 
@@ -217,14 +228,294 @@ class nc_particle_file:
     def get_individual_trajectory(self, particle_id, vars=['latitude',
                                   'longitude']):
         """
-        returns the requested variables from trajectory of an individual particle
-        
-        note: this is very inefficient -- it has to read the entire file to get it.
+        returns the requested variables from trajectory of an individual
+        particle as a dictionary keyed by the variable names
+
+        The first time it is called, the ids of the whole file are read to
+        build an index of the records of each particle, which is saved in
+        the cache dir of the user, if it can be written, for the next times.
         """
+        if not hasattr(self, '_reader'):
+            self._reader = ParticleFileReader(self.nc, id_index=True)
+
+        return self._reader.get_trajectory(particle_id, vars)
+
+
+class ParticleFileReader(object):
+    """
+    random access reader of a particle file
+
+    The data of the particles is stored in a particle file as a "ragged
+    array": the records of all the timesteps, one after the other, with
+    the number of records in each timestep in 'particle_count'. The
+    particle_count is read once, to an index of the first record of each
+    timestep, so a timestep, or a range of them, is read without reading
+    anything before it.
+
+    The trajectory of a particle is read using an index of the records of
+    each particle id, built by reading the ids once. The index is saved in
+    the cache dir of the user (GNOME_PARTICLE_INDEX_DIR if it is set), in a
+    file named by the path and modification time of the particle file, and
+    loaded from there again as long as the particle file has not changed.
+    If it cannot be written, the index is only kept by the reader.
+    """
+    # number of records of the 'id' variable read at a time when building
+    # the index
+    _chunk_size = 1 << 22
+
+    def __init__(self, nc, id_index=False, index_dir=None):
+        """
+        :param nc: filename of the particle file, or an open
+                   netCDF4.Dataset of it
+        :param id_index=False: if True build the index of the records of
+                               each particle id now, else it is built the
+                               first time a trajectory is asked for
+        :param index_dir=None: dir the index is saved in. Defaults to
+                               GNOME_PARTICLE_INDEX_DIR or the cache dir of
+                               the user
+        """
+        self.index_dir = _index_dir if index_dir is None else index_dir
+
+        if isinstance(nc, basestring):
+            self.filename = nc
+            self.nc = netCDF4.Dataset(nc)
+            self._own_nc = True
+        else:
+            try:
+                self.filename = nc.filepath()
+            except (AttributeError, ValueError):
+                # netCDF4 built without filepath support
+                self.filename = None
+
+            self.nc = nc
+            self._own_nc = False
+
+        self.particle_count = np.asarray(self.nc.variables['particle_count'][:],
+                                         dtype=np.int64)
+
+        # records [data_index[i], data_index[i + 1]) are timestep i
+        self.data_index = np.zeros((len(self.particle_count) + 1, ),
+                                   dtype=np.int64)
+        self.data_index[1:] = np.cumsum(self.particle_count)
+
+        self._times = None
+        self._id_order = None
+        self._sorted_ids = None
+
+        if id_index:
+            self.build_id_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
-        indexes = np.where(self.nc.variables['id'] == particle_id)
+    def close(self):
+        if self._own_nc:
+            self.nc.close()
 
+    @property
+    def num_timesteps(self):
+        return len(self.particle_count)
 
-        # print self.nc.variables['id'][:]
-        # print indexes
+    @property
+    def times(self):
+        'datetimes of the timesteps, read the first time they are needed'
+        if self._times is None:
+            time = self.nc.variables['time']
+            self._times = netCDF4.num2date(time[:], time.units,
+                                           calendar=getattr(time, 'calendar',
+                                                            'standard'))
 
+        return self._times
+
+    def index_of_time(self, time):
+        """
+        index of the timestep closest to time. A time before the first
+        timestep is timestep 0.
+        """
+        time_ = self.nc.variables['time']
+        offset = netCDF4.date2num(time, time_.units,
+                                  calendar=getattr(time_, 'calendar',
+                                                   'standard'))
+        if offset < 0:
+            return 0
+
+        return abs(time_[:] - offset).argmin()
+
+    def step_range(self, timestep):
+        """
+        (start, stop) of the records of timestep. Negative timesteps count
+        from the end.
+        """
+        if timestep < 0:
+            timestep += self.num_timesteps
+
+        if not 0 <= timestep < self.num_timesteps:
+            raise IndexError('timestep {0} out of range: there are {1} '
+                             'timesteps'.format(timestep, self.num_timesteps))
+
+        return self.data_index[timestep], self.data_index[timestep + 1]
+
+    def get_timestep(self, timestep, variables=['latitude', 'longitude']):
+        """
+        returns the requested variables data from a given timestep as a
+        dictionary keyed by the variable names
+        """
+        return self.get_timesteps([timestep], variables)[0]
+
+    def get_timesteps(self, timesteps, variables=['latitude', 'longitude']):
+        """
+        returns the requested variables data from the given timesteps as a
+        list of dictionaries keyed by the variable names, one per timestep
+
+        Each variable is read once, for all the records from the first to
+        the last of the timesteps, if the timesteps are close enough
+        together, else it is read one timestep at a time.
+        """
+        ranges = [self.step_range(ts) for ts in timesteps]
+        if not ranges:
+            return []
+
+        first = min([start for start, _stop in ranges])
+        last = max([stop for _start, stop in ranges])
+        wanted = sum([stop - start for start, stop in ranges])
+
+        data = [{} for _r in ranges]
+        for var in variables:
+            values = self.nc.variables[var]
+
+            if last - first <= 2 * wanted:
+                block = values[first:last]
+                for d, (start, stop) in zip(data, ranges):
+                    d[var] = block[start - first:stop - first]
+            else:
+                for d, (start, stop) in zip(data, ranges):
+                    d[var] = values[start:stop]
+
+        return data
+
+    @property
+    def index_filename(self):
+        '''
+        the file the index of the particle ids is saved in, or None
+        '''
+        if self.filename is None:
+            return None
+
+        try:
+            mtime = os.path.getmtime(self.filename)
+        except OSError:
+            return None
+
+        key = hashlib.sha1(repr((os.path.abspath(self.filename), mtime)))
+
+        return os.path.join(self.index_dir, key.hexdigest() + '.ids.npz')
+
+    def _file_state(self):
+        stat = os.stat(self.filename)
+
+        return np.array([stat.st_mtime, stat.st_size, self.data_index[-1]])
+
+    def _load_id_index(self):
+        if self.index_filename is None:
+            return False
+
+        try:
+            with np.load(self.index_filename) as index:
+                if not np.array_equal(index['state'], self._file_state()):
+                    return False
+
+                self._id_order = index['order']
+                self._sorted_ids = index['ids']
+        except (IOError, OSError, KeyError, TypeError, ValueError):
+            return False
+
+        return True
+
+    def build_id_index(self):
+        """
+        build the index of the records of each particle id, or load it
+        from the index dir
+        """
+        if self._id_order is not None:
+            return
+
+        if self._load_id_index():
+            return
+
+        ids_var = self.nc.variables['id']
+        num_records = self.data_index[-1]
+
+        ids = np.empty((num_records, ), dtype=ids_var.dtype)
+        for start in range(0, num_records, self._chunk_size):
+            stop = min(start + self._chunk_size, num_records)
+            ids[start:stop] = ids_var[start:stop]
+
+        # stable sort, so the records of a particle are in time order
+        self._id_order = np.argsort(ids, kind='mergesort')
+        self._sorted_ids = ids[self._id_order]
+
+        self._save_id_index()
+
+    def _save_id_index(self):
+        '''
+        save the index of the particle ids, if it can be written
+        '''
+        filename = self.index_filename
+        if filename is None:
+            return
+
+        tmp_path = None
+        try:
+            if not os.path.isdir(self.index_dir):
+                os.makedirs(self.index_dir, 0o700)
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.index_dir,
+                                            suffix='.part')
+            with os.fdopen(fd, 'wb') as outfile:
+                np.savez(outfile,
+                         state=self._file_state(),
+                         order=self._id_order,
+                         ids=self._sorted_ids)
+
+            replace_file(tmp_path, filename)
+            tmp_path = None
+        except (IOError, OSError):
+            # read only location -- just don't save it
+            pass
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def records_of(self, particle_id):
+        """
+        the timesteps and record numbers of the particle, in time order
+        """
+        self.build_id_index()
+
+        lo, hi = (np.searchsorted(self._sorted_ids, particle_id, side='left'),
+                  np.searchsorted(self._sorted_ids, particle_id, side='right'))
+        records = self._id_order[lo:hi]
+        timesteps = np.searchsorted(self.data_index, records, side='right') - 1
+
+        return timesteps, records
+
+    def get_trajectory(self, particle_id, variables=['latitude',
+                                                     'longitude']):
+        """
+        returns the requested variables from trajectory of an individual
+        particle as a dictionary keyed by the variable names, with the
+        timesteps the particle is in as 'timestep'
+        """
+        timesteps, records = self.records_of(particle_id)
+
+        data = {'timestep': timesteps}
+        for var in variables:
+            if len(records) == 0:
+                data[var] = np.zeros((0, ), dtype=self.nc.variables[var].dtype)
+            else:
+                data[var] = self.nc.variables[var][records]
+
+        return data
@@ -0,0 +1,230 @@
+"""
+Streaming writer for point shapefiles
+
+The shapefile outputter writes every element of every step as a point
+record. Writing these one at a time through the generic shapefile writer,
+and keeping them all in memory until the end of the run, was the slowest
+part of a run with shapefile output.
+
+PointShapefileWriter packs the records of a whole step with numpy
+structured arrays and appends them to the .shp, .shx and .dbf files that
+are kept open for the run. Only the file headers, which hold the record
+count and bounding box, are rewritten when the writer is closed.
+
+File format references:
+    ESRI Shapefile Technical Description, July 1998
+    dBASE III file structure (.dbf)
+"""
+import datetime
+
+import numpy as np
+
+
+SHAPE_POINT = 1
+
+# the .shp/.shx record header is big endian, the content little endian
+_shp_record = np.dtype([('number', '>i4'),
+                        ('length', '>i4'),
+                        ('shape_type', '<i4'),
+                        ('x', '<f8'),
+                        ('y', '<f8')])
+
+_shx_record = np.dtype([('offset', '>i4'),
+                        ('length', '>i4')])
+
+# lengths in the shapefile are in 16 bit words
+_header_words = 50
+_content_words = (_shp_record.itemsize - 8) / 2
+
+
+class PointShapefileWriter(object):
+    '''
+    Write point records, a block of them at a time, to the three files
+    of a shapefile: filename.shp, filename.shx and filename.dbf
+    '''
+    def __init__(self, filename, fields):
+        '''
+        :param filename: path of the shapefile without extension
+        :param fields: list of (name, type, size, decimal) tuples that
+            define the attribute columns. type is one of 'C' (string),
+            'N' (number) or 'F' (float). Like pyshp, numbers are written with
+            decimal digits after the point, or as integers if decimal is 0.
+        '''
+        self.filename = filename
+        self.fields = [(name[:11], ftype, int(size), int(decimal))
+                       for (name, ftype, size, decimal) in fields]
+
+        self.num_records = 0
+        self.bbox = None
+
+        self._dbf_dtype = np.dtype([('deleted', 'S1')] +
+                                   [('f{0}'.format(i), 'S{0}'.format(size))
+                                    for i, (_n, _t, size, _d)
+                                    in enumerate(self.fields)])
+
+        self._shp = open(filename + '.shp', 'wb')
+        self._shx = open(filename + '.shx', 'wb')
+        self._dbf = open(filename + '.dbf', 'wb')
+
+        # placeholders, written again on close()
+        self._write_headers()
+
+    @property
+    def closed(self):
+        return self._shp is None
+
+    def write(self, x, y, columns):
+        '''
+        append a block of points
+
+        :param x: array of longitudes
+        :param y: array of latitudes
+        :param columns: one value per field, in the order of the fields.
+            Each is an array the same length as x, or a scalar used for
+            all the records.
+        '''
+        num = len(x)
+        if num == 0:
+            return
+
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        shp = np.empty((num,), dtype=_shp_record)
+        shp['number'] = np.arange(self.num_records + 1,
+                                  self.num_records + num + 1)
+        shp['length'] = _content_words
+        shp['shape_type'] = SHAPE_POINT
+        shp['x'] = x
+        shp['y'] = y
+
+        shx = np.empty((num,), dtype=_shx_record)
+        shx['offset'] = (_header_words +
+                         (np.arange(num) + self.num_records) *
+                         (_shp_record.itemsize / 2))
+        shx['length'] = _content_words
+
+        dbf = np.empty((num,), dtype=self._dbf_dtype)
+        dbf['deleted'] = ' '
+        for i, (field, value) in enumerate(zip(self.fields, columns)):
+            dbf['f{0}'.format(i)] = self._format_column(field, value, num)
+
+        shp.tofile(self._shp)
+        shx.tofile(self._shx)
+        dbf.tofile(self._dbf)
+
+        block = (x.min(), y.min(), x.max(), y.max())
+        if self.bbox is None:
+            self.bbox = block
+        else:
+            self.bbox = (min(self.bbox[0], block[0]),
+                         min(self.bbox[1], block[1]),
+                         max(self.bbox[2], block[2]),
+                         max(self.bbox[3], block[3]))
+
+        self.num_records += num
+
+    def _format_column(self, field, value, num):
+        _name, ftype, size, decimal = field
+
+        if ftype == 'C':
+            if np.isscalar(value):
+                return np.repeat(str(value)[:size].ljust(size), num)
+
+            return np.char.ljust(np.asarray(value, dtype='S{0}'.format(size)),
+                                 size)
+
+        if decimal > 0:
+            fmt = '%{0}.{1}f'.format(size, decimal)
+        else:
+            fmt = '%{0}d'.format(size)
+            value = np.asarray(value).astype(np.int64)
+
+        values = np.char.mod(fmt, np.broadcast_to(value, (num,)))
+
+        # a value that does not fit would shift the following columns
+        too_long = np.char.str_len(values) > size
+        if too_long.any():
+            values[too_long] = '*' * size
+
+        return values
+
+    def close(self):
+        '''
+        write the final headers and close the files
+        '''
+        if self.closed:
+            return
+
+        self._write_headers()
+        self._dbf.write('\x1a')
+
+        for f in (self._shp, self._shx, self._dbf):
+            f.close()
+
+        self._shp = self._shx = self._dbf = None
+
+    def _write_headers(self):
+        shp_words = (_header_words +
+                     self.num_records * _shp_record.itemsize / 2)
+        shx_words = (_header_words +
+                     self.num_records * _shx_record.itemsize / 2)
+
+        self._shp.seek(0)
+        self._shp.write(self._shape_header(shp_words))
+        self._shp.seek(0, 2)
+
+        self._shx.seek(0)
+        self._shx.write(self._shape_header(shx_words))
+        self._shx.seek(0, 2)
+
+        self._dbf.seek(0)
+        self._dbf.write(self._dbf_header())
+        self._dbf.seek(0, 2)
+
+    def _shape_header(self, file_words):
+        bbox = self.bbox if self.bbox is not None else (0., 0., 0., 0.)
+
+        header = np.zeros((1,), dtype=[('code', '>i4'),
+                                       ('unused', '>i4', (5,)),
+                                       ('length', '>i4'),
+                                       ('version', '<i4'),
+                                       ('shape_type', '<i4'),
+                                       ('bbox', '<f8', (4,)),
+                                       ('z_m', '<f8', (4,))])
+        header['code'] = 9994
+        header['length'] = file_words
+        header['version'] = 1000
+        header['shape_type'] = SHAPE_POINT
+        header['bbox'] = bbox
+
+        return header.tostring()
+
+    def _dbf_header(self):
+        today = datetime.date.today()
+
+        header = np.zeros((1,), dtype=[('version', 'u1'),
+                                       ('date', 'u1', (3,)),
+                                       ('num_records', '<u4'),
+                                       ('header_size', '<u2'),
+                                       ('record_size', '<u2'),
+                                       ('reserved', 'u1', (20,))])
+        header['version'] = 3
+        header['date'] = (today.year - 1900, today.month, today.day)
+        header['num_records'] = self.num_records
+        header['header_size'] = 32 * (len(self.fields) + 1) + 1
+        header['record_size'] = self._dbf_dtype.itemsize
+
+        fields = np.zeros((len(self.fields),), dtype=[('name', 'S11'),
+                                                      ('type', 'S1'),
+                                                      ('address', 'u1', (4,)),
+                                                      ('size', 'u1'),
+                                                      ('decimal', 'u1'),
+                                                      ('reserved', 'u1', (14,))
+                                                      ])
+        fields['name'] = [f[0] for f in self.fields]
+        fields['type'] = [f[1] for f in self.fields]
+        fields['size'] = [f[2] for f in self.fields]
+        fields['decimal'] = [f[3] for f in self.fields]
+
+        return header.tostring() + fields.tostring() + '\r'
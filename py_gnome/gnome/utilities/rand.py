@@ -3,12 +3,146 @@ rand.py
 
 Contains functions for adding randomness - not to
 confuse with standard python random functions
+
+By default, gnome draws from the global python, numpy and C++ random
+number generators, so the numbers an element gets depend on the order in
+which the elements, spill containers and movers are processed. When the
+Model is given a random_seed, the spill containers carry a RandomStreams
+object instead: the random numbers are computed from a counter-based
+generator (Philox4x32-10) keyed by (seed, element id, step, purpose), so
+every element gets the same numbers however the elements are split
+between threads or processes.
 """
+import random
+import zlib
 
 import numpy as np
 
 from gnome.cy_gnome import cy_helpers
-import random
+
+
+# Philox4x32 multipliers and Weyl sequence constants
+_philox_m = (np.uint64(0xD2511F53), np.uint64(0xCD9E8D57))
+_philox_w = (0x9E3779B9, 0xBB67AE85)
+_philox_rounds = 10
+
+_mask32 = np.uint64(0xffffffff)
+_shift32 = np.uint64(32)
+
+
+def philox4x32(counter, key):
+    """
+    Philox4x32-10 counter-based random number generator (Salmon et al.,
+    "Parallel random numbers: as easy as 1, 2, 3", SC11)
+
+    :param counter: (4, N) array of 32 bit counters
+    :param key: tuple of two 32 bit ints
+
+    :returns: (4, N) array of random 32 bit words, as uint64
+    """
+    c0, c1, c2, c3 = [np.asarray(c, dtype=np.uint64) & _mask32
+                      for c in counter]
+    k0, k1 = [int(k) & 0xffffffff for k in key]
+
+    for i in range(_philox_rounds):
+        prod0 = _philox_m[0] * c0
+        prod1 = _philox_m[1] * c2
+
+        c0, c1, c2, c3 = ((prod1 >> _shift32) ^ c1 ^ np.uint64(k0),
+                          prod1 & _mask32,
+                          (prod0 >> _shift32) ^ c3 ^ np.uint64(k1),
+                          prod0 & _mask32)
+
+        k0 = (k0 + _philox_w[0]) & 0xffffffff
+        k1 = (k1 + _philox_w[1]) & 0xffffffff
+
+    return np.array((c0, c1, c2, c3))
+
+
+class RandomStreams(object):
+    """
+    Random numbers for the elements that depend only on the seed, the id
+    of the element, the model step and what they are used for
+    """
+    def __init__(self, seed=1):
+        """
+        :param seed=1: seed of the streams, up to 64 bits
+        """
+        self.seed = seed
+
+        # set by the model at the start of each step
+        self.step = 0
+
+    @property
+    def key(self):
+        return (self.seed & 0xffffffff, (self.seed >> 32) & 0xffffffff)
+
+    @staticmethod
+    def purpose_key(purpose):
+        return zlib.crc32(purpose) & 0xffffffff
+
+    def uniform(self, ids, purpose, low=0., high=1., draws=None):
+        """
+        uniformly distributed random numbers in [low, high)
+
+        :param ids: ids of the elements
+        :param purpose: string naming what the numbers are used for, so
+            different uses get independent numbers
+        :param draws=None: number of values per element. If None, one value
+            per element is returned as an array the shape of ids, otherwise
+            an array of shape (len(ids), draws)
+        """
+        ids = np.asarray(ids, dtype=np.uint64).reshape(-1)
+        num = 1 if draws is None else draws
+
+        # each block of 4 words gives 2 doubles
+        blocks = (num + 1) // 2
+        counter = np.zeros((4, len(ids), blocks), dtype=np.uint64)
+        counter[0] = ids[:, np.newaxis]
+        counter[1] = self.step
+        counter[2] = self.purpose_key(purpose)
+        counter[3] = np.arange(blocks)
+
+        words = philox4x32(counter.reshape(4, -1), self.key)
+
+        # 53 bit doubles from pairs of words, as numpy's random_sample
+        words = words.reshape(2, 2, len(ids) * blocks)
+        values = (((words[:, 0] >> np.uint64(5)).astype(np.float64) *
+                   67108864. +
+                   (words[:, 1] >> np.uint64(6)).astype(np.float64)) /
+                  9007199254740992.)
+        values = values.T.reshape(len(ids), 2 * blocks)[:, :num]
+
+        if draws is None:
+            values = values[:, 0]
+
+        return low + values * (np.asarray(high) - low)
+
+
+def element_uniform(sc, purpose, index=None, draws=None):
+    """
+    uniform random numbers in [0, 1) for the elements of spill container
+    sc from its random streams
+
+    :param purpose: what the numbers are used for
+    :param index=None: index of the elements that need numbers. Default is
+        all the elements
+    :param draws=None: see :meth:`RandomStreams.uniform`
+
+    :returns: the random numbers, or None if sc has no random streams, in
+        which case the caller draws from the global generators
+    """
+    streams = getattr(sc, 'random_streams', None)
+
+    if streams is None:
+        return None
+
+    ids = sc['id'] if index is None else sc['id'][index]
+
+    if sc.uncertain:
+        purpose += '_uncertain'
+
+    return streams.uniform(ids, purpose, draws=draws)
 
 
 def random_with_persistance(
@@ -17,6 +151,7 @@ def random_with_persistance(
     array=None,  # update this array, if provided
     persistence=None,
     time_step=1.,
+    rnd=None,
     ):
     """
     Used by gnome to generate a randomness between low and high, which is
@@ -33,6 +168,9 @@ def random_with_persistance(
         size of time_step. Default is None. If persistence is None, it gets set
         equal to 'time_step'. If persistence < 0 for any elements, their values
         are not updated in the 'array'
+    :param rnd: uniform random numbers in [0, 1), one per element, such as
+        the ones given by element_uniform(). Default is None, in which case
+        they are drawn from numpy's global generator
 
     :returns: returns 'array' with newly computed values
 
@@ -81,7 +219,10 @@ def random_with_persistance(
         if persistence == time_step, then no need to scale the [low, high]
         interval
         """
-        array[:] = np.random.uniform(low, high)
+        if rnd is None:
+            array[:] = np.random.uniform(low, high)
+        else:
+            array[:] = low + rnd * (high - low)
     else:
         """
         if persistence == time_step, then no need to scale the [low, high]
@@ -107,7 +248,12 @@ def random_with_persistance(
                 low[u_mask] = mean - l__range / 2.
                 high[u_mask] = mean + l__range / 2.
 
-            array[u_mask] = np.random.uniform(low[u_mask], high[u_mask])
+            if rnd is None:
+                array[u_mask] = np.random.uniform(low[u_mask], high[u_mask])
+            else:
+                array[u_mask] = (low[u_mask] +
+                                 np.asarray(rnd)[u_mask] *
+                                 (high[u_mask] - low[u_mask]))
 
     return array
 
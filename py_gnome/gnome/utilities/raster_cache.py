@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+
+"""
+persistent on-disk cache of the land rasters drawn by the raster maps
+
+Drawing the land polygons into the raster and building the coarser layers
+takes seconds for a detailed coastline, and it is done every time a map is
+created -- including every time a save file is loaded. The result only
+depends on the content of the map file, the raster size and the projection,
+so it is stored on disk keyed by these.
+
+Each layer is stored in a .npy file and loaded memory mapped, so all the
+processes that use the same map share the pages of one copy through the
+OS file cache.
+
+Unlike the ElementCache, this cache is meant to outlive the python process.
+It goes in GNOME_RASTER_CACHE_DIR if that environment variable is set,
+otherwise in the cache dir of the user: $XDG_CACHE_HOME/gnome/raster_cache
+(~/.cache/gnome/raster_cache by default), or
+%LOCALAPPDATA%\\gnome\\raster_cache on Windows. It is limited to
+GNOME_RASTER_CACHE_SIZE bytes (1GB by default): when an entry is saved, the
+least recently used entries are deleted to stay under the limit.
+"""
+import os
+import getpass
+import hashlib
+import tempfile
+import shutil
+
+import numpy as np
+
+
+def user_cache_dir(name):
+    '''
+    the dir of the cache: name of the user running the process
+    '''
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME')
+        if not base and os.path.expanduser('~') != '~':
+            base = os.path.join(os.path.expanduser('~'), '.cache')
+
+    if not base:
+        # no home dir - a dir of the user in the system temp dir
+        return os.path.join(tempfile.gettempdir(),
+                            'gnome_{0}_{1}'.format(name, getpass.getuser()))
+
+    return os.path.join(base, 'gnome', name)
+
+
+_raster_cache_dir = os.environ.get('GNOME_RASTER_CACHE_DIR',
+                                   user_cache_dir('raster_cache'))
+
+_raster_cache_size = int(os.environ.get('GNOME_RASTER_CACHE_SIZE',
+                                        2 ** 30))
+
+
+class RasterCache(object):
+    '''
+    Store the layers of a RasterMap keyed by source file content, raster
+    size and projection
+    '''
+    # bump this if the way the rasters are drawn changes so old entries are
+    # not used
+    version = 1
+
+    def __init__(self, cache_dir=None, enabled=True, max_bytes=None):
+        '''
+        :param cache_dir=None: directory for the cache. Defaults to
+            GNOME_RASTER_CACHE_DIR or the cache dir of the user
+        :param enabled=True: if False, load() always misses and save() does
+            nothing
+        :param max_bytes=None: size limit of the cache. Defaults to
+            GNOME_RASTER_CACHE_SIZE or 1GB
+        '''
+        self.cache_dir = _raster_cache_dir if cache_dir is None else cache_dir
+        self.enabled = enabled
+        self.max_bytes = (_raster_cache_size if max_bytes is None
+                          else max_bytes)
+
+    def key(self, filename, raster_size, projection, *args):
+        '''
+        return the key for a raster drawn from filename
+
+        :param filename: file the raster is drawn from - its content is
+            hashed so a changed file is drawn again
+        :param raster_size: raster_size the map was created with
+        :param projection: projection object of the raster
+        :param args: anything else the raster depends on - must have a
+            repeatable str()
+        '''
+        file_hash = hashlib.sha1()
+        with open(filename, 'rb') as infile:
+            for chunk in iter(lambda: infile.read(1 << 20), b''):
+                file_hash.update(chunk)
+
+        params = hashlib.sha1(repr((self.version,
+                                    int(raster_size),
+                                    projection.__class__.__name__) +
+                                   tuple([str(a) for a in args])))
+
+        return '{0}_{1}'.format(file_hash.hexdigest(),
+                                params.hexdigest()[:16])
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        '''
+        return the list of layers stored for key, coarsest first like
+        RasterMap.layers, or None if it is not in the cache
+
+        The layers are memory mapped copy-on-write so pages are shared
+        between processes, but the arrays are still writable as the Cython
+        land check expects.
+        '''
+        if not self.enabled:
+            return None
+
+        entry = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry, 'layers')) as infile:
+                num_layers = int(infile.read())
+
+            layers = [np.load(os.path.join(entry,
+                                           'layer_{0}.npy'.format(i)),
+                              mmap_mode='c')
+                      for i in range(num_layers)]
+        except (IOError, OSError, ValueError):
+            # not in cache or a partially written/corrupt entry
+            return None
+
+        try:
+            # the entry was used - see _evict()
+            os.utime(entry, None)
+        except OSError:
+            pass
+
+        return layers
+
+    def save(self, key, layers):
+        '''
+        store the layers for key
+
+        The entry is written to a temporary dir which is renamed into place,
+        so other processes never see a partial entry. Failing to write the
+        cache is not an error - the map has already been drawn.
+        '''
+        if not self.enabled:
+            return
+
+        if sum([layer.nbytes for layer in layers]) > self.max_bytes:
+            return
+
+        entry = self._entry_dir(key)
+        tmp_dir = None
+        try:
+            if not os.path.isdir(self.cache_dir):
+                # only the user can read the cache
+                os.makedirs(self.cache_dir, 0o700)
+
+            tmp_dir = tempfile.mkdtemp(prefix='tmp', dir=self.cache_dir)
+            for i, layer in enumerate(layers):
+                np.save(os.path.join(tmp_dir, 'layer_{0}.npy'.format(i)),
+                        np.ascontiguousarray(layer))
+
+            # written last - load() treats entry without it as missing
+            with open(os.path.join(tmp_dir, 'layers'), 'w') as outfile:
+                outfile.write(str(len(layers)))
+
+            os.rename(tmp_dir, entry)
+            tmp_dir = None
+        except (IOError, OSError):
+            # entry was written by another process in the meantime, or the
+            # cache dir is not writable
+            pass
+        finally:
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self._evict(keep=key)
+
+    def _entries(self):
+        '''
+        list of (last used time, size in bytes, key) of the entries
+        '''
+        entries = []
+
+        for key in os.listdir(self.cache_dir):
+            entry = self._entry_dir(key)
+            if key.startswith('tmp') or not os.path.isdir(entry):
+                # being written by save()
+                continue
+
+            try:
+                size = sum([os.path.getsize(os.path.join(entry, name))
+                            for name in os.listdir(entry)])
+                entries.append((os.path.getmtime(entry), size, key))
+            except OSError:
+                # deleted by another process in the meantime
+                pass
+
+        return entries
+
+    def _evict(self, keep=None):
+        '''
+        delete the least recently used entries, except keep, until the
+        cache is not larger than max_bytes
+
+        Processes that have the layers of a deleted entry memory mapped
+        keep them; on Windows the entries that are in use are not deleted.
+        '''
+        try:
+            entries = sorted(self._entries())
+        except OSError:
+            return
+
+        total = sum([size for _t, size, _k in entries])
+
+        for _t, size, key in entries:
+            if total <= self.max_bytes:
+                break
+
+            if key == keep:
+                continue
+
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            if not os.path.exists(self._entry_dir(key)):
+                total -= size
+
+    def clear(self):
+        '''
+        delete all entries in the cache
+        '''
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+# default cache used by the maps
+raster_cache = RasterCache()
@@ -103,6 +103,8 @@ class CleanUpBase(RemoveMass, Weatherer):
     Just need to add a few internal methods for Skimmer + Burn common code
     Currently defined as a base class.
     '''
+    _checkpoint_attrs = Weatherer._checkpoint_attrs + ('_timestep',)
+
     def __init__(self, **kwargs):
         '''
         add 'frac_water' to array_types and pass **kwargs to base class
@@ -422,6 +424,12 @@ class Burn(CleanUpBase):
     valid_area_units = _valid_units('Area')
     valid_length_units = _valid_units('Length')
 
+    # the rates, and so the active stop, are set from the elements marked
+    # for burning during the run
+    _checkpoint_attrs = CleanUpBase._checkpoint_attrs + (
+        '_active_range', '_oilwater_thickness', '_oilwater_thick_burnrate',
+        '_oil_vol_burnrate')
+
     def __init__(self,
                  area,
                  thickness,
@@ -854,7 +862,7 @@ class ChemicalDispersion(CleanUpBase):
             # if wave height > 6.4 m, we get negative results - log and
             # reset to 0 if this occurs
             # can efficiency go to 0? Is there a minimum threshold?
-            w = 0.3 * self.waves.get_value(points, model_time)[0]
+            w = 0.3 * self.get_wave_values(points, model_time)[0]
             efficiency = (0.241 + 0.587*w - 0.191*w**2 +
                           0.02616*w**3 - 0.0016 * w**4 -
                           0.000037*w**5)
@@ -24,6 +24,11 @@ class Weatherer(Process):
     '''
     _schema = WeathererSchema  # nothing new added so use this schema
 
+    # EnvironmentSamples object shared by the weatherers in a Model - the
+    # Model sets it in setup_model_run(). If None, values sampled from
+    # environment objects are computed on every call
+    env_samples = None
+
     def __init__(self, **kwargs):
         '''
         Base weatherer class; defines the API for all weatherers
@@ -94,11 +99,26 @@ class Weatherer(Process):
         mass_remain = M_0 * np.exp(lambda_ * time)
         return mass_remain
 
+    def _sample(self, obj, quantity, points, model_time, compute, *args):
+        '''
+        return compute(points, model_time, *args) - the value is shared with
+        the other weatherers through env_samples if it is set
+        '''
+        if self.env_samples is None:
+            return compute(points, model_time, *args)
+
+        return self.env_samples.get(obj, quantity, points, model_time,
+                                    compute, *args)
+
     def get_wind_speed(self, points, model_time,
                        coord_sys='r', fill_value=1.0):
         '''
             Wrapper for the weatherers so they can get wind speeds
         '''
+        return self._sample(self.wind, 'wind_speed', points, model_time,
+                            self._wind_speed, coord_sys, fill_value)
+
+    def _wind_speed(self, points, model_time, coord_sys, fill_value):
         retval = self.wind.at(points, model_time, coord_sys=coord_sys)
 
         if isinstance(retval, np.ma.MaskedArray):
@@ -106,6 +126,37 @@ class Weatherer(Process):
         else:
             return retval
 
+    def get_wave_values(self, points, model_time):
+        '''
+        Wrapper for the weatherers so they can get the values returned by
+        Waves.get_value(): (wave_height, peak_period, whitecap_fraction,
+        dissipation_energy)
+        '''
+        return self._sample(self.waves, 'wave_values', points, model_time,
+                            self.waves.get_value)
+
+    def get_emulsification_wind(self, points, model_time):
+        '''
+        Wrapper for the weatherers so they can get
+        Waves.get_emulsification_wind()
+        '''
+        return self._sample(self.waves, 'emulsification_wind', points,
+                            model_time, self.waves.get_emulsification_wind)
+
+    def get_water_property(self, attr, unit=None, water=None):
+        '''
+        Wrapper for Water.get() so the unit conversion is only done once per
+        step
+
+        :param water=None: Water object - defaults to self.water
+        '''
+        if water is None:
+            water = self.water
+
+        return self._sample(water, attr, None, None,
+                            lambda points, time: water.get(attr, unit),
+                            unit)
+
     def check_time(self, wind, model_time):
         '''
             Should have an option to extrapolate but for now we do by default
@@ -79,8 +79,11 @@ class Evaporation(Weatherer):
 
         .. note:: wind speed is at least 1 m/s.
         '''
-        wind_speed = self.get_wind_speed(points, model_time, fill_value=1.0)
-        wind_speed[wind_speed < 1.0] = 1.0
+        # wind speed is shared with other weatherers so don't change it in
+        # place
+        wind_speed = np.maximum(self.get_wind_speed(points, model_time,
+                                                    fill_value=1.0),
+                                1.0)
         c_evap = 0.0025     # if wind_speed in m/s
         return np.where(wind_speed <= 10.0,
                         c_evap * wind_speed ** 0.78,
@@ -89,7 +92,7 @@ class Evaporation(Weatherer):
     def _set_evap_decay_constant(self, points, model_time, data, substance, time_step):
         # used to compute the evaporation decay constant
         K = self._mass_transport_coeff(points, model_time)
-        water_temp = self.water.get('temperature', 'K')
+        water_temp = self.get_water_property('temperature', 'K')
 
         f_diff = 1.0
         if 'frac_water' in data:
@@ -219,7 +222,7 @@ class BlobEvaporation(Evaporation):
         # blobs released together
         # used to compute the evaporation decay constant
         K = self._mass_transport_coeff(model_time)
-        water_temp = self.water.get('temperature', 'K')
+        water_temp = self.get_water_property('temperature', 'K')
 
         f_diff = 1.0
         if 'frac_water' in data:
@@ -93,7 +93,7 @@ class NaturalDispersion(Weatherer):
                 continue
             points = data['positions']
             # from the waves module
-            waves_values = self.waves.get_value(points, model_time)
+            waves_values = self.get_wave_values(points, model_time)
             wave_height = waves_values[0]
             frac_breaking_waves = waves_values[2]
             disp_wave_energy = waves_values[3]
@@ -102,7 +102,8 @@ class NaturalDispersion(Weatherer):
             rho_w = self.waves.water.density
 
             # web has different units
-            sediment = self.waves.water.get('sediment', unit='kg/m^3')
+            sediment = self.get_water_property('sediment', 'kg/m^3',
+                                               water=self.waves.water)
             V_entrain = constants.volume_entrained
             ka = constants.ka  # oil sticking term
 
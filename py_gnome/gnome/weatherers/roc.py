@@ -319,6 +319,8 @@ class Platform(GnomeId):
 
     _schema = PlatformSchema
 
+    _checkpoint_attrs = ('_ts_spray_time',)
+
     def __init__(self,
                  units=None,
                  type='Platform',
@@ -638,6 +640,17 @@ class Disperse(Response):
     _si_units = dict([(k, v[0]) for k, v in _attr.items()])
     _units_type = dict([(k, (v[1], v[2])) for k, v in _attr.items()])
 
+    # where the platform is in its sorties
+    _checkpoint_attrs = Response._checkpoint_attrs + (
+        'cur_state', '_next_state_time', '_op_start', '_op_end',
+        '_cur_pass_num', '_remaining_dispersant', '_time_spraying',
+        '_area_sprayed_this_sortie', '_area_sprayed_this_ts',
+        '_disp_sprayed_this_timestep', 'disp_sprayed_this_timestep',
+        '_ts_payloads_delivered', 'oil_treated_this_timestep')
+
+    # the platform keeps the spray time of the current time step
+    _checkpoint_children = ('platform',)
+
     _schema = DisperseSchema
 
     wind_eff_list = [15, 30, 45, 60, 70, 78, 80, 82,
@@ -1620,6 +1633,7 @@ class Disperse(Response):
             new_status[zero_or_disp] = bt_fate.disperse
 
             sc['fate_status'][idxs] = new_status
+            sc.clear_fate_masks()
 
             self.oil_treated_this_timestep = 0
             self.disp_sprayed_this_timestep = 0
@@ -1682,6 +1696,14 @@ class Burn(Response):
 
     _schema = BurnSchema
 
+    # where the boom is in its collect, transit, burn and clean cycle
+    _checkpoint_attrs = Response._checkpoint_attrs + (
+        '_is_collecting', '_is_transiting', '_is_burning', '_is_cleaning',
+        '_is_boom_full', '_boom_capacity', '_boomed_density',
+        '_offset_time_remaining', '_burn_time', '_burn_time_remaining',
+        '_burn_rate', '_cleaning_time_remaining', '_time_burning',
+        '_time_collecting_in_sim')
+
     def __init__(self,
                  offset=None,
                  boom_length=None,
@@ -2102,6 +2124,11 @@ class Skim(Response):
 
     _schema = SkimSchema
 
+    # where the skimmer is in its collect, transit and offload cycle
+    _checkpoint_attrs = Response._checkpoint_attrs + (
+        '_is_collecting', '_is_transiting', '_is_offloading',
+        '_storage_remaining', '_transit_remaining', '_offload_remaining')
+
     def __init__(self,
                  speed=None,
                  storage=None,
@@ -18,6 +18,7 @@ from gnome.constants import gravity
 from gnome import constants
 from .core import Weatherer
 from gnome.exceptions import GnomeRuntimeError
+from gnome.utilities.blobs import BlobIndex
 
 from .core import WeathererSchema
 from gnome.persist.base_schema import GeneralGnomeObjectSchema
@@ -43,6 +44,9 @@ class FayGravityViscous(Weatherer):
     # object used to model spreading of oil and area computation
     _ref_as = 'spreading'
 
+    _checkpoint_attrs = Weatherer._checkpoint_attrs + (
+        'is_first_step', '_init_relative_buoyancy')
+
     def __init__(self, water=None, **kwargs):
         '''
         initialize object - invoke super, add required data_arrays.
@@ -73,6 +77,18 @@ class FayGravityViscous(Weatherer):
         depends on blob volume, but is on the order of minutes. Cache upto 4
         inputs - don't expect 4 or more spills in one scenario.
         '''
+        return self._transient_time(water_viscosity,
+                                    relative_buoyancy,
+                                    blob_init_vol)
+
+    def _transient_time(self,
+                        water_viscosity,
+                        relative_buoyancy,
+                        blob_init_vol):
+        '''
+        uncached version of _gravity_spreading_t0 - blob_init_vol can be an
+        array containing the initial volume of each blob
+        '''
         # time to reach a0
         t0 = ((self.spreading_const[1] / self.spreading_const[0]) ** 4.0 *
               (blob_init_vol / (water_viscosity * constants.gravity *
@@ -150,7 +166,8 @@ class FayGravityViscous(Weatherer):
                     relative_buoyancy,
                     blob_init_volume,
                     area,
-                    age):
+                    age,
+                    blobs=None):
         '''
         update area array in place, also return area array
         each blob is defined by its age. This updates the area of each blob,
@@ -183,6 +200,9 @@ class FayGravityViscous(Weatherer):
             viscosity of oil. This is used by Langmuir since the process acts
             on particles after spreading completes.
         :type at_max_area: numpy array of bools
+        :param blobs: optional BlobIndex that groups the LEs into blobs. If
+            None, LEs are grouped by age.
+        :type blobs: gnome.utilities.blobs.BlobIndex
 
         :returns: (updated 'area' array, updated 'at_max_area' array).
             It also changes the input 'area' array and the 'at_max_area' bool
@@ -193,39 +213,40 @@ class FayGravityViscous(Weatherer):
             msg = "use init_area for age == 0"
             raise ValueError(msg)
 
-        # update area for each blob of LEs
-        for b_age in np.unique(age):
-            # within each age blob_init_volume should also be the same
-            m_age = b_age == age
-            t0 = self._gravity_spreading_t0(water_viscosity,
-                                            relative_buoyancy,
-                                            blob_init_volume[m_age][0])
-
-            if b_age <= t0:
-                '''
-                only update initial area, A_0, if age is past the transient
-                phase. Expect this to be the case since t0 is on the order of
-                minutes; but do a check in case we want to experiment with
-                smaller timesteps.
-                '''
-                continue
-
-            # now update area of old LEs - only update till max area is reached
-            max_area = blob_init_volume[m_age][0] / self.thickness_limit
-            if area[m_age].sum() < max_area:
-                # update area
-                blob_area = self._update_blob_area(water_viscosity,
-                                                   relative_buoyancy,
-                                                   blob_init_volume[m_age][0],
-                                                   age[m_age][0])
+        if blobs is None:
+            blobs = BlobIndex(age)
 
-                if blob_area >= max_area:
-                    area[m_age] = max_area / m_age.sum()
-                else:
-                    area[m_age] = blob_area / m_age.sum()
-
-                self.logger.debug('{0}\tarea after update: {1}'
-                                  .format(self._pid, blob_area))
+        # update area for each blob of LEs
+        # within each blob, age and blob_init_volume are the same
+        b_age = blobs.first(age)
+        b_init_vol = blobs.first(blob_init_volume)
+        b_area = blobs.sum(area)
+
+        # only update initial area, A_0, if age is past the transient phase.
+        # Expect this to be the case since t0 is on the order of minutes; but
+        # do a check in case we want to experiment with smaller timesteps.
+        # Only update till max area is reached
+        max_area = b_init_vol / self.thickness_limit
+        update = ((b_age > self._transient_time(water_viscosity,
+                                                relative_buoyancy,
+                                                b_init_vol)) &
+                  (b_area < max_area))
+
+        if np.any(update):
+            blob_area = self._update_blob_area(water_viscosity,
+                                               relative_buoyancy,
+                                               b_init_vol[update],
+                                               b_age[update])
+
+            new_area = np.zeros_like(b_area)
+            new_area[update] = (np.minimum(blob_area, max_area[update]) /
+                                blobs.counts[update])
+
+            e_update = blobs.broadcast(update)
+            area[e_update] = blobs.broadcast(new_area)[e_update]
+
+            self.logger.debug('{0}\tarea after update: {1}'
+                              .format(self._pid, blob_area))
 
         return area
 
@@ -235,7 +256,8 @@ class FayGravityViscous(Weatherer):
                      blob_init_volume,
                      area,
                      time_step,
-                     age):
+                     age,
+                     blobs=None):
         '''
         update area array in place, also return area array
         each blob is defined by its age. This updates the area of each blob,
@@ -268,6 +290,9 @@ class FayGravityViscous(Weatherer):
             viscosity of oil. This is used by Langmuir since the process acts
             on particles after spreading completes.
         :type at_max_area: numpy array of bools
+        :param blobs: optional BlobIndex that groups the LEs into blobs. If
+            None, LEs are grouped by age.
+        :type blobs: gnome.utilities.blobs.BlobIndex
 
         :returns: (updated 'area' array, updated 'at_max_area' array).
             It also changes the input 'area' array and the 'at_max_area' bool
@@ -278,76 +303,63 @@ class FayGravityViscous(Weatherer):
             msg = "use init_area for age == 0"
             raise ValueError(msg)
 
+        if blobs is None:
+            blobs = BlobIndex(age)
+
         # update area for each blob of LEs
-        for b_age in np.unique(age):
-            # within each age blob_init_volume should also be the same
-            m_age = b_age == age
-            t0 = self._gravity_spreading_t0(water_viscosity,
-                                            relative_buoyancy,
-                                            blob_init_volume[m_age][0])
-
-            if b_age <= t0:
-                '''
-                only update initial area, A_0, if age is past the transient
-                phase. Expect this to be the case since t0 is on the order of
-                minutes; but do a check in case we want to experiment with
-                smaller timesteps.
-                '''
-                continue
+        # within each blob, age and blob_init_volume are the same
+        b_age = blobs.first(age)
+        b_init_vol = blobs.first(blob_init_volume)
+        b_area = blobs.sum(area)
+
+        # only update initial area, A_0, if age is past the transient phase.
+        # Expect this to be the case since t0 is on the order of minutes; but
+        # do a check in case we want to experiment with smaller timesteps.
+        # Only update till max area is reached
+        max_area = b_init_vol / self.thickness_limit
+        update = ((b_age > self._transient_time(water_viscosity,
+                                                relative_buoyancy,
+                                                b_init_vol)) &
+                  (b_area < max_area))
+
+        if not np.any(update):
+            return area
 
-            # now update area of old LEs - only update till max area is reached
-            max_area = blob_init_volume[m_age][0] / self.thickness_limit
-            if area[m_age].sum() < max_area:
-                if self.is_first_step:
-                    self.is_first_step = False
-                    # update area
-                    blob_area = self._update_blob_area(water_viscosity,
-                                                       relative_buoyancy,
-                                                       blob_init_volume[m_age][0],
-                                                       age[m_age][0])
-
-                    # blob_area2 = self._update_blob_area(water_viscosity,
-                    #                                     relative_buoyancy,
-                    #                                     blob_init_volume[m_age][0],
-                    #                                     age[m_age][0]/2)
-
-                else:
-                    blob_area4 = self._update_blob_area(water_viscosity,
-                                                        relative_buoyancy,
-                                                        blob_init_volume[m_age][0],
-                                                        age[m_age][0])
-
-                    C = (np.pi *
-                         self.spreading_const[1] ** 2 *
-                         (blob_init_volume[m_age][0] ** 2 *
-                          constants.gravity *
-                          relative_buoyancy /
-                          np.sqrt(water_viscosity)) ** (1. / 3.))
-
-                    # blob_area_fgv = .5 * C**2 / area[m_age].sum()	# make sure area > 0
-                    # blob_area_fgv = area[m_age][0] + .5 * (C**2 / area[m_age][0]) * time_step	# make sure area > 0
-                    # blob_area_fgv = area[m_age][0] + .5 * (C**2 / area[m_age][0]) * time_step	# make sure area > 0
-                    blob_area_fgv = area[m_age].sum() + .5 * (C**2 / area[m_age].sum()) * time_step	# make sure area > 0
-                    # blob_area_fgv = blob_area2 + .5 * (C**2 / blob_area2) * time_step	# make sure area > 0
-
-                    K = 4 * np.pi * 2 * .033
-
-                    # blob_area_diffusion = (7 / 6) * K * (area[m_age].sum() / K) ** (1 / 7)
-                    blob_area_diffusion = area[m_age].sum() + ((7 / 6) * K * (area[m_age].sum() / K) ** (1 / 7)) * time_step
-                    # blob_area_diffusion = area[m_age][0] + ((7 / 6) * K * (area[m_age][0] / K) ** (1 / 7)) * time_step
-                    # blob_area_diffusion = blob_area2 + ((7 / 6) * K * (blob_area2 / K) ** (1 / 7)) * time_step
-
-                    # blob_area = blob_area_fgv
-                    blob_area = blob_area_fgv + blob_area_diffusion
-                    # blob_area = blob_area_diffusion
-
-                if blob_area >= max_area:
-                    area[m_age] = max_area / m_age.sum()
-                else:
-                    area[m_age] = blob_area / m_age.sum()
-
-                self.logger.debug('{0}\tarea after update: {1}'
-                                  .format(self._pid, blob_area))
+        u_area = b_area[update]
+        u_init_vol = b_init_vol[update]
+
+        C = (np.pi *
+             self.spreading_const[1] ** 2 *
+             (u_init_vol ** 2 *
+              constants.gravity *
+              relative_buoyancy /
+              np.sqrt(water_viscosity)) ** (1. / 3.))
+
+        blob_area_fgv = u_area + .5 * (C**2 / u_area) * time_step	# make sure area > 0
+
+        K = 4 * np.pi * 2 * .033
+
+        blob_area_diffusion = u_area + ((7 / 6) * K * (u_area / K) ** (1 / 7)) * time_step
+
+        blob_area = blob_area_fgv + blob_area_diffusion
+
+        if self.is_first_step:
+            # first blob to be updated in the run uses the Fay area
+            self.is_first_step = False
+            blob_area[0] = self._update_blob_area(water_viscosity,
+                                                  relative_buoyancy,
+                                                  u_init_vol[0],
+                                                  b_age[update][0])
+
+        new_area = np.zeros_like(b_area)
+        new_area[update] = (np.minimum(blob_area, max_area[update]) /
+                            blobs.counts[update])
+
+        e_update = blobs.broadcast(update)
+        area[e_update] = blobs.broadcast(new_area)[e_update]
+
+        self.logger.debug('{0}\tarea after update: {1}'
+                          .format(self._pid, blob_area))
 
         return area
 
@@ -464,28 +476,23 @@ class FayGravityViscous(Weatherer):
         if not self.active:
             return
 
-        water_kvis = self.water.get('kinematic_viscosity',
-                                    'square meter per second')
+        water_kvis = self.get_water_property('kinematic_viscosity',
+                                             'square meter per second')
         for _, data in sc.itersubstancedata(self.array_types):
             if len(data['fay_area']) == 0:
                 continue
 
-            for s_num in np.unique(data['spill_num']):
-                s_mask = data['spill_num'] == s_num
-                data['fay_area'][s_mask] = \
-                    self.update_area2(water_kvis,
-                                     self._init_relative_buoyancy,
-                                     data['bulk_init_volume'][s_mask],
-                                     data['fay_area'][s_mask],
-                                     time_step,
-                                     data['age'][s_mask] + time_step)
-#                     self.update_area(water_kvis,
-#                                      self._init_relative_buoyancy,
-#                                      data['bulk_init_volume'][s_mask],
-#                                      data['fay_area'][s_mask],
-#                                      data['age'][s_mask] + time_step)
-
-                data['area'][s_mask] = data['fay_area'][s_mask]
+            # blobs of oil are LEs from the same spill with the same age
+            data['fay_area'][:] = \
+                self.update_area2(water_kvis,
+                                  self._init_relative_buoyancy,
+                                  data['bulk_init_volume'],
+                                  data['fay_area'],
+                                  time_step,
+                                  data['age'] + time_step,
+                                  sc.get_blob_index())
+
+            data['area'][:] = data['fay_area']
 
         sc.update_from_fatedataview()
 
@@ -617,7 +624,7 @@ class Langmuir(Weatherer):
             return
 
         #return
-        rho_h2o = self.water.get('density', 'kg/m^3')
+        rho_h2o = self.get_water_property('density', 'kg/m^3')
         for _, data in sc.itersubstancedata(self.array_types):
             #if len(data['area']) == 0:
             if len(data['fay_area']) == 0:
@@ -625,23 +632,22 @@ class Langmuir(Weatherer):
 
             points = data['positions']
 
-            for s_num in np.unique(data['spill_num']):
-                s_mask = data['spill_num'] == s_num
-                # thickness for blob of oil released together - need per spill
-                # Use the 'bulk_init_volume' and the 'fay_area' of the
-                # blob of oil. Each LE used to model the blob will have the
-                # same thickness. In order to get the 'fay_area' for the blob
-                # of oil released at same time, from same spill, sum
-                # the 'fay_area' array for elements that belong to same oil
-                # blob.
-                thickness = (data['bulk_init_volume'][s_mask][0] /
-                             data['fay_area'][s_mask].sum())
-
-                # assume only one type of oil is modeled so thickness_limit is
-                # already set and constant for all
-                rel_buoy = (rho_h2o - data['density'][s_mask]) / rho_h2o
-                data['frac_coverage'][s_mask] = \
-                    self._get_frac_coverage(points, model_time, rel_buoy, thickness)
+            # thickness for blob of oil released together - need per spill
+            # Use the 'bulk_init_volume' and the 'fay_area' of the
+            # blob of oil. Each LE used to model the blob will have the
+            # same thickness. In order to get the 'fay_area' for the blob
+            # of oil released at same time, from same spill, sum
+            # the 'fay_area' array for elements that belong to same oil
+            # blob.
+            spills = BlobIndex(data['spill_num'])
+            thickness = spills.broadcast(spills.first(data['bulk_init_volume']) /
+                                         spills.sum(data['fay_area']))
+
+            # assume only one type of oil is modeled so thickness_limit is
+            # already set and constant for all
+            rel_buoy = (rho_h2o - data['density']) / rho_h2o
+            data['frac_coverage'][:] = \
+                self._get_frac_coverage(points, model_time, rel_buoy, thickness)
 
             # update 'area'
             data['area'][:] = data['fay_area'] * data['frac_coverage']
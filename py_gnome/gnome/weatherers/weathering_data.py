@@ -119,7 +119,7 @@ class WeatheringData(Weatherer):
         if not self.active:
             return
 
-        water_rho = self.water.get('density')
+        water_rho = self.get_water_property('density')
 
         for substance, data in sc.itersubstancedata(self.array_types):
         #for substance, data in sc.itersubstancedata(self.array_types,
@@ -213,11 +213,14 @@ class WeatheringData(Weatherer):
             data = sc.substancefatedata(sc.substances[0],
                                         {'mass', 'density', 'viscosity'})
 
-            if data['mass'].sum() > 0.0:
+            total_mass = data['mass'].sum()
+            if total_mass > 0.0:
+                # mass weighted averages - np.dot does the multiply and sum
+                # in one pass without temporary arrays
                 sc.mass_balance['avg_density'] = \
-                    np.sum(data['mass']/data['mass'].sum() * data['density'])
+                    np.dot(data['mass'], data['density']) / total_mass
                 sc.mass_balance['avg_viscosity'] = \
-                    np.sum(data['mass']/data['mass'].sum() * data['viscosity'])
+                    np.dot(data['mass'], data['viscosity']) / total_mass
             else:
                 self.logger.info("{0} sum of 'mass' array went to 0.0"
                                  .format(self._pid))
@@ -236,15 +239,14 @@ class WeatheringData(Weatherer):
         #      sc['mass'][sc['fate_status'] & fate.burn == fate.burn].sum() +
         #      sc['mass'][sc['fate_status'] & fate.disperse == fate.disperse].sum())
 
-        on_surface = ((sc['status_codes'] == oil_status.in_water) &
-                      (sc['positions'][:,2] == 0.0))
-
-        sc.mass_balance['floating'] = sc['mass'][on_surface].sum()
-
         # add 'non_weathering' key if any mass is released for nonweathering
         # particles.
-        nonweather = sc['mass'][sc['fate_status'] == fate.non_weather].sum()
-        sc.mass_balance['non_weathering'] = nonweather
+        # Both are partitions of 'mass' computed from the fate masks of the
+        # step in one bincount
+        partitions = sc.fate_masks().partitions()
+
+        sc.mass_balance['floating'] = partitions['floating']
+        sc.mass_balance['non_weathering'] = partitions['non_weathering']
 
         if new_LEs > 0:
             amount_released = np.sum(sc['mass'][-new_LEs:])
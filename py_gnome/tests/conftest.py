@@ -7,12 +7,40 @@ Place configuration options that apply to all tests here, for instance:
 * similarly rand.seed(1) is automatically done before every test. Maybe
   worthwhile to find a way to do this only for specific tests
 
+* the raster cache of the maps and the particle file indexes are in
+  temporary dirs for the test session, rather than in the cache dir of the
+  user
+
 The scope="module" on the fixtures ensures it is only invoked once per
 test module
 """
+import shutil
+import tempfile
+
 import pytest
 
-from gnome.utilities import rand
+from gnome.utilities import rand, nc_particles
+from gnome.utilities.raster_cache import raster_cache
+
+
+def pytest_configure(config):
+    '''
+    pytest builtin hook
+
+    Executed before the test modules are imported, so the maps created at
+    import time use the temporary raster cache as well
+    '''
+    raster_cache.cache_dir = tempfile.mkdtemp(prefix='gnome_raster_cache_')
+    nc_particles._index_dir = tempfile.mkdtemp(prefix='gnome_particle_index_')
+
+
+def pytest_unconfigure(config):
+    '''
+    pytest builtin hook - remove the temporary caches
+    '''
+    raster_cache.clear()
+    shutil.rmtree(nc_particles._index_dir, ignore_errors=True)
+
 
 def pytest_addoption(parser):
     '''
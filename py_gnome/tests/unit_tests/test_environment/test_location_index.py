@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+"""
+test LocationIndex - cell locations are shared by grids with the same
+geometry and searched starting from the previous cells
+"""
+
+import numpy as np
+
+from gnome.environment.location_index import LocationIndex, in_triangles
+
+
+class TriGrid(object):
+    '''
+    two triangles covering the unit square, located by brute force
+    '''
+    def __init__(self):
+        self.nodes = np.array([(0., 0.), (1., 0.), (1., 1.), (0., 1.)])
+        self.faces = np.array([(0, 1, 2), (0, 2, 3)])
+        self.searched = 0
+
+    def locate_faces(self, points, _hash=None):
+        points = np.asarray(points)[:, :2]
+        self.searched += len(points)
+
+        result = -np.ones((len(points),), dtype=np.int64)
+        for i, face in enumerate(self.faces):
+            tris = np.repeat(self.nodes[face][None], len(points), axis=0)
+            result[(result < 0) & in_triangles(points, tris)] = i
+
+        return result
+
+
+points = np.array([(0.75, 0.25, 0.),
+                   (0.25, 0.75, 0.),
+                   (2.0, 2.0, 0.)])
+
+
+def test_in_triangles():
+    tris = np.array([[(0., 0.), (1., 0.), (0., 1.)]] * 3)
+    pts = np.array([(0.2, 0.2), (1.0, 1.0), (0.5, 0.5)])
+
+    assert list(in_triangles(pts, tris)) == [True, False, True]
+    # orientation does not matter
+    assert list(in_triangles(pts, tris[:, ::-1])) == [True, False, True]
+
+
+def test_shared_between_grids():
+    index = LocationIndex(incremental=False)
+    grid, other = TriGrid(), TriGrid()
+
+    faces = index.lookup(grid, 'faces', points, grid.locate_faces)
+    assert list(faces) == [0, 1, -1]
+
+    # same geometry, and depth doesn't matter
+    pts = points.copy()
+    pts[:, 2] = 10.
+    again = index.lookup(other, 'faces', pts, other.locate_faces)
+
+    assert list(again) == list(faces)
+    assert other.searched == 0
+    assert index.hits == 1
+
+    # results are copies
+    again[0] = 5
+    assert list(index.lookup(grid, 'faces', points,
+                             grid.locate_faces)) == [0, 1, -1]
+
+
+def test_different_geometry():
+    index = LocationIndex(incremental=False)
+    grid, other = TriGrid(), TriGrid()
+    other.nodes = other.nodes * 2
+
+    index.lookup(grid, 'faces', points, grid.locate_faces)
+    index.lookup(other, 'faces', points, other.locate_faces)
+
+    assert other.searched == len(points)
+
+
+def test_incremental():
+    index = LocationIndex()
+    grid = TriGrid()
+
+    index.lookup(grid, 'faces', points, grid.locate_faces)
+    assert grid.searched == 3
+
+    # first point stays in its cell, second moves to the other one
+    moved = points.copy()
+    moved[0, :2] = (0.8, 0.1)
+    moved[1, :2] = (0.9, 0.5)
+
+    faces = index.lookup(grid, 'faces', moved, grid.locate_faces)
+
+    assert list(faces) == [0, 0, -1]
+    # only the elements that left their cell, or had none, are searched
+    assert grid.searched == 3 + 2
+
+
+def test_max_entries():
+    index = LocationIndex(max_entries=2, incremental=False)
+    grid = TriGrid()
+
+    for i in range(4):
+        index.lookup(grid, 'faces', points + i, grid.locate_faces)
+
+    assert len(index) == 2
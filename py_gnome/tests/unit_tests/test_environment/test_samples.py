@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+"""
+test EnvironmentSamples - values sampled from environment objects are only
+computed once per step and shared by the weatherers
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from gnome.environment import constant_wind, Water
+from gnome.environment.samples import EnvironmentSamples
+from gnome.weatherers import Evaporation
+
+
+model_time = datetime(2015, 1, 1, 12, 0)
+points = np.zeros((4, 3), dtype=np.float64)
+
+
+class Counter(object):
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, points, time, *args):
+        self.calls += 1
+        return np.ones((len(points),)) * (len(args) + 1)
+
+
+def test_get_once():
+    samples = EnvironmentSamples()
+    obj = object()
+    compute = Counter()
+
+    first = samples.get(obj, 'wind_speed', points, model_time, compute)
+    again = samples.get(obj, 'wind_speed', points.copy(), model_time, compute)
+
+    assert again is first
+    assert compute.calls == 1
+    assert samples.hits == 1 and samples.misses == 1
+
+
+def test_key():
+    'different time, quantity, args or positions are computed again'
+    samples = EnvironmentSamples()
+    obj = object()
+    compute = Counter()
+
+    samples.get(obj, 'wind_speed', points, model_time, compute)
+    samples.get(obj, 'wind_speed', points, datetime(2015, 1, 1), compute)
+    samples.get(obj, 'wave_values', points, model_time, compute)
+    samples.get(obj, 'wind_speed', points, model_time, compute, 'r')
+    samples.get(obj, 'wind_speed', points + 1., model_time, compute)
+    samples.get(obj, 'wind_speed', points[:2], model_time, compute)
+
+    assert compute.calls == 6
+    assert len(samples) == 6
+
+    samples.clear()
+    assert len(samples) == 0
+
+    samples.get(obj, 'wind_speed', points, model_time, compute)
+    assert compute.calls == 7
+
+
+def test_weatherers_share_samples():
+    wind = constant_wind(10., 0.)
+    water = Water()
+    evap = Evaporation(water, wind)
+    other = Evaporation(water, wind)
+
+    samples = EnvironmentSamples()
+    evap.env_samples = samples
+    other.env_samples = samples
+
+    ws = evap.get_wind_speed(points, model_time)
+    assert other.get_wind_speed(points.copy(), model_time) is ws
+    assert np.all(ws == wind.at(points, model_time, coord_sys='r'))
+
+    assert (evap.get_water_property('temperature', 'K') ==
+            other.get_water_property('temperature', 'K') ==
+            water.get('temperature', 'K'))
+
+    assert samples.misses == 2
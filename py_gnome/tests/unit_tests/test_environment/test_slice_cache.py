@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+"""
+test the TimeSliceCache used by gridded Variables
+"""
+import os
+
+import numpy as np
+import netCDF4 as nc4
+
+import pytest
+
+from gnome.environment.slice_cache import TimeSliceCache, CachedTimeData
+
+
+@pytest.fixture
+def nc_var(tmpdir):
+    '''
+    a (time, y, x) variable in a netCDF file - slice t is filled with t
+    '''
+    filename = os.path.join(str(tmpdir), 'slices.nc')
+    ds = nc4.Dataset(filename, 'w')
+    ds.createDimension('time', 5)
+    ds.createDimension('y', 4)
+    ds.createDimension('x', 3)
+
+    var = ds.createVariable('u', np.float64, ('time', 'y', 'x'), zlib=True)
+    var[:] = np.arange(5)[:, None, None] * np.ones((5, 4, 3))
+
+    yield var
+
+    ds.close()
+
+
+def test_get_slice(nc_var):
+    cache = TimeSliceCache(prefetch=False)
+    data = CachedTimeData(nc_var, cache)
+
+    assert data.shape == (5, 4, 3)
+    assert np.all(data[2] == 2)
+    assert np.all(data[2, 1:3, 0] == nc_var[2, 1:3, 0])
+    assert np.all(data[-1] == 4)
+
+    # both reads of slice 2 came from the cache
+    assert len(cache) == 2
+    assert (id(data), 2) in cache
+
+    # non integer time index is passed to the netCDF variable
+    assert np.all(data[1:3] == nc_var[1:3])
+    assert len(cache) == 2
+
+    with pytest.raises(IndexError):
+        data[5]
+
+
+def test_slices_read_only(nc_var):
+    '''
+    the cached slices are shared - changing one in place would change it
+    for all the later readers
+    '''
+    cache = TimeSliceCache(prefetch=False)
+    data = CachedTimeData(nc_var, cache)
+
+    with pytest.raises(ValueError):
+        data[2][0, 0] = 10.
+
+    with pytest.raises(ValueError):
+        data[2, 1:3] *= 2
+
+    assert np.all(data[2] == 2)
+    assert np.all(data[2].copy() * 2 == 4)
+
+
+def test_prefetch(nc_var):
+    cache = TimeSliceCache(prefetch=True)
+    data = CachedTimeData(nc_var, cache)
+
+    data[1]
+
+    # wait for the background read of the next slice
+    cache.get(data, 2)
+    assert (id(data), 2) in cache
+    assert np.all(cache.get(data, 2) == 2)
+
+
+def test_lru_budget(nc_var):
+    slice_bytes = 4 * 3 * 8
+    # room for 2 slices and their masks, not 3
+    cache = TimeSliceCache(max_bytes=int(2.5 * slice_bytes), prefetch=False)
+    data = CachedTimeData(nc_var, cache)
+
+    data[0]
+    data[1]
+    data[0]     # 0 is now most recently used
+    data[2]
+
+    assert len(cache) == 2
+    assert cache.nbytes <= cache.max_bytes
+    assert (id(data), 0) in cache
+    assert (id(data), 1) not in cache
+
+    cache.discard(data)
+    assert len(cache) == 0
+    assert cache.nbytes == 0
@@ -110,3 +110,41 @@ def test_make_default_refs():
     assert waves.water is water
     with pytest.raises(ReferencedObjectNotSet):
         model1.step()
+
+
+def test_schema_instance():
+    '''
+    schema instances are shared per schema class, subclasses get their own
+    '''
+    schema = Wind._schema.instance()
+
+    assert schema is Wind._schema.instance()
+    assert isinstance(schema, Wind._schema)
+    assert Water._schema.instance() is not schema
+
+    # node lists are computed once
+    assert (schema.get_nodes_by_attr('update') is
+            schema.get_nodes_by_attr('update'))
+    assert (schema.get_nodes_by_attr('all') ==
+            [c.name for c in schema.children])
+
+    for c in schema.children:
+        assert schema.get(c.name) is c
+
+    assert schema.get('not_an_attribute') is None
+
+
+def test_to_dict_accessors():
+    'to_dict returns the same as reading each attribute'
+    water = Water(temperature=290.)
+    dict_ = water.to_dict()
+
+    names = Water._schema.instance().get_nodes_by_attr('all')
+    assert sorted(dict_.keys()) == sorted(names)
+
+    for name in names:
+        assert dict_[name] is getattr(water, name) or \
+            dict_[name] == getattr(water, name)
+
+    # a new dict each time
+    assert water.to_dict() is not dict_
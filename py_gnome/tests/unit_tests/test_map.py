@@ -16,6 +16,7 @@ from gnome.basic_types import oil_status, status_code_type
 from gnome.utilities.projections import NoProjection
 
 from gnome.map import GnomeMap, MapFromBNA, RasterMap  # , MapFromUGrid
+from gnome.utilities.raster_cache import RasterCache
 
 from conftest import sample_sc_release
 
@@ -886,6 +887,76 @@ def test_bna_no_map_bounds():
                                          ])
 
 
+def test_build_coarser_bitmaps():
+    """
+    a coarse cell is land if any of the base cells it covers is land,
+    including cells on the ragged edge of the base bitmap
+    """
+    raster = np.zeros((37, 21), dtype=np.uint8)
+    raster[5, 3] = 1
+    raster[36, 20] = 1
+
+    rmap = RasterMap(raster, NoProjection())
+    ratio = rmap.ratios[0]
+    coarse = rmap.layers[0]
+
+    assert coarse.shape == (3, 2)
+    for (i, j), val in np.ndenumerate(coarse):
+        assert val == np.any(raster[i * ratio:(i + 1) * ratio,
+                                    j * ratio:(j + 1) * ratio])
+
+
+def test_raster_cache(tmpdir, monkeypatch):
+    """
+    the second map from the same file is restored from the raster cache
+    """
+    cache = RasterCache(str(tmpdir))
+    monkeypatch.setattr(gnome.map, 'raster_cache', cache)
+
+    drawn = MapFromBNA(testbnamap, raster_size=10000)
+    assert len(tmpdir.listdir()) == 1
+
+    def no_drawing(*args):
+        raise AssertionError('map should come from the cache')
+
+    monkeypatch.setattr(MapFromBNA, '_draw_land', staticmethod(no_drawing))
+    cached = MapFromBNA(testbnamap, raster_size=10000)
+
+    assert len(cached.layers) == len(drawn.layers)
+    for c_layer, d_layer in zip(cached.layers, drawn.layers):
+        assert np.array_equal(c_layer, d_layer)
+
+    assert np.array_equal(cached.basebitmap, drawn.basebitmap)
+    assert np.all(cached.projection.to_pixel((-127.3, 47.6, 0)) ==
+                  drawn.projection.to_pixel((-127.3, 47.6, 0)))
+
+    # a different raster_size is drawn again
+    monkeypatch.undo()
+    monkeypatch.setattr(gnome.map, 'raster_cache', cache)
+    MapFromBNA(testbnamap, raster_size=20000)
+    assert len(tmpdir.listdir()) == 2
+
+
+def test_raster_cache_evict(tmpdir):
+    """
+    the least recently used entries are deleted to stay under max_bytes
+    """
+    layers = [np.zeros((32, 32), dtype=np.uint8)]
+    cache = RasterCache(str(tmpdir), max_bytes=1500)
+
+    cache.save('first', layers)
+    assert cache.load('first') is not None
+
+    cache.save('second', layers)
+    assert cache.load('first') is None
+    assert np.array_equal(cache.load('second')[0], layers[0])
+
+    # larger than the whole cache: not saved
+    cache.save('third', [np.zeros((64, 64), dtype=np.uint8)])
+    assert cache.load('third') is None
+    assert cache.load('second') is not None
+
+
 class Test_lake():
     """
     tests for handling a BNA with a lake
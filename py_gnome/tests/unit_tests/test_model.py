@@ -17,6 +17,7 @@ from gnome.utilities.inf_datetime import InfDateTime
 import gnome.map
 from gnome.environment import Wind, Tide, constant_wind, Water, Waves
 from gnome.model import Model
+from gnome.exceptions import GnomeRuntimeError
 
 from gnome.spill import (Spill,
                          SpatialRelease,
@@ -31,7 +32,8 @@ from gnome.weatherers import (HalfLifeWeatherer,
                               ChemicalDispersion,
                               Burn,
                               Skimmer,
-                              Emulsification)
+                              Emulsification,
+                              ROC_Skim)
 from gnome.outputters import Renderer, TrajectoryGeoJsonOutput
 
 from conftest import sample_model_weathering, testdata, test_oil
@@ -301,6 +303,228 @@ def test_simple_run_rewind():
     assert np.all(model.spills.LE('positions') == pos)
 
 
+def test_threaded_run():
+    '''
+    moving the forecast and uncertainty containers on the thread pool gives
+    the same positions as moving them one after the other
+    '''
+    start_time = datetime(2012, 9, 15, 12, 0)
+
+    def run(threaded):
+        model = Model(start_time=start_time, uncertain=True,
+                      threaded=threaded)
+        model.map = gnome.map.MapFromBNA(testdata['MapFromBNA']['testmap'],
+                                         refloat_halflife=-1)
+        # no uncertainty - the order the random numbers are drawn in is not
+        # fixed in threaded mode
+        model.movers += SimpleMover(velocity=(1., 2., 0.),
+                                    uncertainty_scale=0.)
+        model.movers += SimpleMover(velocity=(-0.5, 0.5, 0.),
+                                    uncertainty_scale=0.)
+        model.spills += point_line_release_spill(num_elements=10,
+                                                 start_position=(0., 0., 0.),
+                                                 release_time=start_time)
+        model.full_run()
+
+        return [np.copy(sc['positions']) for sc in model.spills.items()]
+
+    for serial, threaded in zip(run(False), run(True)):
+        assert np.all(serial == threaded)
+
+
+def test_threaded_run_cy_movers():
+    '''
+    the C++ movers and the land check of the map release the GIL, so they
+    really run in parallel in threaded mode. With a random_seed, the
+    windages come from the random streams, and for winds over 1 m/s the
+    C++ wind mover only draws random numbers in prepare_for_model_step,
+    which is not threaded.
+    '''
+    start_time = datetime(2012, 9, 15, 12, 0)
+
+    def run(threaded):
+        model = Model(start_time=start_time, uncertain=True,
+                      threaded=threaded, random_seed=3)
+        model.map = gnome.map.MapFromBNA(testdata['MapFromBNA']['testmap'],
+                                         refloat_halflife=1)
+        model.movers += WindMover(constant_wind(10., 225., 'm/s'))
+        model.movers += RandomMover()
+        model.spills += point_line_release_spill(num_elements=100,
+                                                 start_position=(0., 0., 0.),
+                                                 release_time=start_time)
+        model.full_run()
+
+        return [np.copy(sc['positions']) for sc in model.spills.items()]
+
+    for serial, threaded in zip(run(False), run(True)):
+        assert np.all(serial == threaded)
+
+
+def test_random_seed():
+    '''
+    with a random seed, the random moves and refloating do not depend on
+    the order the spill containers are processed in
+    '''
+    start_time = datetime(2012, 9, 15, 12, 0)
+
+    def run(threaded):
+        model = Model(start_time=start_time, uncertain=True,
+                      threaded=threaded, random_seed=12)
+        model.map = gnome.map.MapFromBNA(testdata['MapFromBNA']['testmap'],
+                                         refloat_halflife=1)
+        model.movers += SimpleMover(velocity=(1., 2., 0.))
+        model.movers += RandomMover()
+        model.spills += point_line_release_spill(num_elements=10,
+                                                 start_position=(0., 0., 0.),
+                                                 release_time=start_time)
+        model.full_run()
+
+        return [np.copy(sc['positions']) for sc in model.spills.items()]
+
+    for serial, threaded in zip(run(False), run(True)):
+        assert np.all(serial == threaded)
+
+
+def test_checkpoint_restart(tmpdir):
+    '''
+    a run restarted from a checkpoint ends where the uninterrupted run does
+    '''
+    start_time = datetime(2012, 9, 15, 12, 0)
+    checkpoint = str(tmpdir.join('checkpoint'))
+
+    def make_model():
+        model = Model(start_time=start_time, uncertain=True,
+                      duration=timedelta(hours=6), random_seed=12)
+        model.map = gnome.map.MapFromBNA(testdata['MapFromBNA']['testmap'],
+                                         refloat_halflife=1)
+        model.movers += SimpleMover(velocity=(1., 2., 0.))
+        model.movers += RandomMover()
+        model.spills += point_line_release_spill(num_elements=20,
+                                                 start_position=(0., 0., 0.),
+                                                 release_time=start_time,
+                                                 end_release_time=start_time +
+                                                 timedelta(hours=1))
+        return model
+
+    model = make_model()
+    with raises(GnomeRuntimeError):
+        model.checkpoint(checkpoint)
+
+    for step in range(8):
+        model.step()
+    model.checkpoint(checkpoint)
+    model.full_run(rewind=False)
+
+    restarted = make_model()
+    assert restarted.restart(checkpoint) == 7
+    assert restarted.model_time == start_time + timedelta(hours=1.75)
+
+    # the operational loop: restart, step and checkpoint to the same folder.
+    # Nothing is released after the first hour, so the data arrays are
+    # still mapped from the checkpoint files
+    for step in range(4):
+        restarted.step()
+    restarted.checkpoint(checkpoint)
+
+    restarted.full_run(rewind=False)
+
+    again = make_model()
+    assert again.restart(checkpoint) == 11
+    again.full_run(rewind=False)
+
+    for sc, restarted_sc, again_sc in zip(model.spills.items(),
+                                          restarted.spills.items(),
+                                          again.spills.items()):
+        assert len(sc) == 20
+        for name in ('positions', 'id', 'age', 'status_codes'):
+            assert np.all(sc[name] == restarted_sc[name])
+            assert np.all(sc[name] == again_sc[name])
+
+    # the checkpoint is of a different model
+    other = make_model()
+    other.random_seed = 13
+    with raises(ValueError):
+        other.restart(checkpoint)
+
+
+def test_checkpoint_restart_weathering(tmpdir):
+    '''
+    a run restarted from a checkpoint while the skimmers and the burn are
+    active ends with the mass balance of the uninterrupted run
+    '''
+    start_time = datetime(2012, 9, 15, 12, 0)
+    checkpoint = str(tmpdir.join('checkpoint'))
+
+    def make_model():
+        model = Model(start_time=start_time, time_step=900, uncertain=False,
+                      duration=timedelta(hours=6), random_seed=12)
+        model.map = gnome.map.GnomeMap()
+
+        wind, water = constant_wind(5., 0), Water()
+        waves = Waves(wind, water)
+        model.environment += [wind, water, waves]
+
+        spill = point_line_release_spill(10, (0., 0., 0.), start_time,
+                                         substance=test_oil,
+                                         amount=10000,
+                                         units='kg')
+        model.spills += spill
+
+        skim = ROC_Skim(speed=2.0,
+                        storage=2000.0,
+                        swath_width=150,
+                        group='A',
+                        throughput=0.75,
+                        nameplate_pump=100.0,
+                        skim_efficiency_type='meh',
+                        recovery=0.75,
+                        recovery_ef=0.75,
+                        decant=0.75,
+                        decant_pump=150.0,
+                        discharge_pump=1000.0,
+                        rig_time=timedelta(minutes=30),
+                        timeseries=[(start_time,
+                                     start_time + timedelta(hours=6))],
+                        transit_time=timedelta(hours=2))
+
+        model.weatherers += [Evaporation(),
+                             Emulsification(waves=waves),
+                             make_skimmer(spill, duration=3),
+                             burn_obj(spill),
+                             skim]
+        return model
+
+    model = make_model()
+
+    # the skimmers and the burn are half way through
+    for step in range(10):
+        model.step()
+    model.checkpoint(checkpoint)
+    model.full_run(rewind=False)
+
+    restarted = make_model()
+    assert restarted.restart(checkpoint) == 9
+    restarted.full_run(rewind=False)
+
+    sc = model.spills.items()[0]
+    restarted_sc = restarted.spills.items()[0]
+
+    assert sc.mass_balance['skimmed'] > 0
+    assert sc.mass_balance['burned'] > 0
+
+    systems = sc.mass_balance['systems']
+    restarted_systems = restarted_sc.mass_balance['systems']
+    assert len(restarted_systems) == len(systems)
+
+    for name, value in sc.mass_balance.items():
+        if name != 'systems':
+            assert np.all(restarted_sc.mass_balance[name] == value)
+
+    for w, restarted_w in zip(model.weatherers, restarted.weatherers):
+        if w.id in systems:
+            assert restarted_systems[restarted_w.id] == systems[w.id]
+
+
 def test_simple_run_with_map():
     '''
     pretty much all this tests is that the model will run
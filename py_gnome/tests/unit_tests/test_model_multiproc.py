@@ -20,12 +20,12 @@ from gnome.environment import Wind, Water, Waves, Tide
 
 from gnome.spill import point_line_release_spill
 
-from gnome.movers import RandomMover, WindMover, CatsMover
+from gnome.movers import RandomMover, WindMover, CatsMover, SimpleMover
 from gnome.weatherers import Evaporation, ChemicalDispersion, Burn, Skimmer
 
 from gnome.outputters import WeatheringOutput, TrajectoryGeoJsonOutput
 
-from gnome.multi_model_broadcast import ModelBroadcaster
+from gnome.multi_model_broadcast import ModelBroadcaster, ModelEnsemble
 
 from conftest import testdata, test_oil
 
@@ -462,6 +462,78 @@ def test_child_exception():
         assert os.path.basename(last_file) == 'spill.py'
 
 
+@pytest.mark.slow
+@pytest.mark.timeout(60)
+def test_ensemble_run():
+    model = make_model()
+
+    ensemble = ModelEnsemble(model,
+                             ('down', 'normal', 'up'),
+                             ('down', 'normal', 'up'),
+                             num_workers=2)
+    errors = ensemble.run()
+
+    assert errors == {}
+    assert np.all(ensemble.status == ModelEnsemble.complete)
+    assert ensemble.mass_balance.shape == (9, model.num_time_steps,
+                                           len(ensemble.mass_balance_keys))
+
+    down = ensemble.get_mass_balance(('down', 'down'))
+    up = ensemble.get_mass_balance(('up', 'up'))
+
+    assert not np.any(np.isnan(down['amount_released']))
+    assert down['amount_released'][-1] < up['amount_released'][-1]
+
+
+class AmountLimitMover(SimpleMover):
+    '''
+        does not move anything, but fails the model run if the amount of
+        the spill is over max_amount
+    '''
+    def __init__(self, spill, max_amount, **kwargs):
+        super(AmountLimitMover, self).__init__(velocity=(0., 0., 0.),
+                                               **kwargs)
+        self.spill = spill
+        self.max_amount = max_amount
+
+    def prepare_for_model_run(self):
+        super(AmountLimitMover, self).prepare_for_model_run()
+
+        if self.spill.amount > self.max_amount:
+            raise ValueError('spill amount is over {0}'
+                             .format(self.max_amount))
+
+
+@pytest.mark.slow
+@pytest.mark.timeout(90)
+def test_ensemble_member_failure():
+    '''
+        a member that fails does not stop the other members
+    '''
+    model = make_model()
+
+    # only the member with the 'up' spill amount fails
+    spill = model.spills[0]
+    model.movers += AmountLimitMover(spill, spill.amount)
+
+    ensemble = ModelEnsemble(model, ('normal',), ('down', 'normal', 'up'),
+                             num_workers=2)
+    errors = ensemble.run()
+
+    failed = ensemble.lookup[('normal', 'up')]
+    assert errors.keys() == [failed]
+    assert 'spill amount is over' in errors[failed]
+    assert ensemble.status[failed] == ModelEnsemble.failed
+
+    for sau in ('down', 'normal'):
+        assert (ensemble.status[ensemble.lookup[('normal', sau)]] ==
+                ModelEnsemble.complete)
+
+        mass_balance = ensemble.get_mass_balance(('normal', sau))
+        assert not np.any(np.isnan(mass_balance['amount_released']))
+        assert mass_balance['amount_released'][-1] > 0.
+
+
 if __name__ == '__main__':
     scripting.make_images_dir()
 
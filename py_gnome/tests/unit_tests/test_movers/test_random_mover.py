@@ -9,6 +9,7 @@ import numpy as np
 
 from gnome.movers import RandomMover
 
+from gnome.utilities.rand import RandomStreams
 from gnome.utilities.time_utils import sec_to_date, date_to_sec
 from gnome.utilities.projections import FlatEarthProjection
 from ..conftest import sample_sc_release
@@ -109,6 +110,36 @@ class TestRandomMover:
         assert True
 
 
+def test_seeded_first_step():
+    '''
+    with random streams, the first step of a run moves the elements within
+    the unit circle, as Random_c does, and the later steps within the square
+    '''
+    start_time = datetime.datetime(2012, 11, 10, 0)
+    time_step = 900
+    sc = sample_sc_release(1000, (0., 0., 0.), start_time)
+    sc.random_streams = RandomStreams(seed=5)
+
+    rand = RandomMover()
+    # scale of the moves, in degrees - cos(latitude) is 1
+    coef = (np.sqrt(6. * (rand.diffusion_coef / 10000.) * time_step) /
+            111120.00024)
+
+    rand.prepare_for_model_run()
+    radius = []
+    for step in range(2):
+        sc.random_streams.step = step
+        rand.prepare_for_model_step(sc, time_step, start_time)
+        delta = rand.get_move(sc, time_step, start_time)
+        rand.model_step_is_done(sc)
+
+        radius.append(np.sqrt((delta[:, :2] ** 2).sum(axis=1)) / coef)
+
+    assert np.all(radius[0] <= 1. + 1e-12)
+    assert np.any(radius[1] > 1.)
+    assert np.all(radius[1] <= np.sqrt(2.) + 1e-12)
+
+
 #start_locs = [(0., 0., 0.), (30.0, 30.0, 30.0), (-45.0, -60.0, 30.0)]
 # changed random mover to not act below surface
 start_locs = [(0., 0., 0.), (30.0, 30.0, 0.0), (-45.0, -60.0, 0.0)]
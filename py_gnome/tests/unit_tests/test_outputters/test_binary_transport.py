@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+
+"""
+tests for the binary encoding of the json outputters
+"""
+import numpy as np
+
+from gnome.outputters.binary_transport import (pack_arrays, unpack_arrays,
+                                               quantize, delta_encode,
+                                               delta_decode)
+
+
+def test_quantize():
+    values = np.array([-70.123456, -70.5, -69.99999])
+    q = quantize(values, 1e-5, -70.)
+
+    assert q.dtype == np.int32
+    assert np.allclose(q * 1e-5 - 70., values, atol=5e-6)
+
+
+def test_delta_encode():
+    ids = np.array([5, 6, 7, 8, 20, 21])
+    first, deltas = delta_encode(ids)
+
+    assert first == 5
+    assert deltas.dtype == np.uint8
+    assert list(delta_decode(first, deltas)) == list(ids)
+
+    # not ordered
+    first, deltas = delta_encode([10, 3, 400])
+    assert list(delta_decode(first, deltas)) == [10, 3, 400]
+
+    first, deltas = delta_encode([])
+    assert len(delta_decode(first, deltas)) == 0
+
+
+def test_pack_unpack():
+    lon = np.array([-70.1, -70.2, -70.30001])
+    status = np.array([2, 3, 2], dtype=np.int16)
+    first, deltas = delta_encode([0, 1, 2])
+
+    message = pack_arrays([('longitude', quantize(lon, 1e-5, -70.),
+                            {'scale': 1e-5, 'origin': -70.}),
+                           ('status', status.astype(np.uint8), None),
+                           ('mass', np.ones((3,), dtype='>f4'), None),
+                           ('id', deltas, {'first': first})])
+
+    layout = message['layout']
+    assert [item['name'] for item in layout] == ['longitude', 'status',
+                                                 'mass', 'id']
+    # aligned, little endian
+    assert all([item['offset'] % 8 == 0 for item in layout])
+    assert layout[2]['dtype'] == '<f4'
+
+    arrays = unpack_arrays(message)
+
+    assert np.allclose(arrays['longitude'], lon, atol=1e-5)
+    assert list(arrays['status']) == [2, 3, 2]
+    assert np.all(arrays['mass'] == 1.)
+    assert list(arrays['id']) == [0, 1, 2]
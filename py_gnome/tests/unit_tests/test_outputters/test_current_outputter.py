@@ -13,6 +13,7 @@ from gnome.environment import Tide
 from gnome.spill import SpatialRelease, Spill, point_line_release_spill
 from gnome.movers import CatsMover
 from gnome.outputters import CurrentJsonOutput
+from gnome.outputters.binary_transport import unpack_arrays
 
 from ..conftest import testdata
 
@@ -95,3 +96,41 @@ def test_current_grid_json_output(model):
             assert len(fc['direction']) > 0
             assert len(fc['magnitude']) > 0
             assert len(fc['magnitude']) == len(fc['direction'])
+
+
+def test_current_grid_binary_output(model):
+    '''
+    the binary output decodes to the json output, and the grid is only in
+    the first step
+    '''
+    model.rewind()
+    json_output = [step['CurrentJsonOutput'] for step in model]
+
+    # the model is shared by the tests of the module
+    outputters = [o for o in model.outputters
+                  if isinstance(o, CurrentJsonOutput)]
+    for o in outputters:
+        o.binary = True
+    model.rewind()
+
+    for step_num, step in enumerate(model):
+        message = step['CurrentJsonOutput'][c_cats.id]
+        arrays = unpack_arrays(message)
+        expected = json_output[step_num][c_cats.id]
+
+        assert np.allclose(arrays['magnitude'], expected['magnitude'],
+                           atol=0.01)
+        assert np.allclose(arrays['direction'], expected['direction'],
+                           atol=0.01)
+
+        if step_num == 0:
+            centers = c_cats.get_center_points()
+            assert np.allclose(arrays['longitude'], centers['long'],
+                               atol=1e-5)
+            assert np.allclose(arrays['latitude'], centers['lat'],
+                               atol=1e-5)
+        else:
+            assert 'longitude' not in arrays
+
+    for o in outputters:
+        o.binary = False
@@ -6,9 +6,16 @@ tests for teh json outputter
 VERY incomplete!
 """
 
+from datetime import datetime, timedelta
+
+import numpy as np
 import pytest
 
+from gnome.model import Model
+from gnome.movers import SimpleMover
+from gnome.spill import point_line_release_spill
 from gnome.outputters.json import SpillJsonOutput
+from gnome.outputters.binary_transport import unpack_arrays
 
 
 def test_deserialize():
@@ -63,3 +70,34 @@ def test_deserialize():
 #     assert False
 
 
+def test_binary_output():
+    '''
+    the binary output decodes to the positions and ids of the elements
+    '''
+    start_time = datetime(2012, 9, 15, 12, 0)
+    model = Model(start_time=start_time, duration=timedelta(hours=2),
+                  time_step=3600)
+    model.movers += SimpleMover(velocity=(1., 2., 0.))
+    model.spills += point_line_release_spill(num_elements=10,
+                                             start_position=(-70., 42., 0.),
+                                             end_position=(-70.1, 42.1, 0.),
+                                             release_time=start_time)
+    model.outputters += SpillJsonOutput(binary=True)
+
+    for step in model:
+        output = step['SpillJsonOutput']
+        sc = model.spills.items()[0]
+
+        assert len(output['certain']) == 1
+
+        message = output['certain'][0]
+        arrays = unpack_arrays(message)
+
+        assert message['length'] == len(sc)
+        assert isinstance(message['buffer'], str)
+        assert np.allclose(arrays['longitude'], sc['positions'][:, 0],
+                           atol=1e-5)
+        assert np.allclose(arrays['latitude'], sc['positions'][:, 1],
+                           atol=1e-5)
+        assert np.all(arrays['id'] == sc['id'])
+        assert np.all(arrays['status'] == sc['status_codes'])
@@ -3,6 +3,7 @@ tests for kmz outputter
 '''
 
 import os
+import re
 from glob import glob
 from datetime import datetime, timedelta
 
@@ -132,6 +133,35 @@ def test_timesteps(model):
     model.full_run()
 
 
+def test_stream(model, output_dir):
+    '''
+    streaming the kml through a temp file gives the same kml as keeping it
+    in memory
+    '''
+    import zipfile
+
+    streamed = KMZOutput(os.path.join(output_dir, 'streamed.kmz'))
+    in_memory = KMZOutput(os.path.join(output_dir, 'in_memory.kmz'),
+                          stream=False)
+    model.outputters += [streamed, in_memory]
+
+    model.full_run()
+
+    # temp file is cleaned up
+    assert streamed.kml_tmp_filename is None
+    assert glob(os.path.join(output_dir, 'streamed*.kml')) == []
+
+    kml = []
+    for kmz in (streamed, in_memory):
+        with zipfile.ZipFile(kmz.filename) as kmzfile:
+            # the issued time is when the header was written - to the minute
+            kml.append(re.sub(r'<b>Issued:</b>[^<]*<br>', '',
+                              kmzfile.read(kmz.kml_name)))
+
+    # the kml_name is in the kml
+    assert kml[0].replace('streamed', 'in_memory') == kml[1]
+
+
 
 ## test the kml templates
 def test_element_template():
@@ -163,6 +193,17 @@ def test_on_timestep_kml():
     assert True
 
 
+def test_format_points():
+    positions = np.array([(23.45, 45.2, 0),
+                          (-13.45, 12.2, 0),
+                          (-123.456789123, 45.1, 3.)])
+
+    assert (kmz_templates.format_points(positions) ==
+            "".join([kmz_templates.point_template.format(*p[:2])
+                     for p in positions]))
+    assert kmz_templates.format_points(np.zeros((0, 3))) == ""
+
+
 
 
 
@@ -599,7 +599,7 @@ def test_serialize_deserialize(output_filename):
                                              start_position=(0, 0, 0),
                                              release_time=model.start_time)
 
-    o_put = NetCDFOutput(output_filename)
+    o_put = NetCDFOutput(output_filename, batch_size=3)
     model.outputters += o_put
     model.movers += RandomMover(diffusion_coef=100000)
 
@@ -617,6 +617,7 @@ def test_serialize_deserialize(output_filename):
 
     o_put2 = NetCDFOutput.deserialize(o_put.serialize())
     assert o_put == o_put2
+    assert o_put2.batch_size == 3
 #     assert o_put._start_idx != o_put2._start_idx
 #     assert o_put._middle_of_run != o_put2._middle_of_run
 #     assert o_put != o_put2
@@ -704,6 +705,54 @@ def test_surface_concentration_output(model):
             assert not np.all(surface_conc[:] == 0.0)
 
 
+@pytest.mark.parametrize("batch_size", (None, 1, 3))
+def test_write_output_batches(model, batch_size):
+    """
+    steps are buffered and written in batches; all steps are in the file
+    once the run is complete and the file is closed
+    """
+    model.rewind()
+    o_put = model.outputters[0]
+    o_put.batch_size = batch_size
+
+    model.step()
+    model.step()
+    if batch_size == 1:
+        assert len(o_put._pending[o_put.netcdf_filename]) == 0
+    elif batch_size == 3:
+        assert len(o_put._pending[o_put.netcdf_filename]) == 2
+
+    _run_model(model)
+    assert o_put._datasets == {}
+
+    with nc.Dataset(o_put.netcdf_filename) as data:
+        dv = data.variables
+        assert len(dv['time']) == model.num_time_steps
+        assert dv['particle_count'][:].sum() == len(dv['longitude'])
+
+
+def test_write_output_interrupted(model):
+    """
+    the buffered steps of a run that is interrupted are written when the
+    model is rewound
+    """
+    model.rewind()
+    o_put = model.outputters[0]
+    o_put.batch_size = 10
+
+    model.step()
+    model.step()
+    assert len(o_put._pending[o_put.netcdf_filename]) == 2
+
+    model.rewind()
+    assert o_put._datasets == {}
+
+    with nc.Dataset(o_put.netcdf_filename) as data:
+        dv = data.variables
+        assert len(dv['time']) == 2
+        assert dv['particle_count'][:].sum() == len(dv['longitude'])
+
+
 def _run_model(model):
     'helper function'
     while True:
@@ -16,6 +16,7 @@ from os.path import basename
 from datetime import datetime
 
 import pytest
+import numpy as np
 import numpy.random as random
 
 from gnome.basic_types import oil_status
@@ -32,6 +33,12 @@ bna_sample = testdata['Renderer']['bna_sample']
 bna_star = testdata['Renderer']['bna_star']
 
 
+class FakeGrid(object):
+    'unstructured grid of two triangles'
+    nodes = np.array([(-72., 41.), (-71., 41.), (-71., 42.), (-72., 42.)])
+    edges = np.array([(0, 1), (1, 2), (2, 0), (2, 3), (3, 0)])
+
+
 class FakeCache(object):
     def __init__(self, sc):
         # pass in a  spill containters
@@ -41,6 +48,8 @@ class FakeCache(object):
     def load_timestep(self, step):
         return SpillContainerPairData(self.sc, )
 
+    load_shared_timestep = load_timestep
+
 
 def test_exception(output_dir):
     # wrong name for draw on top
@@ -371,3 +380,72 @@ def test_serialize_deserialize(output_dir):
 
 # # if __name__ == '__main__':
 # #     test_set_viewport()
+
+
+def test_background_cached(output_dir):
+    """
+    the background is only drawn again when the viewport changes
+    """
+    r = Renderer(bna_star, output_dir, image_size=(300, 300))
+
+    drawn = []
+    draw_land = r.draw_land
+
+    def counting_draw_land():
+        drawn.append(True)
+        draw_land()
+
+    r.draw_land = counting_draw_land
+
+    r.draw_background()
+    r.draw_background()
+    assert len(drawn) == 1
+
+    r.viewport = ((-73, 40), (-70, 43))
+    r.draw_background()
+    assert len(drawn) == 2
+
+    r.draw_background(force=True)
+    assert len(drawn) == 3
+
+    # a new land layer, even one at the address of the old one
+    r.land_polygons = r.land_polygons
+    r.draw_background()
+    assert len(drawn) == 4
+
+    r.raster_map = None
+    r.draw_background()
+    assert len(drawn) == 5
+    r.draw_background()
+    assert len(drawn) == 5
+
+    # a grid layer, and a new grid in it
+    r.add_grid(FakeGrid())
+    r.draw_background()
+    assert len(drawn) == 6
+
+    r.grids[0].grid = FakeGrid()
+    r.draw_background()
+    assert len(drawn) == 7
+    r.draw_background()
+    assert len(drawn) == 7
+
+
+def test_write_output_post_run(output_dir):
+    """
+    frames rendered after the run
+    """
+    r = Renderer(bna_star,
+                 output_dir,
+                 image_size=(300, 300),
+                 formats=['png'])
+
+    sc = sample_sc_release(num_elements=10)
+    sc['positions'][:, :2] = r.map_BB[0]
+
+    r.write_output_post_run(datetime.now(), 3,
+                            cache=FakeCache(sc))
+
+    for step in range(3):
+        filename = r.foreground_filename_format.format(step) + 'png'
+        assert os.path.isfile(os.path.join(output_dir, filename))
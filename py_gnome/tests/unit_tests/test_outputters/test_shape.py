@@ -127,6 +127,12 @@ def test_timesteps(model):
     model.full_run()
 
 
-
-
-
+def test_fields():
+    'the attribute columns of the files are not changed'
+    assert ShapeOutput.fields == [('Time', 'C', 50, 0),
+                                  ('LE id', 'N', 50, 0),
+                                  ('Depth', 'N', 50, 0),
+                                  ('Mass', 'N', 50, 0),
+                                  ('Age', 'N', 50, 0),
+                                  ('Surf_Conc', 'F', 50, 0),
+                                  ('Status_Code', 'N', 50, 0)]
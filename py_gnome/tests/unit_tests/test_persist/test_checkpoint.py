@@ -0,0 +1,90 @@
+'''
+tests for writing the state of objects to a checkpoint
+'''
+import os
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import pytest
+
+from gnome.persist.checkpoint import (is_plain, ArrayStore, object_state,
+                                      set_object_state)
+
+
+class Thing(object):
+    _checkpoint_attrs = ('count', 'time', 'thing')
+    _checkpoint_children = ('part',)
+
+    def __init__(self, name='thing'):
+        self.name = name
+        self.count = 3
+        self.time = datetime(2017, 1, 1, 12, 30)
+        self.part = None
+        self.thing = object()
+
+
+def test_is_plain():
+    assert is_plain({'a': (1, 2.5, 'x'), 'b': [None, timedelta(hours=1)]})
+    assert is_plain(np.zeros((3, 2)))
+    assert not is_plain(np.ma.zeros(3))
+    assert not is_plain(np.array([object()]))
+    assert not is_plain([1, object()])
+
+
+@pytest.mark.parametrize('value', [(1, 'a', None),
+                                   {'mass': 1.5, ('a', 1): [2, 3]},
+                                   datetime(2017, 1, 1, 0, 0, 0, 12),
+                                   timedelta(days=-1, seconds=5),
+                                   np.float32(0.1),
+                                   np.arange(1000.),
+                                   np.random.get_state(),
+                                   random.getstate()])
+def test_encode(tmpdir, value):
+    store = ArrayStore(str(tmpdir))
+    decoded = store.decode(store.encode(value))
+
+    assert type(decoded) is type(value)
+    if isinstance(value, tuple):
+        for d, v in zip(decoded, value):
+            assert np.all(d == v)
+    else:
+        assert np.all(decoded == value)
+
+
+def test_read_array_mmap(tmpdir):
+    store = ArrayStore(str(tmpdir))
+    filename = store.write_array(np.arange(10.), 'positions')
+
+    array = store.read_array(filename, mmap=True)
+    array[0] = 5.
+
+    # copy on write: the file is not changed
+    assert store.read_array(filename)[0] == 0.
+    assert len(store.read_array(store.write_array(np.zeros((0, 3))),
+                                mmap=True)) == 0
+    assert os.path.isfile(str(tmpdir.join('array_0.npy')))
+
+
+def test_object_state(tmpdir):
+    store = ArrayStore(str(tmpdir))
+    thing = Thing()
+    thing.part = Thing()
+    thing.part.count = 5
+
+    state = object_state(thing, store)
+    assert 'thing' not in state['attrs']
+    assert 'name' not in state['attrs']
+
+    other = Thing('other')
+    other.part = Thing()
+    set_object_state(other, state, store)
+
+    assert other.name == 'other'
+    assert other.count == 3
+    assert other.time == thing.time
+    assert other.part.count == 5
+
+    with pytest.raises(ValueError):
+        set_object_state(object.__new__(ArrayStore), state, store)
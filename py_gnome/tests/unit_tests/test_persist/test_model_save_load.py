@@ -6,6 +6,7 @@ tests save/load to directory - original functionality and save/load to zip
 
 import os
 import shutil
+import zipfile
 from datetime import datetime, timedelta
 import json
 
@@ -23,7 +24,7 @@ from gnome.model import Model
 from gnome.spill import point_line_release_spill
 from gnome.movers import RandomMover, WindMover, CatsMover, IceMover
 from gnome.weatherers import Evaporation, Skimmer, Burn
-from gnome.outputters import CurrentJsonOutput, IceJsonOutput
+from gnome.outputters import CurrentJsonOutput, IceJsonOutput, NetCDFOutput
 
 from ..conftest import testdata, test_oil
 
@@ -195,6 +196,108 @@ def test_save_load_model(uncertain, zipsave, saveloc_):
     assert model == model2
 
 
+def test_save_load_model_store_data(saveloc_):
+    '''
+    a model saved with store_data loads back the same, and its netCDF files
+    are stored uncompressed
+    '''
+    model = make_model()
+    ice_mover = IceMover(testdata['IceMover']['ice_curr_curv'],
+                         testdata['IceMover']['ice_top_curv'])
+    model.movers += ice_mover
+
+    _json_, savefile, _refs = model.save(saveloc_, store_data=True)
+
+    with zipfile.ZipFile(savefile) as z:
+        nc_members = [info for info in z.infolist()
+                      if info.filename.endswith('.nc')]
+
+        assert len(nc_members) > 0
+        assert all([info.compress_type == zipfile.ZIP_STORED
+                    for info in nc_members])
+
+    model2 = Model.load(savefile)
+
+    assert model == model2
+
+
+def test_save_load_cache_options(saveloc_):
+    '''
+    the cache options of the model are saved
+    '''
+    model = Model(cache_async=True, cache_mmap=True)
+
+    _json_, savefile, _refs = model.save(saveloc_)
+    model2 = Model.load(savefile)
+
+    assert model2.cache_async
+    assert model2.cache_mmap
+    assert model2 == model
+
+
+def test_save_load_threaded(saveloc_):
+    '''
+    the threaded mode of the model is saved
+    '''
+    model = Model(threaded=True)
+
+    _json_, savefile, _refs = model.save(saveloc_)
+    model2 = Model.load(savefile)
+
+    assert model2.threaded
+    assert model2 == model
+
+
+def test_save_load_random_seed(saveloc_):
+    '''
+    a model loaded from a save file has the random_seed of the model that
+    was saved, so it gives the same results
+    '''
+    model = make_model()
+    model.random_seed = 12
+
+    _json_, savefile, _refs = model.save(saveloc_)
+    model2 = Model.load(savefile)
+
+    assert model2.random_seed == 12
+    assert model2 == model
+
+    for m in (model, model2):
+        m.rewind()
+        for _i in range(3):
+            m.step()
+
+    assert np.array_equal(model.spills.items()[0]['positions'],
+                          model2.spills.items()[0]['positions'])
+
+
+def test_save_midrun_spill_data(tmpdir, monkeypatch):
+    '''
+    a save made mid-run holds the data arrays of the current step
+    '''
+    # the data file is written to the working directory before it is zipped
+    monkeypatch.chdir(tmpdir)
+
+    model = make_model()
+    for _i in range(3):
+        model.step()
+
+    _json_, savefile, _refs = model.save(str(tmpdir))
+    assert not os.path.exists('spills_data_arrays.nc')
+
+    with zipfile.ZipFile(savefile) as z:
+        data_file = z.extract('spills_data_arrays.nc', str(tmpdir.join('out')))
+
+    data, mass_balance = NetCDFOutput.read_data(data_file, which_data='all')
+
+    sc = model.spills.items()[0]
+    assert len(sc) > 0
+    assert np.all(data['id'] == sc['id'])
+    assert np.allclose(data['positions'], sc['positions'])
+    assert np.isclose(mass_balance['evaporated'],
+                      sc.mass_balance['evaporated'])
+
+
 # @pytest.mark.slow
 # @pytest.mark.parametrize(('uncertain', 'zipsave'),
 #                          [(False, False),
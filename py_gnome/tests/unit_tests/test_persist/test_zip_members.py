@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+"""
+tests for the data files of save files written with store_data
+"""
+import os
+import zipfile
+
+from gnome.persist.zip_members import (DataMembers, ZipMember, registered,
+                                       STORE_THRESHOLD)
+
+
+def data_file(tmpdir, name, contents):
+    path = str(tmpdir.join(name))
+
+    with open(path, 'wb') as outfile:
+        outfile.write(contents)
+
+    return path
+
+
+def test_stored_and_deduplicated(tmpdir):
+    big = 'x' * STORE_THRESHOLD
+    first = data_file(tmpdir.mkdir('a'), 'currents.nc', big)
+    same = data_file(tmpdir.mkdir('b'), 'copy_of_currents.nc', big)
+    other = data_file(tmpdir.mkdir('c'), 'currents.nc', 'other')
+    small = data_file(tmpdir, 'coast.bna', 'small')
+
+    filename = str(tmpdir.join('save.zip'))
+    with zipfile.ZipFile(filename, 'w',
+                         compression=zipfile.ZIP_DEFLATED) as zf:
+        members = DataMembers(zf).register()
+        assert registered(zf) is members
+
+        assert members.add(first) == 'currents.nc'
+        assert members.add(same) == 'currents.nc'
+        # same name, different contents
+        assert members.add(other).endswith('_currents.nc')
+        assert members.add(small) == 'coast.bna'
+
+    with zipfile.ZipFile(filename, 'r') as zf:
+        assert len(zf.namelist()) == 3
+        assert zf.getinfo('currents.nc').compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo('coast.bna').compress_type == zipfile.ZIP_DEFLATED
+
+    # not registered, the default way
+    with zipfile.ZipFile(str(tmpdir.join('other.zip')), 'w') as zf:
+        assert registered(zf) is None
+
+
+def test_read_in_place(tmpdir):
+    contents = ''.join([chr(i % 256) for i in range(5000)])
+    path = data_file(tmpdir, 'grid.nc', contents)
+
+    filename = str(tmpdir.join('save.zip'))
+    with zipfile.ZipFile(filename, 'w') as zf:
+        zf.writestr('model.json', '{}')
+        DataMembers(zf).add(path)
+
+    out = tmpdir.mkdir('out')
+    with zipfile.ZipFile(filename, 'r') as zf:
+        member = ZipMember(zf, 'grid.nc')
+        assert member.stored
+        assert member.size == len(contents)
+
+        with open(member.extract(str(out)), 'rb') as infile:
+            assert infile.read() == contents
+
+    assert os.listdir(str(out)) == ['grid.nc']
+
+
+def test_extract_once(tmpdir):
+    path = data_file(tmpdir, 'grid.nc', 'abc' * 100)
+
+    filename = str(tmpdir.join('save.zip'))
+    with zipfile.ZipFile(filename, 'w') as zf:
+        DataMembers(zf).add(path)
+
+    out = tmpdir.mkdir('out')
+    with zipfile.ZipFile(filename, 'r') as zf:
+        extracted = ZipMember(zf, 'grid.nc').extract(str(out))
+
+        with open(extracted, 'rb') as infile:
+            assert infile.read() == 'abc' * 100
+
+        os.utime(extracted, (1000, 1000))
+
+        # not written again
+        assert ZipMember(zf, 'grid.nc').extract(str(out)) == extracted
+        assert os.path.getmtime(extracted) == 1000
+
+        # a stale file of the same size is replaced
+        with open(extracted, 'wb') as outfile:
+            outfile.write('xyz' * 100)
+
+        assert ZipMember(zf, 'grid.nc').extract(str(out)) == extracted
+        with open(extracted, 'rb') as infile:
+            assert infile.read() == 'abc' * 100
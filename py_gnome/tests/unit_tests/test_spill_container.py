@@ -15,6 +15,7 @@ import numpy
 np = numpy
 
 from gnome.basic_types import (oil_status,
+                               fate,
                                world_point_type,
                                id_type)
 from gnome import array_types
@@ -1321,3 +1322,192 @@ def test_split_element():
 
 # if __name__ == '__main__':
 #     test_rewind()
+
+
+def test_data_arrays_preallocated():
+    '''
+    data arrays are views into preallocated buffers - releasing elements
+    should not reallocate the buffers if they were presized from the spills
+    '''
+    rel_time = datetime(2012, 1, 1, 12)
+    sc = SpillContainer()
+    sc.spills += point_line_release_spill(num_elements, start_position,
+                                          rel_time,
+                                          end_release_time=rel_time +
+                                          timedelta(hours=4))
+    sc.prepare_for_model_run(windage_at)
+    buf = sc._buffers['positions']
+    assert len(buf) == num_elements
+
+    for hr in range(5):
+        sc.release_elements(3600, rel_time + timedelta(hours=hr))
+
+        assert sc['positions'].base is buf
+
+    assert sc.num_released == num_elements
+    assert np.all(sc['id'] == range(num_elements))
+
+
+def test_data_arrays_grow():
+    '''
+    releasing more elements than the presized capacity grows the buffers
+    and retains the data released so far
+    '''
+    rel_time = datetime(2012, 1, 1, 12)
+    sc = SpillContainer()
+    sc.spills += point_line_release_spill(num_elements, start_position,
+                                          rel_time)
+    sc.prepare_for_model_run(windage_at)
+    sc.release_elements(900, rel_time)
+
+    # add a spill after buffers were presized so there isn't room for it
+    sc.spills += point_line_release_spill(3 * num_elements, start_position,
+                                          rel_time)
+    sc.release_elements(900, rel_time)
+
+    assert sc.num_released == 4 * num_elements
+    assert len(sc._buffers['positions']) >= 4 * num_elements
+    assert np.all(sc['id'] == range(4 * num_elements))
+    assert np.all(sc['positions'] == start_position)
+    assert np.count_nonzero(sc['spill_num'] == 1) == 3 * num_elements
+
+
+def test_active_index():
+    '''
+    active_index only contains the in_water elements and is invalidated when
+    elements are released
+    '''
+    rel_time = datetime(2012, 1, 1, 12)
+    sc = SpillContainer()
+    sc.spills += point_line_release_spill(num_elements, start_position,
+                                          rel_time)
+    sc.prepare_for_model_run(windage_at)
+    sc.release_elements(900, rel_time)
+
+    # all elements are in water
+    assert sc.active_index == slice(None)
+
+    sc['status_codes'][:10] = oil_status.on_land
+    assert sc.active_index == slice(None)   # not recomputed yet
+
+    active = sc.update_active_index()
+    assert np.all(active == np.arange(10, num_elements))
+    assert np.all(sc['positions'][active] == sc['positions'][10:])
+
+
+def test_blob_index():
+    '''
+    blob_index groups elements released together from the same spill and is
+    invalidated when elements are released
+    '''
+    rel_time = datetime(2012, 1, 1, 12)
+    end_time = rel_time + timedelta(hours=1)
+    sc = SpillContainer()
+    sc.spills += point_line_release_spill(num_elements, start_position,
+                                          rel_time, end_release_time=end_time)
+    sc.prepare_for_model_run(windage_at)
+
+    sc.release_elements(900, rel_time)
+    n_first = len(sc)
+    assert len(sc.blob_index) == 1
+
+    sc['age'][:] += 900
+    assert len(sc.blob_index) == 1     # not recomputed yet
+
+    sc.release_elements(900, rel_time + timedelta(seconds=900))
+    blobs = sc.blob_index
+    assert len(blobs) == 2
+    assert np.all(blobs.counts == (n_first, len(sc) - n_first))
+
+    # oldest blob is first
+    assert np.all(blobs.ids[:n_first] == 0)
+    assert np.all(blobs.ids[n_first:] == 1)
+    assert np.allclose(blobs.sum(sc['mass']),
+                       (sc['mass'][:n_first].sum(), sc['mass'][n_first:].sum()))
+
+
+@pytest.fixture(scope='function')
+def fate_sc():
+    '''
+    SpillContainer with 10 elements of test_oil released: the first two are
+    non_weather, the others surface_weather
+    '''
+    rel_time = datetime(2012, 1, 1, 12)
+    sc = SpillContainer()
+    sc.spills += point_line_release_spill(10, (0., 0., 0.), rel_time,
+                                          amount=10, units='kg',
+                                          substance=test_oil)
+    sc.prepare_for_model_run({'fate_status'})
+    sc.release_elements(900, rel_time)
+
+    sc['fate_status'][:] = fate.surface_weather
+    sc['fate_status'][:2] = fate.non_weather
+    sc.clear_fate_masks()
+
+    return sc
+
+
+def test_fate_masks(fate_sc):
+    '''
+    the masks of all the fates and the mass partitions are computed together
+    and kept until fate_status or mass change
+    '''
+    sc = fate_sc
+    sc['fate_status'][2] |= fate.skim
+    sc['status_codes'][:2] = oil_status.on_land
+    sc['mass'][9] = 0.
+    sc['positions'][8, 2] = 5.
+    sc.clear_fate_masks()
+
+    masks = sc.fate_masks()
+    assert sc.fate_masks() is masks
+
+    # only elements with mass
+    assert list(masks.index('surface_weather')) == range(2, 9)
+    assert list(masks.index('non_weather')) == [0, 1]
+    assert list(masks.index('skim')) == [2]
+    assert np.all(masks['all'] == (sc['mass'] > 0))
+
+    partitions = masks.partitions()
+    mass = sc['mass']
+    assert np.isclose(partitions['beached'], mass[:2].sum())
+    assert np.isclose(partitions['non_weathering'], mass[:2].sum())
+    assert np.isclose(partitions['floating'], mass[2:8].sum() + mass[9])
+    assert partitions['off_maps'] == 0.
+
+    sc.clear_fate_masks()
+    assert sc.fate_masks() is not masks
+
+
+def test_fate_view_incremental(fate_sc):
+    '''
+    the view only writes back the arrays that were asked for and drops the
+    elements that leave it rather than gathering the data again
+    '''
+    sc = fate_sc
+
+    data = sc.substancefatedata(sc.substance, {'mass', 'age'})
+    assert list(data['id']) == range(2, 10)
+    sc.update_from_fatedataview()
+
+    # the next weatherer only asks for 'mass'
+    assert sc.substancefatedata(sc.substance, {'mass'}) is data
+
+    data['mass'][:2] = 0.
+    data['age'][:] = -1
+    sc.update_from_fatedataview()
+
+    assert np.all(sc['mass'][2:4] == 0.)
+    assert np.all(sc['age'] >= 0)
+
+    # elements with no mass are dropped from the arrays of the view
+    assert list(data['id']) == range(4, 10)
+    assert len(data['age']) == 6
+
+    again = sc.substancefatedata(sc.substance, {'mass'})
+    assert again is data
+    assert list(sc._fate_data_view._index['surface_weather']) == range(4, 10)
+
+    again['mass'][:] = 2.
+    sc.update_from_fatedataview()
+    assert np.all(sc['mass'][4:] == 2.)
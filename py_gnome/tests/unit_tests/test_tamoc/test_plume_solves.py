@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+
+"""
+tests for the caching, background solving and interpolation of the TAMOC
+plume solutions
+
+These tests will only run if the tamoc module is available, as importing
+gnome.tamoc imports it.
+"""
+
+import numpy as np
+
+import pytest
+
+pytest.importorskip('tamoc')
+
+from gnome.tamoc.plume_solves import (solve_key, SolveCache, PlumeSolver,
+                                      DropletTable)
+
+
+class Drop(object):
+    def __init__(self, mass_flux, radius, density, position):
+        self.mass_flux = mass_flux
+        self.radius = radius
+        self.density = density
+        self.position = np.asarray(position, dtype=np.float64)
+
+
+class Solver(object):
+    '''
+    fake plume solve: one droplet whose radius is the release flowrate
+    '''
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, tp):
+        self.calls += 1
+        q = tp['release_flowrate']
+
+        return ([Drop(1.0, q, 900.0, (0., 0., tp['depth']))],
+                [Drop(0.5, q, 0., (0., 0., 0.))])
+
+
+def params(**kwargs):
+    tp = {'release_flowrate': 20000.,
+          'depth': 2000.,
+          'ua': np.array([0.05, 0.05]),
+          'hydrate': True}
+    tp.update(kwargs)
+
+    return tp
+
+
+def test_solve_key(tmpdir):
+    assert solve_key(params()) == solve_key(params(release_flowrate=20000.4))
+    assert solve_key(params()) != solve_key(params(release_flowrate=20020.))
+    assert (solve_key(params(ua=np.array([0.05, 0.05]))) !=
+            solve_key(params(ua=np.array([0.05, 0.06]))))
+
+    ctd = tmpdir.join('ctd.txt')
+    ctd.write('0 10 35 0')
+    key = solve_key(params(), files=(str(ctd),))
+
+    ctd.write('0 10 35 0 and more')
+    assert solve_key(params(), files=(str(ctd),)) != key
+
+    hash(key)
+
+
+def test_solve_cache():
+    cache = SolveCache(2)
+
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+
+    # 'b' is the least recently used
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.get('b') is None
+
+
+def test_plume_solver():
+    cache = SolveCache()
+    solver = PlumeSolver(cache)
+    solver.start()
+
+    solve = Solver()
+    tp = params()
+    key = solve_key(tp)
+
+    solver.submit(key, solve, tp)
+    solver.submit(key, solve, tp)
+
+    droplets, _diss = solver.wait(key)
+    assert droplets[0].radius == 20000.
+    assert cache.get(key) is not None
+    assert solve.calls == 1
+
+    # collected already: from the cache
+    assert solver.wait(key)[0][0].radius == 20000.
+
+    def fails(tp):
+        raise ValueError('no plume')
+
+    solver.submit('bad', fails, tp)
+    with pytest.raises(ValueError):
+        solver.wait('bad')
+
+    solver.shutdown()
+    assert not solver.is_alive()
+
+
+def test_droplet_table():
+    solve = Solver()
+    table = DropletTable({'release_flowrate': [10000., 30000.],
+                          'depth': [1000., 2000.]}, solve)
+
+    droplets, diss = table.lookup(params(release_flowrate=15000.,
+                                         depth=1500.))
+    assert solve.calls == 4
+    assert np.isclose(droplets[0].radius, 15000.)
+    assert np.allclose(droplets[0].position, (0., 0., 1500.))
+    assert np.isclose(diss[0].mass_flux, 0.5)
+
+    # clamped to the grid, the nodes are cached
+    droplets, diss = table.lookup(params(release_flowrate=50000.,
+                                         depth=1000.))
+    assert droplets[0].radius == 30000.
+    assert solve.calls == 4
+
+    table.precompute(params())
+    assert solve.calls == 4
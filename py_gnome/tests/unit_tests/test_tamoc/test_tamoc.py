@@ -94,10 +94,42 @@ def test_TamocSpill_run_tamoc():
     drops = ts.run_tamoc(rt, 900)
     drops2 = ts.run_tamoc(rt + timedelta(hours=23), 900)
     assert drops is drops2
+    # the same conditions: the cached solution
     drops3 = ts.run_tamoc(rt + timedelta(hours=25), 900)
-    assert drops is not drops3
-    drops4 = ts.run_tamoc(rt + timedelta(hours=25), 900)
-    assert drops4 is drops3
+    assert drops3 is drops
+
+    ts.tamoc_parameters = dict(ts.tamoc_parameters, release_flowrate=40000.)
+    drops4 = ts.run_tamoc(rt + timedelta(hours=49), 900)
+    assert drops4 is not drops3
+    drops5 = ts.run_tamoc(rt + timedelta(hours=49), 900)
+    assert drops5 is drops4
+
+
+def test_TamocSpill_solver_thread():
+    '''
+    the background solve thread is started by the first solve and stopped
+    by rewind
+    '''
+    ts = tamoc.TamocSpill(release_time=datetime(2016, 8, 12, 12),
+                          start_position=(-76.0, 28.0, 1000),
+                          num_elements=10000,
+                          end_release_time=datetime(2016, 12, 12, 12),
+                          TAMOC_interval=24,
+                          background_solve=True)
+    assert ts._solver is None
+
+    drops = ts.run_tamoc(ts.release_time, 900)
+    solver = ts._solver
+    assert solver.is_alive()
+    assert solver.daemon
+
+    ts.rewind()
+    assert ts._solver is None
+    assert not solver.is_alive()
+
+    # started again, the solution is cached
+    assert ts.run_tamoc(ts.release_time, 900) is drops
+    ts.rewind()
 
 
 def test_TamocSpill_num_elements_to_release():
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+
+"""
+test BlobIndex segment reductions
+"""
+import numpy as np
+
+from gnome.utilities.blobs import BlobIndex
+
+
+spill_num = np.array([1, 0, 1, 0, 0, 1])
+age = np.array([900, 1800, 900, 900, 1800, 0])
+values = np.array([1., 2., 3., 4., 5., 6.])
+
+
+def test_single_key():
+    blobs = BlobIndex(spill_num)
+
+    assert len(blobs) == 2
+    assert np.all(blobs.ids == spill_num)
+    assert np.all(blobs.counts == (3, 3))
+    assert np.allclose(blobs.sum(values), (11., 10.))
+
+    # first is first element of blob in the order of the data
+    assert np.all(blobs.first(values) == (2., 1.))
+
+
+def test_multiple_keys():
+    'last key is primary key, blobs are numbered in sorted order'
+    blobs = BlobIndex(age, spill_num)
+
+    assert len(blobs) == 4
+    assert np.all(blobs.ids == (3, 1, 3, 0, 1, 2))
+    assert np.all(blobs.counts == (1, 2, 1, 2))
+    assert np.allclose(blobs.sum(values), (4., 7., 6., 4.))
+    assert np.allclose(blobs.broadcast(blobs.sum(values)),
+                       (4., 7., 4., 4., 7., 6.))
+
+
+def test_subset():
+    blobs = BlobIndex(age, spill_num)
+    mask = spill_num == 1
+    subset = blobs.subset(mask)
+
+    expected = BlobIndex(age[mask], spill_num[mask])
+    assert len(subset) == len(expected) == 2
+    assert np.all(subset.ids == expected.ids)
+    assert np.allclose(subset.sum(values[mask]), expected.sum(values[mask]))
+
+
+def test_empty():
+    blobs = BlobIndex(np.array([], dtype=int))
+
+    assert len(blobs) == 0
+    assert len(blobs.sum([])) == 0
+    assert len(blobs.subset(np.array([], dtype=bool))) == 0
@@ -181,6 +181,139 @@ def test_write_and_read_back():
     assert sc2._spill_container.current_time_stamp == dt + tdelta * 2
 
 
+def test_write_and_read_back_async():
+    """
+    write to cache in a background thread and read back
+    """
+    c = cache.ElementCache(async_write=True)
+
+    sc = sample_sc_release(num_elements=10, start_pos=(3.14, 2.72, 1.2))
+    scp = SpillContainerPairData(sc)
+
+    positions = []
+    for step in range(5):
+        sc.current_time_stamp = dt + tdelta * step
+        sc['positions'] += 1.1
+        positions.append(sc['positions'].copy())
+
+        c.save_timestep(step, scp)
+
+    # older steps are read from disk once they are written
+    for step in range(5):
+        sc_ = c.load_timestep(step)
+        assert np.array_equal(sc_._spill_container['positions'],
+                              positions[step])
+        assert sc_._spill_container.current_time_stamp == dt + tdelta * step
+
+    c.flush()
+    assert len(c._pending) == 0
+
+    # buffers are reused once they are written
+    assert len(c._step_buffers) == 1
+
+
+def test_async_write_error():
+    'errors in the background writer are raised by flush()'
+    c = cache.ElementCache(async_write=True)
+    sc = sample_sc_release(num_elements=10, start_pos=(3.14, 2.72, 1.2))
+    scp = SpillContainerPairData(sc)
+
+    os.rmdir(c._cache_dir)
+    c.save_timestep(0, scp)
+
+    with pytest.raises(cache.CacheError):
+        c.flush()
+
+
+@pytest.mark.parametrize("uncertain", (False, True))
+def test_write_and_read_back_mmap(uncertain):
+    """
+    memory-mapped cache returns read-only views of the data for each step
+    """
+    c = cache.MemmapElementCache()
+
+    sc = sample_sc_release(num_elements=10, start_pos=(3.14, 2.72, 1.2))
+    if uncertain:
+        u_sc = sample_sc_release(num_elements=10, start_pos=(3.14, 2.72, 1.2),
+                                 uncertain=True)
+        scp = SpillContainerPairData(sc, u_sc)
+    else:
+        scp = SpillContainerPairData(sc)
+
+    positions = []
+    for step in range(3):
+        sc.current_time_stamp = dt + tdelta * step
+        sc['positions'] += 1.1
+        positions.append(sc['positions'].copy())
+
+        c.save_timestep(step, scp)
+
+    for step in (2, 0, 1):
+        scp_ = c.load_timestep(step)
+        data = scp_._spill_container
+
+        assert np.array_equal(data['positions'], positions[step])
+        assert data.current_time_stamp == dt + tdelta * step
+        assert not data['positions'].flags.writeable
+        assert scp_.uncertain is uncertain
+
+    with pytest.raises(cache.CacheError):
+        c.load_timestep(3)
+
+    c.rewind()
+    with pytest.raises(cache.CacheError):
+        c.load_timestep(0)
+
+
+def test_mmap_recent():
+    """
+    the most recent step is held in memory, so data added to it by the
+    outputters (surface_concentration) is seen when it is loaded
+    """
+    c = cache.MemmapElementCache()
+
+    sc = sample_sc_release(num_elements=10, start_pos=(3.14, 2.72, 1.2))
+    sc.current_time_stamp = dt
+    scp = SpillContainerPairData(sc)
+
+    c.save_timestep(0, scp)
+    c.save_timestep(1, scp)
+    assert c.recent.keys() == [1]
+
+    c.recent[1][0]['positions'][:] = 0.
+
+    assert np.all(c.load_timestep(1)._spill_container['positions'] == 0.)
+    assert np.array_equal(c.load_timestep(0)._spill_container['positions'],
+                          sc['positions'])
+    assert c.load_timestep(1)._spill_container.current_time_stamp == dt
+
+
+def test_load_shared_timestep():
+    """
+    shared data is loaded once per step, is read-only and is invalidated
+    when a new step is saved
+    """
+    c = cache.ElementCache()
+    sc = sample_sc_release(num_elements=10, start_pos=(3.14, 2.72, 1.2))
+    sc.current_time_stamp = dt
+    scp = SpillContainerPairData(sc)
+    c.save_timestep(0, scp)
+
+    shared = c.load_shared_timestep(0)
+    assert c.load_shared_timestep(0) is shared
+
+    positions = shared.items()[0]['positions']
+    assert np.array_equal(positions, sc['positions'])
+    assert not positions.flags.writeable
+    assert shared.items()[0].current_time_stamp == dt
+
+    # a copy is still writeable
+    assert c.load_timestep(0).items()[0]['positions'].flags.writeable
+
+    c.save_timestep(1, scp)
+    assert c.load_shared_timestep(0) is not shared
+
+
 def test_write_and_read_back_uncertain():
     """
     write to cache and read back
@@ -4,8 +4,10 @@ Tests of the gd map canvas code.
 
 import os
 
+import numpy as np
 
-from gnome.utilities.map_canvas import MapCanvas
+from gnome.utilities.map_canvas import (MapCanvas, unique_pixels,
+                                        pixel_segments)
 
 import pytest
 from ..conftest import testdata
@@ -37,6 +39,33 @@ def test_set_colors():
     assert colors == ['transparent', 'black', 'white', 'blue', 'red']
 
 
+def test_unique_pixels():
+    points = np.array([(1, 2), (3, 4), (1, 2), (1, 2), (0, 9)],
+                      dtype=np.int32)
+
+    assert sorted(unique_pixels(points).tolist()) == [[0, 9], [1, 2], [3, 4]]
+    assert len(unique_pixels(points[:1])) == 1
+
+
+def test_pixel_segments():
+    start = np.array([(0, 0), (0, 0), (5, 5), (1, 1)])
+    end = np.array([(3, 4), (3, 4), (5, 5), (2, 2)])
+
+    # duplicates and the empty segment are gone
+    assert sorted(pixel_segments(start, end).tolist()) == [[0, 0, 3, 4],
+                                                           [1, 1, 2, 2]]
+
+
+def test_foreground_segments(output_dir):
+    mc = MapCanvas((400, 300), viewport=((-10, 10), (10, 20)))
+
+    start = np.array([(-10., 10.), (-5., 12.), (-5., 12.)])
+    end = np.array([(10., 20.), (5., 18.), (5., 18.)])
+
+    mc.draw_segments(start, end, 'black', 2)
+    mc.save_foreground(os.path.join(output_dir, 'foreground_segments.png'))
+
+
 def test_background_poly(output_dir):
     """
     test drawing polygons to the background
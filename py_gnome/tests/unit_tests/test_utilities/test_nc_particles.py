@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+"""
+tests for the random access reader of particle files
+"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import netCDF4
+
+import pytest
+
+from gnome.utilities.nc_particles import ParticleFileReader, nc_particle_file
+
+
+# particle ids in each timestep -- particle 1 is gone after step 1
+step_ids = [[0, 1], [0, 1, 2], [0, 2, 3], [2, 3, 0, 4]]
+
+
+@pytest.fixture(scope='function')
+def particle_file(tmpdir):
+    filename = str(tmpdir.join('particles.nc'))
+    start = datetime(2017, 1, 1)
+
+    with netCDF4.Dataset(filename, 'w') as nc:
+        nc.createDimension('time', len(step_ids))
+        nc.createDimension('data', None)
+
+        time = nc.createVariable('time', 'f8', ('time', ))
+        time.units = 'seconds since 2017-01-01 00:00:00'
+        time.calendar = 'gregorian'
+        time[:] = netCDF4.date2num([start + timedelta(hours=i)
+                                    for i in range(len(step_ids))],
+                                   time.units)
+
+        nc.createVariable('particle_count', 'i4',
+                          ('time', ))[:] = [len(ids) for ids in step_ids]
+
+        ids = np.concatenate(step_ids)
+        nc.createVariable('id', 'i4', ('data', ))[:] = ids
+        # longitude is step * 10 + id
+        nc.createVariable('longitude', 'f8', ('data', ))[:] = \
+            np.concatenate([np.array(ids_, dtype=np.float64) + 10 * i
+                            for i, ids_ in enumerate(step_ids)])
+        mass = nc.createVariable('mass', 'f8', ('data', ))
+        mass.units = 'kilograms'
+        mass[:] = 1.0
+
+    return filename
+
+
+def test_timesteps(particle_file):
+    with ParticleFileReader(particle_file) as reader:
+        assert reader.num_timesteps == 4
+        assert list(reader.data_index) == [0, 2, 5, 8, 12]
+
+        assert reader.step_range(2) == (5, 8)
+        assert reader.step_range(-1) == (8, 12)
+        with pytest.raises(IndexError):
+            reader.step_range(4)
+
+        assert reader.index_of_time(datetime(2017, 1, 1, 2, 10)) == 2
+        assert reader.index_of_time(datetime(2016, 1, 1)) == 0
+
+        data = reader.get_timestep(1, ['id', 'longitude'])
+        assert list(data['id']) == step_ids[1]
+        assert list(data['longitude']) == [10., 11., 12.]
+
+        # batched, in any order
+        for steps in ([3, 1], [0, 3]):
+            for step, data in zip(steps, reader.get_timesteps(steps,
+                                                              ['id'])):
+                assert list(data['id']) == step_ids[step]
+
+
+def test_trajectory(particle_file, tmpdir):
+    index_dir = str(tmpdir.join('index'))
+
+    with ParticleFileReader(particle_file, index_dir=index_dir) as reader:
+        traj = reader.get_trajectory(0, ['longitude'])
+        assert list(traj['timestep']) == [0, 1, 2, 3]
+        assert list(traj['longitude']) == [0., 10., 20., 30.]
+
+        traj = reader.get_trajectory(1, ['longitude'])
+        assert list(traj['timestep']) == [0, 1]
+
+        traj = reader.get_trajectory(99, ['longitude'])
+        assert len(traj['timestep']) == 0
+        assert len(traj['longitude']) == 0
+
+    # the index is saved in the index dir, and used by the next reader
+    assert len(os.listdir(index_dir)) == 1
+    assert not os.path.exists(particle_file + '.ids.npz')
+
+    with ParticleFileReader(particle_file, index_dir=index_dir) as reader:
+        assert reader._load_id_index()
+        traj = reader.get_trajectory(3, ['longitude'])
+        assert list(traj['longitude']) == [23., 33.]
+
+
+def test_trajectory_index_not_saved(particle_file, tmpdir):
+    'the trajectories are read if the index cannot be saved'
+    not_a_dir = tmpdir.join('file')
+    not_a_dir.write('')
+
+    with ParticleFileReader(particle_file,
+                            index_dir=str(not_a_dir)) as reader:
+        traj = reader.get_trajectory(0, ['longitude'])
+        assert list(traj['longitude']) == [0., 10., 20., 30.]
+        assert not reader._load_id_index()
+
+
+def test_nc_particle_file_trajectory(particle_file):
+    with netCDF4.Dataset(particle_file) as nc:
+        traj = nc_particle_file(nc).get_individual_trajectory(2, ['id'])
+
+        assert list(traj['timestep']) == [1, 2, 3]
+        assert list(traj['id']) == [2, 2, 2]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+"""
+test PointShapefileWriter - the files it writes follow the shapefile spec
+and can be read back
+"""
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from gnome.utilities.point_shapefile import PointShapefileWriter
+
+
+fields = [('Time', 'C', 19, 0),
+          ('LE id', 'N', 10, 0),
+          ('Mass', 'N', 19, 6),
+          ('Surf_Conc', 'F', 19, 6)]
+
+
+def write_two_steps(filename):
+    writer = PointShapefileWriter(filename, fields)
+
+    writer.write([-120., -121.], [45., 46.],
+                 ['2016-01-01T00:00:00', np.array([0, 1]),
+                  np.array([1.5, 2.25]), 0.0])
+    writer.write([-119.5], [44.],
+                 ['2016-01-01T01:00:00', np.array([2]),
+                  np.array([3.]), np.array([1e-3])])
+    writer.close()
+
+    return writer
+
+
+def test_headers(tmpdir):
+    filename = str(tmpdir.join('points'))
+    writer = write_two_steps(filename)
+
+    assert writer.closed
+    assert writer.num_records == 3
+
+    with open(filename + '.shp', 'rb') as infile:
+        shp = infile.read()
+
+    assert len(shp) == 100 + 3 * 28
+    assert struct.unpack('>i', shp[:4])[0] == 9994
+    # file length in 16 bit words
+    assert struct.unpack('>i', shp[24:28])[0] == len(shp) / 2
+    assert struct.unpack('<ii', shp[28:36]) == (1000, 1)
+    assert struct.unpack('<4d', shp[36:68]) == (-121., 44., -119.5, 46.)
+
+    # last record
+    assert struct.unpack('>ii', shp[-28:-20]) == (3, 10)
+    assert struct.unpack('<idd', shp[-20:]) == (1, -119.5, 44.)
+
+    with open(filename + '.shx', 'rb') as infile:
+        shx = infile.read()
+
+    assert len(shx) == 100 + 3 * 8
+    assert struct.unpack('>ii', shx[-8:]) == (50 + 2 * 14, 10)
+
+    with open(filename + '.dbf', 'rb') as infile:
+        dbf = infile.read()
+
+    num, header_size, record_size = struct.unpack('<IHH', dbf[4:12])
+    assert num == 3
+    assert header_size == 32 * 5 + 1
+    assert record_size == 1 + 19 + 10 + 19 + 19
+    assert len(dbf) == header_size + num * record_size + 1
+
+
+def test_read_back(tmpdir):
+    shapefile = pytest.importorskip('shapefile')
+
+    filename = str(tmpdir.join('points'))
+    write_two_steps(filename)
+
+    reader = shapefile.Reader(filename)
+    records = reader.records()
+
+    assert len(reader.shapes()) == 3
+    assert reader.shapes()[2].points[0][:2] == [-119.5, 44.]
+    assert records[1][0] == '2016-01-01T00:00:00'
+    assert records[1][1] == 1
+    assert float(records[1][2]) == 2.25
+    assert float(records[2][3]) == 1e-3
+
+
+def test_overflow(tmpdir):
+    filename = str(tmpdir.join('points'))
+    writer = PointShapefileWriter(filename, [('Big', 'N', 4, 0)])
+
+    writer.write([0., 1.], [0., 1.], [np.array([12, 123456])])
+    writer.close()
+
+    with open(filename + '.dbf', 'rb') as infile:
+        dbf = infile.read()
+
+    assert dbf[-11:-1] == '   12 ****'
+    assert os.path.getsize(filename + '.shp') == 100 + 2 * 28
@@ -7,7 +7,9 @@ Test gnome.utilities.rand.py
 import numpy as np
 import random
 
-from gnome.utilities.rand import random_with_persistance, seed
+from gnome.utilities.rand import (random_with_persistance, seed,
+                                  philox4x32, RandomStreams,
+                                  element_uniform)
 from gnome.cy_gnome.cy_helpers import rand
 
 import pytest
@@ -91,3 +93,66 @@ def test_set_seed():
     assert xi == xf
     assert np.all(ai == af)
     assert ci == cf
+
+
+def test_philox_known_answers():
+    """
+    known answer tests of the Random123 distribution
+    """
+    zero = philox4x32(np.zeros((4, 1)), (0, 0))
+    assert list(zero[:, 0]) == [0x6627e8d5, 0xe169c58d,
+                                0xbc57ac4c, 0x9b00dbd8]
+
+    ones = philox4x32(np.ones((4, 1)) * 0xffffffff,
+                      (0xffffffff, 0xffffffff))
+    assert list(ones[:, 0]) == [0x408f276d, 0x41c83b0e,
+                                0xa20bc7c6, 0x6d5451fd]
+
+
+def test_streams_independent_of_chunking():
+    streams = RandomStreams(seed=42)
+    streams.step = 3
+    ids = np.arange(100, dtype=np.uint32)
+
+    whole = streams.uniform(ids, 'diffusion', draws=3)
+    chunks = np.concatenate([streams.uniform(ids[i:i + 7], 'diffusion',
+                                             draws=3)
+                             for i in range(0, 100, 7)])
+
+    assert whole.shape == (100, 3)
+    assert np.all(whole == chunks)
+    assert np.all((whole >= 0) & (whole < 1))
+
+    # the first draw does not depend on how many are asked for
+    assert np.all(streams.uniform(ids, 'diffusion') == whole[:, 0])
+
+    # different purpose, step or seed give different numbers
+    assert np.all(streams.uniform(ids, 'windage') != whole[:, 0])
+    streams.step = 4
+    assert np.all(streams.uniform(ids, 'diffusion') != whole[:, 0])
+    assert np.all(RandomStreams(seed=43).uniform(ids, 'diffusion') !=
+                  whole[:, 0])
+
+
+def test_element_uniform():
+    class SC(dict):
+        uncertain = False
+        random_streams = None
+
+    sc = SC(id=np.arange(10, dtype=np.uint32))
+    assert element_uniform(sc, 'refloat') is None
+
+    sc.random_streams = RandomStreams()
+    rnd = element_uniform(sc, 'refloat', np.array([2, 5]))
+
+    assert np.all(rnd == element_uniform(sc, 'refloat')[[2, 5]])
+
+    sc.uncertain = True
+    assert np.all(element_uniform(sc, 'refloat', np.array([2, 5])) != rnd)
+
+
+def test_random_with_persistance_rnd():
+    rnd = np.array([0., 0.5, 0.25])
+    arr = random_with_persistance([1., 1., 1.], [3., 3., 3.], rnd=rnd)
+
+    assert np.all(arr == [1., 2., 1.5])